@@ -1,75 +1,249 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, has_request_context, request, jsonify, make_response, send_from_directory
 from flask_cors import CORS
 import numpy as np
 import json
+import logging
 import os
 import sys
 import re
+import hashlib
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from dotenv import load_dotenv
 from embeddings.embedder import Embedder
-from vector_store.faiss_handler import FAISSHandler
-from llm.sgllm import SuggestionGenerator
+from embeddings.batching import batching_from_env
+from vector_store.entry_store import EntryStore
+from vector_store.sharded_index import ShardedIndexManager, check_tenant
+from vector_store.semantic_cache import semantic_cache_from_env
+from llm.sgllm import SuggestionGenerator, is_failed_suggestion
 from nat.nat_filler import NATFiller
 from graph_db.subgraph_generator import SubgraphGenerator
+import graph_db.neo4j_handler as neo4j_db
 from graph_db.neo4j_handler import get_neo4j_handler
+from graph_db.subgraph_linker import SubgraphLinker
+from storage.note_store import NoteStore, FILTER_FIELDS
+from vector_store.note_search import NoteSearchIndex
+from utils.similarity import MatchPolicy, select_pairs
+from utils.metrics import CACHE_HITS, CACHE_MISSES, PROMETHEUS_CONTENT_TYPE, REGISTRY, REQUEST_SECONDS, span
+from utils.profiling import profiler_from_env
 
-# Import GraphRAG integration
-try:
-    from graph_rag_integration import GraphRAGIntegration, GraphRAGConfig, integrate_with_existing_notes
-    GRAPHRAG_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: GraphRAG integration not available: {e}")
-    GRAPHRAG_AVAILABLE = False
+# GraphRAG (langchain, spaCy, networkx, ...) is imported on first use by get_graph_rag(),
+# so the core notes path never pays for it at startup.
+GRAPHRAG_AVAILABLE = None  # unknown until the first import attempt
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend
+# Routes live on a blueprint; create_app() builds the Flask app around it
+api_bp = Blueprint("api", __name__)
 
 # --- Constants ---
-SIMILARITY_THRESHOLD = 0.001
+SIMILARITY_THRESHOLD = 0.3
+# Bounds the suggestions (and LLM calls) per request: at most top_k per need, budget in total
+MATCH_POLICY = MatchPolicy(threshold=SIMILARITY_THRESHOLD, top_k=3, max_per_note=6, budget=20)
+NOTES_DB_PATH = "notes/notes.db"
+NOTES_INDEX_PATH = "vector_store/notes.index"
+SEARCH_CANDIDATES = 200  # notes ranked by a ?q= search before filtering and paging
 FAISS_INDEX_PATH = "vector_store/ht.index"
-ENTRIES_FILE_PATH = "vector_store/entries.json"
-EMBEDDINGS_FILE_PATH = "vector_store/embeddings.npy"
-
-# --- Global instances (initialize once) ---
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-
-nat_filler = NATFiller(api_key=API_KEY)
-embedder = Embedder()
-indexer = FAISSHandler()
-sgllm = SuggestionGenerator(api_key=API_KEY)
-subgraph_generator = SubgraphGenerator(api_key=API_KEY)
-neo4j_handler = get_neo4j_handler()
-
-# Initialize components
-embedder = Embedder()
-indexer = FAISSHandler()
-sgllm = SuggestionGenerator(api_key=os.getenv("GEMINI_API_KEY"))
-nat_filler = NATFiller(api_key=os.getenv("GEMINI_API_KEY"))
-
-# Initialize GraphRAG if available
+ENTRY_TABLE_PATH = "vector_store/entries.bin"
+ENTRIES_FILE_PATH = "vector_store/entries.json"  # legacy layout, imported once
+TENANT_HEADER = "X-Tenant-Id"  # selects the entry shard when ENTRY_SHARDS_DIR is set
+DEFAULT_TENANT = "default"
+
+# --- Global instances (initialized once by init_services) ---
+API_KEY = None
+note_store = None
+nat_filler = None
+embedder = None
+entry_store = None
+entry_shards = None  # ShardedIndexManager when entries are sharded per tenant
+indexer = None
+sgllm = None
+subgraph_generator = None
+subgraph_linker = None
+note_search = None
+suggestion_cache = None  # SemanticCache of POST /api/suggestions results by (need, availability) embedding
 graph_rag = None
-if GRAPHRAG_AVAILABLE:
-    try:
-        config = GraphRAGConfig(
-            chunk_size=300,
-            chunk_overlap=50,
-            similarity_threshold=0.2,
-            enable_visualization=True
-        )
-        graph_rag = GraphRAGIntegration(config)
-        print("GraphRAG integration initialized successfully")
-    except Exception as e:
-        print(f"Warning: Could not initialize GraphRAG: {e}")
+_services_lock = threading.Lock()
+_services_ready = False
+_lazy_lock = threading.Lock()
+_graph_rag_status = "not_loaded"  # not_loaded | ready | unavailable | failed
+
+
+def init_services():
+    """Load the core models, indexes and clients. Idempotent; call before forking workers."""
+    global API_KEY, note_store, nat_filler, embedder, entry_store, entry_shards, indexer, sgllm, subgraph_generator, suggestion_cache, _services_ready
+    with _services_lock:
+        if _services_ready:
+            return
+        API_KEY = os.getenv("GEMINI_API_KEY")
+        if not API_KEY:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+        note_store = NoteStore(NOTES_DB_PATH)
+        nat_filler = NATFiller(api_key=API_KEY)
+        # EMBED_BATCHING=true merges concurrent requests' texts into shared model calls
+        embedder = batching_from_env(Embedder())
+        shards_dir = os.getenv("ENTRY_SHARDS_DIR")
+        if shards_dir:
+            # One entry index per tenant, loaded on demand; see current_entry_store()
+            entry_shards = ShardedIndexManager(
+                shards_dir,
+                memory_budget_mb=float(os.getenv("ENTRY_SHARDS_MEMORY_MB", "512")),
+                storage=os.getenv("ENTRY_STORAGE", "float32"),
+            )
+        else:
+            entry_store = EntryStore(
+                FAISS_INDEX_PATH, ENTRY_TABLE_PATH, legacy_entries_path=ENTRIES_FILE_PATH,
+                storage=os.getenv("ENTRY_STORAGE", "float32"),
+            )
+            indexer = entry_store.indexer
+        sgllm = SuggestionGenerator(api_key=API_KEY)
+        subgraph_generator = SubgraphGenerator(api_key=API_KEY)
+        # SUGGESTION_CACHE_THRESHOLD / _SIZE / _TTL trade freshness for fewer LLM calls
+        suggestion_cache = semantic_cache_from_env("SUGGESTION_CACHE", dim=384, parts=2, name="suggestion_semantic")
+        _services_ready = True
+
+
+def request_tenant() -> str:
+    """The tenant named by this request's X-Tenant-Id header."""
+    return request.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+
+
+def current_entry_store(tenant: Optional[str] = None) -> EntryStore:
+    """
+    The entry index for this request: a tenant's shard when entries are
+    sharded (held until the request ends), else the shared one.
+
+    tenant defaults to the request's X-Tenant-Id; changes to an existing note
+    pass the tenant the note was stored for, so they reach its shard.
+    """
+    if entry_shards is None or not has_request_context():
+        return entry_store
+    tenant = tenant or request_tenant()
+    if "entry_shards" not in g:
+        g.entry_shards = {}
+    if tenant not in g.entry_shards:
+        g.entry_shards[tenant] = entry_shards.acquire(tenant)
+    return g.entry_shards[tenant]
+
+
+def get_subgraph_linker() -> SubgraphLinker:
+    """Cross-note linker, created (and Neo4j connected) on first use."""
+    global subgraph_linker
+    if subgraph_linker is None:
+        with _lazy_lock:
+            if subgraph_linker is None:
+                subgraph_linker = SubgraphLinker(embedder=embedder, neo4j_handler=get_neo4j_handler())
+    return subgraph_linker
+
+
+def get_note_search() -> NoteSearchIndex:
+    """Note search index, loaded on the first ?q= query."""
+    global note_search
+    if note_search is None:
+        with _lazy_lock:
+            if note_search is None:
+                note_search = NoteSearchIndex(
+                    embedder, index_path=NOTES_INDEX_PATH,
+                    min_similarity=float(os.getenv("NOTE_SEARCH_MIN_SIMILARITY", "0.3")),
+                )
+    return note_search
+
+
+def get_graph_rag():
+    """Import and initialize GraphRAG on first use. Returns None if it is unavailable."""
+    global graph_rag, GRAPHRAG_AVAILABLE, _graph_rag_status
+    if _graph_rag_status != "not_loaded":
+        return graph_rag
+    with _lazy_lock:
+        if _graph_rag_status != "not_loaded":
+            return graph_rag
+        try:
+            from graph_rag_integration import GraphRAGIntegration, GraphRAGConfig
+            from graph_rag_integration import GRAPHRAG_AVAILABLE as dependencies_available
+            GRAPHRAG_AVAILABLE = dependencies_available
+        except ImportError as e:
+            print(f"Warning: GraphRAG integration not available: {e}")
+            GRAPHRAG_AVAILABLE = False
+        if not GRAPHRAG_AVAILABLE:
+            _graph_rag_status = "unavailable"
+            return None
+        try:
+            config = GraphRAGConfig(
+                chunk_size=300,
+                chunk_overlap=50,
+                similarity_threshold=0.2,
+                enable_visualization=True,
+                semantic_cache_threshold=float(os.getenv("GRAPHRAG_CACHE_THRESHOLD", "0.9")),
+                semantic_cache_size=int(os.getenv("GRAPHRAG_CACHE_SIZE", "1000")),
+            )
+            graph_rag = GraphRAGIntegration(config, embedder=embedder)
+            _graph_rag_status = "ready"
+            print("GraphRAG integration initialized successfully")
+        except Exception as e:
+            _graph_rag_status = "failed"
+            print(f"Warning: Could not initialize GraphRAG: {e}")
+        return graph_rag
+
+
+def create_app(preload: bool = True) -> Flask:
+    """
+    Application factory.
+
+    With preload=True the embedder and FAISS index are loaded here, so a
+    pre-forking server (gunicorn --preload) loads them once in the master
+    and every worker shares those pages copy-on-write.
+    """
+    # DEBUG adds per-stage timings and raw LLM responses to the log
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+    app = Flask(__name__)
+    CORS(app, expose_headers=["ETag"])  # Enable CORS for frontend; ETag lets it revalidate note pages
+    app.register_blueprint(api_bp)
+    app.before_request(_start_request_timer)
+    app.before_request(_check_tenant)
+    app.after_request(_observe_request)
+    app.teardown_request(_release_entry_shard)
+    # Opt-in (PROFILE_REQUESTS=true): X-Profile header / PROFILE_SLOW_MS profiling, /api/debug/slow-requests
+    profiler = profiler_from_env()
+    if profiler is not None:
+        profiler.init_app(app)
+        app.extensions["request_profiler"] = profiler
+    if preload:
+        init_services()
+        if os.getenv("PRELOAD_GRAPHRAG", "false").lower() == "true":
+            get_graph_rag()
+    else:
+        app.before_request(init_services)
+    return app
+
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+def _check_tenant():
+    tenant = request.headers.get(TENANT_HEADER)
+    if tenant and entry_shards is not None:
+        try:
+            check_tenant(tenant)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+def _release_entry_shard(exc=None):
+    for tenant in g.pop("entry_shards", {}):
+        entry_shards.release(tenant)
+
+def _observe_request(response):
+    """Record the request latency by route template (not raw path, so note ids don't become labels)."""
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route, status=response.status_code)
+    return response
 
 def process_note_with_nat(note_text: str, note_id: int) -> Dict:
     """Process a single note through NAT extraction."""
@@ -95,9 +269,10 @@ def process_note_with_nat(note_text: str, note_id: int) -> Dict:
         neo4j_enabled = os.getenv("ENABLE_NEO4J", "true").lower() == "true"
         
         if neo4j_enabled:
-            print(f"Generating subgraph for note {note_id}...")
+            logging.debug("Generating subgraph for note %s", note_id)
             try:
-                # Test Neo4j connection first
+                # Test Neo4j connection first (the driver is created on first use)
+                neo4j_handler = get_neo4j_handler()
                 if not neo4j_handler.health_check():
                     print("Neo4j not available, skipping subgraph generation")
                     nat["subgraph_stored"] = False
@@ -105,7 +280,8 @@ def process_note_with_nat(note_text: str, note_id: int) -> Dict:
                     subgraph_data = subgraph_generator.generate_subgraph(note_text)
                     
                     # Store in Neo4j
-                    success = neo4j_handler.create_note_subgraph(str(note_id), subgraph_data)
+                    with span("neo4j_write"):
+                        success = neo4j_handler.create_note_subgraph(str(note_id), subgraph_data)
                     if success:
                         print(f"Subgraph stored successfully for note {note_id}")
                         nat["subgraph_stored"] = True
@@ -116,7 +292,7 @@ def process_note_with_nat(note_text: str, note_id: int) -> Dict:
                 print(f"Error generating/storing subgraph for note {note_id}: {e}")
                 nat["subgraph_stored"] = False
         else:
-            print("Neo4j disabled, skipping subgraph generation")
+            logging.debug("Neo4j disabled, skipping subgraph generation")
             nat["subgraph_stored"] = False
         
         return nat
@@ -130,78 +306,60 @@ def process_note_with_nat(note_text: str, note_id: int) -> Dict:
             "id": note_id
         }
 
-def find_connections_and_generate_suggestions(entries: List[Tuple], embeddings: np.ndarray) -> List[Dict]:
-    """Find connections between needs and availabilities, generate suggestions."""
-    suggestions = []
-    
-    print(f"DEBUG: Processing {len(entries)} entries with {len(embeddings)} embeddings")
-    for i, entry in enumerate(entries):
-        print(f"  Entry {i}: {entry}")
-    
-    if not entries:
-        print("DEBUG: No entries to process")
-        return suggestions
-    
-    try:
-        # Build or load index
-        if len(embeddings) > 0:
-            # Use numpy-based similarity instead of FAISS to avoid threading issues
-            print("DEBUG: Computing similarity using numpy...")
-            from sklearn.metrics.pairwise import cosine_similarity
-            
-            # Compute cosine similarity matrix
-            similarity_matrix = cosine_similarity(embeddings)
-            print(f"DEBUG: Similarity matrix shape: {similarity_matrix.shape}")
-            
-            # Find pairs above threshold
-            similar_pairs = []
-            for i in range(len(embeddings)):
-                for j in range(len(embeddings)):
-                    if i != j and similarity_matrix[i][j] > SIMILARITY_THRESHOLD:
-                        similar_pairs.append((i, j, float(similarity_matrix[i][j])))
-            
-            print("DEBUG: Similarity computation completed successfully")
-            print(f"DEBUG: Found {len(similar_pairs)} similar pairs above threshold {SIMILARITY_THRESHOLD}")
-            
-            suggestion_id = 1
-            for query_idx, result_idx, score in similar_pairs:
-                type1 = entries[query_idx][1]
-                type2 = entries[result_idx][1]
-                print(f"DEBUG: Pair {query_idx}->{result_idx}, types: {type1}->{type2}, score: {score}")
-                
-                # Only connect needs with availabilities
-                if type1 == "need" and type2 == "availability":
-                    need_text = entries[query_idx][0]
-                    availability_text = entries[result_idx][0]
-                    need_note_id = entries[query_idx][2]
-                    availability_note_id = entries[result_idx][2]
-                    
-                    print(f"DEBUG: Generating suggestion for need '{need_text}' + availability '{availability_text}'")
-                    
-                    # Generate suggestion using LLM
-                    try:
-                        suggestion_text = sgllm.generate(need_text, availability_text)
-                        print(f"DEBUG: Generated suggestion: {suggestion_text[:100]}...")
-                    except Exception as e:
-                        print(f"DEBUG: LLM generation failed: {e}")
-                        suggestion_text = f"Could not generate suggestion: {e}"
-                    
-                    suggestions.append({
-                        "id": f"sugg_{suggestion_id}",
-                        "noteId": str(need_note_id),  # Frontend expects noteId (singular)
-                        "need": need_text,
-                        "availability": availability_text,
-                        "suggestion": suggestion_text  # Frontend expects 'suggestion' not 'description'
-                    })
-                    suggestion_id += 1
-                    
-    except Exception as e:
-        print(f"Error generating suggestions: {e}")
-    
-    print(f"DEBUG: Generated {len(suggestions)} suggestions")
-    return suggestions
+def entries_for_nat(nat: Dict) -> List[Tuple]:
+    """(text, type, note_id) entries for a note's needs and availabilities."""
+    entries = []
+    for need in nat.get("resources_needed", []):
+        entries.append((need, "need", nat["id"]))
+    for availability in nat.get("resources_available", []):
+        entries.append((availability, "availability", nat["id"]))
+    return entries
 
-@app.route('/api/notes', methods=['POST'])
+def generate_suggestion(need_entry: Tuple, availability_entry: Tuple, score: float, known_texts: Dict = None) -> Optional[Dict]:
+    """
+    Suggestion connecting a need with an availability, or None if the LLM failed.
+
+    known_texts maps (need, availability) to a stored suggestion (see
+    NoteStore.suggestion_texts); the LLM is only asked for pairs not in it.
+    Failed generations are neither returned nor remembered, so the next
+    submission or reanalysis of the pair asks again.
+    """
+    key = (need_entry[0], availability_entry[0])
+    suggestion_text = (known_texts or {}).get(key)
+    if is_failed_suggestion(suggestion_text):
+        CACHE_MISSES.inc(cache="suggestion")
+        try:
+            suggestion_text = sgllm.generate(need_entry[0], availability_entry[0])
+        except Exception as e:
+            print(f"LLM generation failed: {e}")
+            return None
+        if is_failed_suggestion(suggestion_text):
+            return None
+        if known_texts is not None:
+            known_texts[key] = suggestion_text
+    else:
+        CACHE_HITS.inc(cache="suggestion")
+    return {
+        "need_note_id": need_entry[2],
+        "availability_note_id": availability_entry[2],
+        "need": need_entry[0],
+        "availability": availability_entry[0],
+        "suggestion": suggestion_text,
+        "score": float(score)
+    }
+
+def suggestion_to_json(suggestion: Dict) -> Dict:
+    """Format a stored suggestion for the frontend."""
+    return {
+        "id": f"sugg_{suggestion['id']}",
+        "noteId": str(suggestion["need_note_id"]),  # Frontend expects noteId (singular)
+        "availabilityNoteId": str(suggestion["availability_note_id"]),
+        "need": suggestion["need"],
+        "availability": suggestion["availability"],
+        "suggestion": suggestion["suggestion"]  # Frontend expects 'suggestion' not 'description'
+    }
+
+@api_bp.route('/api/notes', methods=['POST'])
 def submit_notes():
     """Process submitted notes and return analyzed data with suggestions."""
     try:
@@ -211,21 +369,31 @@ def submit_notes():
         if not notes:
             return jsonify({"error": "No notes provided"}), 400
         
+        # Store the notes first so every note gets a stable id
+        records = note_store.add_many(notes, tenant=request_tenant())
+        
         # Process each note through NAT
         processed_nats = []
-        for i, note_text in enumerate(notes):
-            nat = process_note_with_nat(note_text, i)
+        for record in records:
+            nat = process_note_with_nat(record["content"], record["id"])
+            nat["timestamp"] = record["created_at"]
             processed_nats.append(nat)
         
+        # Join the freshly stored subgraphs to the ones from earlier notes
+        stored_ids = [str(nat["id"]) for nat in processed_nats if nat.get("subgraph_stored")]
+        if stored_ids:
+            try:
+                with span("neo4j_link"):
+                    link_stats = get_subgraph_linker().link_notes(stored_ids)
+                print(f"Cross-note linking: {link_stats}")
+            except Exception as e:
+                print(f"Warning: Could not link subgraphs across notes: {e}")
+        
         # Create entries for embedding and indexing
         entries = []
         for nat in processed_nats:
-            # Add needs
-            for need in nat.get("resources_needed", []):
-                entries.append((need, "need", nat["id"]))
-            # Add availabilities  
-            for availability in nat.get("resources_available", []):
-                entries.append((availability, "availability", nat["id"]))
+            note_store.set_analysis(nat["id"], nat)
+            entries.extend(entries_for_nat(nat))
         
         # Generate embeddings
         embeddings = np.array([])
@@ -234,77 +402,319 @@ def submit_notes():
         if entries:
             texts = [e[0] for e in entries]
             embeddings = np.array(embedder.get_embeddings(texts)).astype("float32")
-            suggestions = find_connections_and_generate_suggestions(entries, embeddings)
+            current_entry_store().add(entries, embeddings)
+            generated = match_note_entries(entries, embeddings)
+            suggestions = [suggestion_to_json(s) for s in note_store.add_suggestions(generated)]
         
         # Format processed notes for frontend
         processed_notes = []
         for nat in processed_nats:
-            processed_notes.append({
-                "id": str(nat["id"]),
-                "content": nat["original_note"],
-                "timestamp": datetime.now().isoformat(),
-                "sentiments": nat.get("sentiments", []),
-                "resources_needed": nat.get("resources_needed", []),
-                "resources_available": nat.get("resources_available", []),
-                "processed": True
-            })
+            processed_notes.append(processed_note_to_json(nat))
         
         response_data = {
             "processed_notes": processed_notes,
             "suggestions": suggestions
         }
-        print(f"DEBUG: Returning response with {len(processed_notes)} notes and {len(suggestions)} suggestions")
-        print(f"DEBUG: First suggestion sample: {suggestions[0] if suggestions else 'None'}")
+        logging.debug("Returning %d notes and %d suggestions", len(processed_notes), len(suggestions))
         return jsonify(response_data)
         
     except Exception as e:
         print(f"Error in submit_notes: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/suggestions', methods=['GET'])
+def processed_note_to_json(nat: Dict) -> Dict:
+    """Format a freshly processed NAT record for the frontend."""
+    return {
+        "id": str(nat["id"]),
+        "content": nat["original_note"],
+        "timestamp": nat["timestamp"],
+        "sentiments": nat.get("sentiments", []),
+        "resources_needed": nat.get("resources_needed", []),
+        "resources_available": nat.get("resources_available", []),
+        "subgraph_stored": nat.get("subgraph_stored", False),
+        "processed": True
+    }
+
+def match_note_entries(
+    entries: List[Tuple], embeddings: np.ndarray, top_k: int = 5, policy: MatchPolicy = None, tenant: Optional[str] = None
+) -> List[Dict]:
+    """
+    Suggestions pairing new entries with the stored entries of the opposite type.
+
+    Needs are searched against the stored availabilities and availabilities
+    against the stored needs, so matches reach every earlier submission while
+    the work per request grows with the number of new entries only. The
+    entries must already be in the entry index (matches within the batch count too).
+    Pairs the LLM failed on are left out. tenant selects the entry shard
+    (default: the request's).
+    """
+    with span("match"):
+        pairs = _match_pairs(entries, embeddings, top_k, policy or MATCH_POLICY, tenant)
+    if not pairs:
+        return []
+    known_texts = note_store.suggestion_texts([(n[0], a[0]) for n, a, _ in pairs])
+    generated = [generate_suggestion(n, a, score, known_texts) for n, a, score in pairs]
+    return [suggestion for suggestion in generated if suggestion is not None]
+
+def _match_pairs(entries: List[Tuple], embeddings: np.ndarray, top_k: int, policy: MatchPolicy, tenant: Optional[str] = None) -> List[Tuple]:
+    """(need entry, availability entry, score) pairs selected for suggestions, best first."""
+    store = current_entry_store(tenant)
+    candidates = {}
+    for kind, other_kind in (("need", "availability"), ("availability", "need")):
+        positions = [i for i, entry in enumerate(entries) if entry[1] == kind]
+        if not positions:
+            continue
+        for i, neighbours in zip(positions, store.search(embeddings[positions], top_k=top_k, kind=other_kind)):
+            for other, score in neighbours:
+                need_entry, availability_entry = (entries[i], other) if kind == "need" else (other, entries[i])
+                candidates.setdefault((need_entry, availability_entry), score)
+    if not candidates:
+        return []
+    
+    # select_pairs works on integer ids; number the distinct entries
+    ids = {}
+    need_ids = np.array([ids.setdefault(n, len(ids)) for n, _ in candidates])
+    availability_ids = np.array([ids.setdefault(a, len(ids)) for _, a in candidates])
+    by_id = list(ids)
+    need_ids, availability_ids, scores = select_pairs(
+        need_ids,
+        availability_ids,
+        np.array(list(candidates.values())),
+        np.array([n[2] for n, _ in candidates]),
+        np.array([a[2] for _, a in candidates]),
+        policy,
+    )
+    return [(by_id[n], by_id[a], float(score)) for n, a, score in zip(need_ids, availability_ids, scores)]
+
+def reanalyse_note(record: Dict) -> Dict:
+    """
+    Re-run NAT, embedding and matching for one stored note.
+
+    Only this note's NAT record, entries, vectors and suggestions are
+    replaced; suggestions whose (need, availability) pair is unchanged are
+    reused from the store rather than regenerated.
+    """
+    note_id = record["id"]
+    nat = process_note_with_nat(record["content"], note_id)
+    nat["timestamp"] = record["created_at"]
+    if nat.get("subgraph_stored"):
+        try:
+            with span("neo4j_link"):
+                get_subgraph_linker().link_notes([str(note_id)])
+        except Exception as e:
+            print(f"Warning: Could not link subgraphs across notes: {e}")
+    note_store.set_analysis(note_id, nat)
+    
+    entries = entries_for_nat(nat)
+    # The note's own shard, whichever tenant sent this request
+    store = current_entry_store(record.get("tenant"))
+    embeddings = np.zeros((0, store.dim), dtype="float32")
+    if entries:
+        embeddings = np.array(embedder.get_embeddings([e[0] for e in entries])).astype("float32")
+    store.replace_note(note_id, entries, embeddings)
+    
+    generated = match_note_entries(entries, embeddings, tenant=record.get("tenant")) if entries else []
+    note_store.delete_suggestions_for(note_id)
+    suggestions = [suggestion_to_json(s) for s in note_store.add_suggestions(generated)]
+    
+    note = processed_note_to_json(nat)
+    note["suggestions"] = suggestions
+    return note
+
+@api_bp.route('/api/suggestions', methods=['GET'])
 def get_suggestions():
-    """Get all existing suggestions."""
+    """Get stored suggestions: ?note_id= for one note, else a page by ?limit=&after=."""
     try:
-        # This would typically load from a database
-        # For now, return empty array as suggestions are generated per request
-        return jsonify([])
+        note_id = request.args.get('note_id')
+        if note_id:
+            return jsonify([suggestion_to_json(s) for s in note_store.suggestions_for(int(note_id))])
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+        after = request.args.get('after')
+        suggestions, _ = note_store.list_suggestions(limit=limit, after=int(after) if after else None)
+        return jsonify([suggestion_to_json(s) for s in suggestions])
+    except ValueError:
+        return jsonify({"error": "note_id, limit and after must be integers"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/notes/<note_id>/reprocess', methods=['POST'])
+@api_bp.route('/api/notes/<int:note_id>', methods=['GET'])
+def get_note(note_id):
+    """Get one note with its stored NAT record and suggestions."""
+    record = note_store.get(note_id)
+    if record is None:
+        return jsonify({"error": f"Note {note_id} not found"}), 404
+    note = note_to_json(record, note_store.analysis_for([note_id])[note_id])
+    note["suggestions"] = [suggestion_to_json(s) for s in note_store.suggestions_for(note_id)]
+    return jsonify(note)
+
+@api_bp.route('/api/notes/<int:note_id>/reprocess', methods=['POST'])
 def reprocess_note(note_id):
-    """Reprocess a specific note."""
+    """
+    Re-run NAT, embedding and matching for one note.
+
+    Its stored record, index entries and suggestions are replaced in place;
+    other notes are not re-embedded or re-matched.
+    """
     try:
-        # This would typically reload the note from database and reprocess
-        # For now, return a placeholder response
-        return jsonify({
-            "id": note_id,
-            "content": "Reprocessed note content",
-            "timestamp": datetime.now().isoformat(),
-            "sentiments": ["hopeful", "determined"],
-            "resources_needed": ["guidance"],
-            "resources_available": ["experience"],
-            "processed": True
-        })
+        record = note_store.get(note_id)
+        if record is None:
+            return jsonify({"error": f"Note {note_id} not found"}), 404
+        return jsonify(reanalyse_note(record))
+    except Exception as e:
+        print(f"Error in reprocess_note: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/api/notes/<int:note_id>', methods=['PUT'])
+def update_note(note_id):
+    """Edit a note's text and re-analyse just that note."""
+    try:
+        data = request.get_json() or {}
+        content = (data.get('content') or '').strip()
+        if not content:
+            return jsonify({"error": "Note content is required"}), 400
+        record = note_store.update(note_id, content)
+        if record is None:
+            return jsonify({"error": f"Note {note_id} not found"}), 404
+        if note_search is not None:
+            note_search.update(note_id, content)
+        return jsonify(reanalyse_note(record))
     except Exception as e:
+        print(f"Error in update_note: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/health', methods=['GET'])
+@api_bp.route('/api/notes/<int:note_id>', methods=['DELETE'])
+def delete_note(note_id):
+    """Delete a note with its entries, vectors, suggestions and subgraph."""
+    record = note_store.get(note_id)
+    if record is None or not note_store.delete(note_id):
+        return jsonify({"error": f"Note {note_id} not found"}), 404
+    # Entries live in the shard of the tenant that stored the note, not necessarily this request's
+    removed = current_entry_store(record.get("tenant")).remove_note(note_id)
+    if note_search is not None:
+        note_search.remove(note_id)
+    if neo4j_db.neo4j_handler is not None:
+        neo4j_db.neo4j_handler.delete_note_subgraph(str(note_id))
+        if subgraph_linker is not None:
+            subgraph_linker.forget_note(str(note_id))
+    return jsonify({"deleted": str(note_id), "entries_removed": removed})
+
+@api_bp.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint."""
+    """Health check endpoint (liveness: the process is up)."""
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
 
-@app.route('/api/notes', methods=['GET'])
+@api_bp.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Stage latencies, request latencies, cache and LLM error counters in the Prometheus text format."""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@api_bp.route('/api/debug/slow-requests', methods=['GET'])
+def slow_requests():
+    """The ?limit= slowest recent requests with their stage breakdown and profile file, when profiling is on."""
+    profiler = current_app.extensions.get("request_profiler")
+    if profiler is None:
+        return jsonify({"error": "Request profiling is disabled (set PROFILE_REQUESTS=true)"}), 404
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"slow_ms": profiler.slow_ms, "requests": profiler.slowest(limit)})
+
+@api_bp.route('/api/debug/profiles/<path:name>', methods=['GET'])
+def profile_file(name):
+    """Download a profile written by the request profiler (.collapsed or .prof)."""
+    profiler = current_app.extensions.get("request_profiler")
+    if profiler is None:
+        return jsonify({"error": "Request profiling is disabled (set PROFILE_REQUESTS=true)"}), 404
+    return send_from_directory(os.path.abspath(profiler.output_dir), name, as_attachment=True)
+
+@api_bp.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Entries, hits, misses and hit rate of the result caches (counters also in /api/metrics)."""
+    stats = {"suggestion_semantic": suggestion_cache.stats() if suggestion_cache is not None else None}
+    if graph_rag is not None:
+        stats["graphrag"] = graph_rag.query_cache.stats()
+        stats["graphrag_semantic"] = graph_rag.semantic_cache.stats()
+    return jsonify(stats)
+
+@api_bp.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 once the core notes path can serve requests."""
+    components = {
+        "embedder": embedder is not None,
+        "faiss_index": indexer is not None or entry_shards is not None,
+        "llm_clients": nat_filler is not None and sgllm is not None,
+        "neo4j": "initialized" if neo4j_db.neo4j_handler is not None else "not_loaded",
+        "graphrag": _graph_rag_status,
+    }
+    status = 200 if _services_ready else 503
+    return jsonify({
+        "ready": _services_ready,
+        "components": components,
+        "timestamp": datetime.now().isoformat()
+    }), status
+
+def note_to_json(record: Dict, analysis: Dict = None) -> Dict:
+    """Format a stored note record for the frontend."""
+    note = {
+        "id": str(record["id"]),
+        "content": record["content"],
+        "timestamp": record["created_at"],
+        "content_hash": record["content_hash"]
+    }
+    note.update(analysis or {})
+    return note
+
+@api_bp.route('/api/notes', methods=['GET'])
 def get_notes():
-    """Get all notes."""
+    """
+    Get one page of notes: ?limit=50&after=<cursor>
+
+    Optional filters ?need=, ?availability=, ?sentiment= match notes whose NAT
+    fields contain the text. ?q= ranks notes by combined keyword and vector
+    search; its cursor is a position in that ranking. Responses carry an ETag
+    derived from the store version, so an unchanged page returns 304.
+    """
     try:
-        with open('notes/user_notes.json', 'r') as f:
-            data = json.load(f)
-        return jsonify(data)
-    except FileNotFoundError:
-        return jsonify({"notes": []})
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        after = request.args.get('after')
+        after = int(after) if after else None
+    except ValueError:
+        return jsonify({"error": "limit and after must be integers"}), 400
+    filters = {name: request.args[name] for name in FILTER_FIELDS if request.args.get(name)}
+    query = request.args.get('q', '').strip()
+    
+    etag = f"{note_store.version()}-{hashlib.sha1(request.query_string).hexdigest()[:16]}"
+    if request.if_none_match.contains(etag):
+        CACHE_HITS.inc(cache="notes_etag")
+        response = make_response("", 304)
+        response.set_etag(etag)
+        return response
+    CACHE_MISSES.inc(cache="notes_etag")
+    
+    if query:
+        # Search indexes catch up with notes added since the last query
+        search = get_note_search()
+        search.sync(note_store)
+        ranked = [note_id for note_id, _ in search.search(query, top_k=SEARCH_CANDIDATES)]
+        if filters:
+            ranked = note_store.filter_ids(ranked, filters)
+        offset = after or 0
+        records = note_store.get_many(ranked[offset:offset + limit])
+        next_cursor = offset + limit if len(ranked) > offset + limit else None
+    else:
+        records, next_cursor = note_store.list(limit=limit, after=after, filters=filters)
+    
+    analysis = note_store.analysis_for([r["id"] for r in records])
+    response = jsonify({
+        "notes": [note_to_json(r, analysis[r["id"]]) for r in records],
+        "next_cursor": str(next_cursor) if next_cursor is not None else None
+    })
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
-@app.route('/api/notes', methods=['POST'])
+@api_bp.route('/api/notes', methods=['POST'])
 def add_note():
     """Add a new note."""
     try:
@@ -314,34 +724,30 @@ def add_note():
         if not note_text:
             return jsonify({"error": "Note text is required"}), 400
         
-        # Load existing notes
-        try:
-            with open('notes/user_notes.json', 'r') as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            data = {"notes": []}
-        
-        # Add new note
-        data["notes"].append(note_text)
+        # Append to the note store (a single INSERT; safe under concurrent writers)
+        record = note_store.add(note_text, tenant=request_tenant())
         
-        # Save updated notes
-        with open('notes/user_notes.json', 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        # Update GraphRAG if available
-        if graph_rag:
+        # Update GraphRAG if it has already been loaded (never loaded just for this)
+        if graph_rag is not None:
             try:
-                graph_rag.process_documents(data["notes"])
+                graph_rag.process_documents(note_store.texts())
                 print("GraphRAG updated with new note")
             except Exception as e:
                 print(f"Warning: Could not update GraphRAG: {e}")
         
-        return jsonify({"message": "Note added successfully", "note": note_text})
+        return jsonify({"message": "Note added successfully", "note": note_to_json(record)})
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/suggestions', methods=['POST'])
+def suggestion_cache_key(need: str, availability: str) -> np.ndarray:
+    """
+    Semantic cache key of a (need, availability) pair: both embeddings side by side. The
+    cache compares each on its own, so a hit needs a similar need and a similar availability.
+    """
+    return np.asarray(embedder.get_embeddings([need, availability]), dtype="float32").reshape(-1)
+
+@api_bp.route('/api/suggestions', methods=['POST'])
 def generate_suggestions():
     """Generate suggestions based on needs and availability."""
     try:
@@ -352,12 +758,22 @@ def generate_suggestions():
         if not need or not availability:
             return jsonify({"error": "Both need and availability are required"}), 400
         
-        # Generate basic suggestion
-        suggestion = sgllm.generate(need, availability)
+        # Generate basic suggestion, unless a near-paraphrase of the pair was answered before
+        cached = None
+        if suggestion_cache.enabled:
+            key = suggestion_cache_key(need, availability)
+            cached = suggestion_cache.lookup(key)
+        if cached is not None:
+            suggestion = cached[0]
+        else:
+            suggestion = sgllm.generate(need, availability)
+            # A failed generation is returned once but never served to paraphrases
+            if suggestion_cache.enabled and not is_failed_suggestion(suggestion):
+                suggestion_cache.put(key, suggestion)
         
-        # Enhance with GraphRAG if available
+        # Enhance with GraphRAG if it has already been loaded
         enhanced_suggestion = suggestion
-        if graph_rag:
+        if graph_rag is not None:
             try:
                 from graph_rag_integration import enhance_existing_suggestions
                 enhanced_suggestion = enhance_existing_suggestions(graph_rag, need, availability)
@@ -367,16 +783,18 @@ def generate_suggestions():
         return jsonify({
             "suggestion": enhanced_suggestion,
             "need": need,
-            "availability": availability
+            "availability": availability,
+            "cached": cached is not None
         })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/graphrag/query', methods=['POST'])
+@api_bp.route('/api/graphrag/query', methods=['POST'])
 def graphrag_query():
     """Query the GraphRAG system."""
-    if not GRAPHRAG_AVAILABLE or not graph_rag:
+    graph_rag = get_graph_rag()
+    if graph_rag is None:
         return jsonify({"error": "GraphRAG is not available"}), 503
     
     try:
@@ -403,9 +821,10 @@ def graphrag_query():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/graphrag/info', methods=['GET'])
+@api_bp.route('/api/graphrag/info', methods=['GET'])
 def graphrag_info():
     """Get information about the GraphRAG system."""
+    graph_rag = get_graph_rag()
     if not GRAPHRAG_AVAILABLE:
         return jsonify({"error": "GraphRAG is not available"}), 503
     
@@ -420,23 +839,19 @@ def graphrag_info():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/graphrag/process', methods=['POST'])
+@api_bp.route('/api/graphrag/process', methods=['POST'])
 def graphrag_process():
     """Process documents for GraphRAG."""
-    if not GRAPHRAG_AVAILABLE:
+    graph_rag = get_graph_rag()
+    if graph_rag is None:
         return jsonify({"error": "GraphRAG is not available"}), 503
     
     try:
         data = request.get_json() or {}
         notes = data.get("notes")
         if notes is None:
-            # Fallback to file
-            try:
-                with open('notes/user_notes.json', 'r') as f:
-                    file_data = json.load(f)
-                    notes = file_data.get("notes", [])
-            except FileNotFoundError:
-                notes = []
+            # Fallback to the note store
+            notes = note_store.texts()
         
         if not notes:
             return jsonify({"error": "No notes found to process"}), 400
@@ -452,7 +867,7 @@ def graphrag_process():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/nat/fill', methods=['POST'])
+@api_bp.route('/api/nat/fill', methods=['POST'])
 def nat_fill():
     """Fill NAT (Needs, Availability, Tasks) from text."""
     try:
@@ -474,6 +889,10 @@ def nat_fill():
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
     print("Starting HiddenThread API server...")
+    app = create_app()
     print(f"Environment variables loaded: API_KEY={'✓' if API_KEY else '✗'}")
-    app.run(debug=True, port=3001, host='0.0.0.0')
\ No newline at end of file
+    debug = os.getenv("FLASK_DEBUG", "false").lower() == "true"
+    # The reloader would import this module twice and load every model twice
+    app.run(debug=debug, use_reloader=False, port=3001, host='0.0.0.0', threaded=True)
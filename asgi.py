@@ -0,0 +1,14 @@
+"""
+ASGI entry point, for running the Flask app under uvicorn workers.
+
+    WEB_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+
+Requires asgiref. Requests are handed to a thread pool, so WEB_THREADS
+does not apply here; concurrency comes from the ASGI bridge.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+from wsgi import app as wsgi_app
+
+app = WsgiToAsgi(wsgi_app)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Embedder backends compared: load time, encode throughput and process RSS
+
+Each backend (torch, onnx, onnx-int8) runs in a fresh interpreter, so load
+time includes importing its runtime (torch or onnxruntime) and the peak RSS
+is that backend's alone. Throughput is measured on synthetic notes, cut to
+entry-sized texts, at the API's batch size.
+
+Export the ONNX models first: python -m embeddings.onnx_backend
+
+Usage: python benchmarks/bench_embed_backends.py [--backends torch,onnx,onnx-int8] [--texts 2000]
+       [--batch-size 32] [--threads 0] [--model NAME] [--onnx-dir models/all-MiniLM-L6-v2-onnx]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def worker(backend: str, model: str, n_texts: int, batch_size: int, onnx_dir: str) -> dict:
+    """Runs in the child process; returns its measurements."""
+    import resource
+
+    start = time.perf_counter()
+    from embeddings.embedder import Embedder
+    embedder = Embedder(model, backend=backend, onnx_dir=onnx_dir)
+    load_seconds = time.perf_counter() - start
+    rss_loaded_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    from benchmarks.corpus import synthetic_notes
+    texts = [note[:120] for note in synthetic_notes(n_texts)]
+    embedder.get_embeddings(texts[:batch_size], batch_size=batch_size)  # warm up
+    start = time.perf_counter()
+    embedder.get_embeddings(texts, batch_size=batch_size)
+    encode_seconds = time.perf_counter() - start
+    single = []
+    for text in texts[:200]:
+        t0 = time.perf_counter()
+        embedder.get_embedding(text)
+        single.append(time.perf_counter() - t0)
+    single.sort()
+    return {
+        "backend": backend,
+        "load_s": load_seconds,
+        "texts_per_second": n_texts / encode_seconds,
+        "single_p50_ms": single[len(single) // 2] * 1000,
+        "rss_loaded_mb": rss_loaded_mb,
+        "rss_peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "torch_imported": "torch" in sys.modules,
+    }
+
+
+def run_backend(backend: str, args) -> dict:
+    env = dict(os.environ, WORKER_CPU_THREADS=str(args.threads))
+    command = [sys.executable, os.path.abspath(__file__), "--worker", backend, "--model", args.model, "--texts", str(args.texts),
+               "--batch-size", str(args.batch_size), "--onnx-dir", args.onnx_dir]
+    result = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        return {"backend": backend, "error": (result.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (WORKER_CPU_THREADS; 0: runtime default)")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2", help="Model for the torch backend")
+    parser.add_argument("--onnx-dir", default="models/all-MiniLM-L6-v2-onnx")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        if args.threads:
+            os.environ["WORKER_CPU_THREADS"] = str(args.threads)
+            from utils.parallel_ingest import set_torch_threads
+            set_torch_threads(args.threads)
+        print(json.dumps(worker(args.worker, args.model, args.texts, args.batch_size, args.onnx_dir)))
+        return
+
+    print(f"{args.texts} texts, batch size {args.batch_size}")
+    print(f"{'backend':>10} {'load s':>7} {'texts/s':>8} {'1-text ms':>9} {'RSS MB':>7} {'peak MB':>8} {'torch':>6}")
+    results = []
+    for backend in args.backends.split(","):
+        row = run_backend(backend, args)
+        results.append(row)
+        if "error" in row:
+            print(f"{backend:>10} failed: {row['error']}")
+            continue
+        print(f"{backend:>10} {row['load_s']:>7.2f} {row['texts_per_second']:>8.0f} {row['single_p50_ms']:>9.2f} "
+              f"{row['rss_loaded_mb']:>7.0f} {row['rss_peak_mb']:>8.0f} {str(row['torch_imported']):>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"texts": args.texts, "batch_size": args.batch_size, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Embedding throughput vs. latency at increasing concurrency, with and without micro-batching
+
+Every client thread sends back-to-back requests of a few short texts (the
+needs and availabilities of one note), as concurrent POST /api/notes
+requests do. "direct" lets each thread call Embedder.get_embeddings itself;
+"batched" goes through BatchingEmbedder, which merges the queued requests
+into one model call per batch.
+
+Usage: python benchmarks/bench_embed_batching.py [--clients 1,2,4,8,16,32,64] [--seconds 5]
+       [--texts-per-request 3] [--max-batch 64] [--max-wait-ms 5] [--torch-threads 0]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import load_templates
+from embeddings.batching import BATCH_TEXTS, BatchingEmbedder
+from utils.parallel_ingest import set_torch_threads
+
+
+def run_clients(embedder, n_clients: int, seconds: float, texts_per_request: int, sentences):
+    """Latencies (seconds) of all requests completed by n_clients threads in the time window."""
+    stop = threading.Event()
+    latencies = [[] for _ in range(n_clients)]
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        while not stop.is_set():
+            texts = [sentences[j] for j in rng.integers(0, len(sentences), texts_per_request)]
+            start = time.perf_counter()
+            embedder.get_embeddings(texts)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return [x for per_client in latencies for x in per_client], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,2,4,8,16,32,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measurement window per run")
+    parser.add_argument("--texts-per-request", type=int, default=3)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--torch-threads", type=int, default=0, help="torch intra-op threads (0: torch default)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    from embeddings.embedder import Embedder
+    set_torch_threads(args.torch_threads)
+    templates = load_templates()
+    sentences = templates["needs"] + templates["availabilities"]
+    direct = Embedder()
+    batched = BatchingEmbedder(direct, args.max_batch, args.max_wait_ms, args.torch_threads)
+    direct.get_embeddings(sentences[:8])  # warm up
+
+    print(f"{args.texts_per_request} texts per request, {args.seconds:.0f} s per run, "
+          f"batches up to {args.max_batch} texts / {args.max_wait_ms:g} ms")
+    print(f"{'clients':>7} {'mode':>8} {'texts/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'avg batch':>9}")
+    results = []
+    for n_clients in [int(c) for c in args.clients.split(",")]:
+        for mode, embedder in (("direct", direct), ("batched", batched)):
+            calls_before, texts_before = BATCH_TEXTS.count(), BATCH_TEXTS.sum()
+            latencies, elapsed = run_clients(embedder, n_clients, args.seconds, args.texts_per_request, sentences)
+            calls = BATCH_TEXTS.count() - calls_before
+            avg_batch = (BATCH_TEXTS.sum() - texts_before) / calls if calls else args.texts_per_request
+            row = {
+                "clients": n_clients,
+                "mode": mode,
+                "texts_per_second": len(latencies) * args.texts_per_request / elapsed,
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p99_ms": float(np.percentile(latencies, 99) * 1000),
+                "avg_batch_texts": avg_batch,
+            }
+            results.append(row)
+            print(f"{n_clients:>7} {mode:>8} {row['texts_per_second']:>9.0f} {row['p50_ms']:>8.1f} "
+                  f"{row['p99_ms']:>8.1f} {avg_batch:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
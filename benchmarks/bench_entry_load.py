@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Load time of the entry table: entries.json (json.load) vs entries.bin (memory-mapped)
+
+Builds a synthetic table of n entries (no FAISS index, no model), saves it in
+both formats and times loading each, including the checksum of the vector ids
+that EntryStore compares against the index.
+
+With --requests, times what one note submission costs an EntryStore of each
+given size instead: the writer's save (a change-log append) and another
+worker catching up on its next search, next to a full rewrite of the index
+and table for comparison.
+
+Usage: python benchmarks/bench_entry_load.py [n_entries]
+       python benchmarks/bench_entry_load.py --requests 10000,100000,300000
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import synthetic_notes
+from vector_store.entry_store import EntryStore, EntryTable
+
+
+def build_table(n_entries: int, entries_per_note: int = 4) -> EntryTable:
+    texts = synthetic_notes(min(n_entries, 10_000))
+    table = EntryTable()
+    for start in range(0, n_entries, entries_per_note):
+        note_id = start // entries_per_note + 1
+        batch = [
+            (texts[i % len(texts)][:60], "need" if i % 2 else "availability", note_id)
+            for i in range(start, min(start + entries_per_note, n_entries))
+        ]
+        table.append(batch, np.arange(start, start + len(batch), dtype="int64"))
+    return table
+
+
+def best_of(fn, repeats: int = 5) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def random_vectors(n: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, 384)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def bench_requests(n_entries: int, requests: int = 50) -> dict:
+    """Median per-submission cost (ms) for a writer and an observing worker over a store of n_entries."""
+    table = build_table(n_entries)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = (os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        writer = EntryStore(*paths)
+        writer.add(table.entries(), random_vectors(n_entries, 0), save=False)
+        writer.save()
+        observer = EntryStore(*paths)
+        observer.note_entries(0)
+
+        vectors = random_vectors(4 * requests, 2)
+        next_note = table.entries()[-1][2] + 1
+        write_times, catch_up_times = [], []
+        for i in range(requests):
+            note = [(f"request {i} need {j}", "need" if j % 2 else "availability", next_note + i) for j in range(4)]
+            start = time.perf_counter()
+            writer.add(note, vectors[4 * i:4 * i + 4])
+            write_times.append(time.perf_counter() - start)
+            # A read that costs nothing itself, so only catching up is timed
+            start = time.perf_counter()
+            assert observer.note_entries(next_note + i) == note
+            catch_up_times.append(time.perf_counter() - start)
+
+        rewrite_time = best_of(writer.save, repeats=3)
+    return {
+        "entries": n_entries,
+        "write_ms": statistics.median(write_times) * 1000,
+        "catch_up_ms": statistics.median(catch_up_times) * 1000,
+        "rewrite_ms": rewrite_time * 1000,
+    }
+
+
+def main_requests(sizes):
+    print(f"{'entries':>10} {'save (ms)':>10} {'catch-up (ms)':>14} {'full rewrite (ms)':>18}")
+    for n_entries in sizes:
+        result = bench_requests(n_entries)
+        print(f"{result['entries']:>10} {result['write_ms']:>10.2f} {result['catch_up_ms']:>14.2f} {result['rewrite_ms']:>18.1f}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--requests":
+        main_requests([int(n) for n in sys.argv[2].split(",")])
+        return
+    n_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Building {n_entries} synthetic entries...")
+    table = build_table(n_entries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "entries.json")
+        bin_path = os.path.join(tmp, "entries.bin")
+        with open(json_path, "w") as f:
+            json.dump(table.entries(), f)
+        table.save(bin_path)
+
+        def load_json():
+            with open(json_path) as f:
+                return json.load(f)
+
+        json_time = best_of(load_json, repeats=2)
+        bin_time = best_of(lambda: EntryTable.load(bin_path))
+        loaded = EntryTable.load(bin_path)
+        assert loaded is not None and loaded.entry(loaded.size - 1) == table.entry(table.size - 1)
+
+        print(f"{'format':>12} {'size (MB)':>10} {'load (ms)':>10}")
+        print(f"{'json':>12} {os.path.getsize(json_path) / 1e6:>10.1f} {json_time * 1000:>10.1f}")
+        print(f"{'binary':>12} {os.path.getsize(bin_path) / 1e6:>10.1f} {bin_time * 1000:>10.1f}")
+        print(f"Speedup: {json_time / bin_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
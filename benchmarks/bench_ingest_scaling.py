@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for multi-process GraphRAG ingestion (1 to N cores)
+
+Times the two parallel stages, chunking + concept extraction and tiled edge
+building, on a synthetic corpus. Embeddings are random unit vectors so the
+numbers isolate the parallel stages from the model.
+
+Usage: python benchmarks/bench_ingest_scaling.py [n_docs] [max_workers]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import synthetic_notes
+from utils.parallel_ingest import similarity_edges, split_and_extract
+
+
+def worker_counts(max_workers: int):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def main():
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    documents = synthetic_notes(n_docs)
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((n_docs, 384)).astype("float32")
+
+    print(f"Ingestion scaling on {n_docs} synthetic notes")
+    print(f"{'workers':>8} {'split+concepts (s)':>20} {'speedup':>8} {'edges (s)':>10} {'speedup':>8}")
+    base_text = base_edges = None
+    for workers in worker_counts(max_workers):
+        text_time = None
+        try:
+            start = time.perf_counter()
+            split_and_extract(documents, chunk_size=300, chunk_overlap=50, n_workers=workers)
+            text_time = time.perf_counter() - start
+        except ImportError as e:
+            print(f"(split stage skipped: {e})")
+
+        start = time.perf_counter()
+        rows, _, _ = similarity_edges(embeddings, threshold=0.2, n_workers=workers)
+        edge_time = time.perf_counter() - start
+
+        base_text = base_text or text_time
+        base_edges = base_edges or edge_time
+        text_cell = f"{text_time:>20.2f} {base_text / text_time:>7.2f}x" if text_time else f"{'-':>20} {'-':>8}"
+        print(f"{workers:>8} {text_cell} {edge_time:>10.2f} {base_edges / edge_time:>7.2f}x  ({len(rows)} edges)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the notes -> suggestions pipelines with a stubbed LLM
+
+Runs each pipeline on synthetic corpora (dummy_data.json templates) against
+the local Gemini stub (benchmarks/gemini_stub.py) and reports wall time per
+stage, so changes to any stage show up in one comparable number:
+
+    api       POST /api/notes in batches (create_app + Flask test client)
+    cli       main.py rebuilding the index from the notes database
+    graphrag  GraphRAGIntegration.process_documents over the notes
+
+Stages: startup, nat, graph, split, embed, index, match, suggest (and neo4j
+with --neo4j). Times are exclusive: a suggestion generated inside matching
+counts as suggest, not match. Whatever is left (request handling, SQLite,
+JSON) is reported as other.
+
+Every (pipeline, size) runs in a fresh interpreter inside a temporary working
+directory, so the relative notes/ and vector_store/ paths start empty and the
+repository's own data is never touched. Neo4j is disabled unless --neo4j is
+given; the cli pipeline then skips its LlamaIndex graph step. Pipelines whose
+dependencies are not installed are reported as skipped.
+
+Usage:
+    python benchmarks/bench_pipeline.py --sizes 100,1000 --output bench.json
+    python benchmarks/bench_pipeline.py --sizes 100,1000 --compare bench.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import PROJECT_ROOT, TEMPLATES_PATH, load_templates, synthetic_notes
+
+PIPELINES = ("api", "cli", "graphrag")
+STAGES = ("startup", "nat", "graph", "split", "embed", "index", "match", "suggest", "neo4j")
+
+
+class StageTimer:
+    """Exclusive wall time per stage, collected by wrapping the functions that implement each stage."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._children = []  # time spent in nested stages, one slot per active call
+
+    def run(self, stage: str, fn, *args, **kwargs):
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds[stage] += elapsed - self._children.pop()
+            self.calls[stage] += 1
+            if self._children:
+                self._children[-1] += elapsed
+
+    def wrap(self, owner, attr: str, stage: str):
+        """Replace owner.attr (a function or method) by a timed version."""
+        original = getattr(owner, attr)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            return self.run(stage, original, *args, **kwargs)
+
+        setattr(owner, attr, timed)
+
+    def report(self, total: float) -> Dict:
+        stages = {stage: {"seconds": round(self.seconds[stage], 6), "calls": self.calls[stage]}
+                  for stage in STAGES if stage in self.seconds}
+        stages["other"] = {"seconds": round(max(total - sum(self.seconds.values()), 0.0), 6), "calls": 0}
+        return stages
+
+
+# --- Pipelines (run inside the worker process) ---
+
+def run_api(notes: List[str], batch: int, timer: StageTimer, neo4j: bool):
+    api = timer.run("startup", __import__, "api")
+    from embeddings.embedder import Embedder
+    from graph_db.subgraph_generator import SubgraphGenerator
+    from graph_db.subgraph_linker import SubgraphLinker
+    from llm.sgllm import SuggestionGenerator
+    from nat.nat_filler import NATFiller
+    from vector_store.entry_store import EntryStore
+
+    timer.wrap(NATFiller, "fill_nat", "nat")
+    timer.wrap(SubgraphGenerator, "generate_subgraph", "graph")
+    timer.wrap(SubgraphLinker, "link_notes", "graph")
+    timer.wrap(Embedder, "get_embeddings", "embed")
+    timer.wrap(EntryStore, "add", "index")
+    timer.wrap(api, "match_note_entries", "match")
+    timer.wrap(SuggestionGenerator, "generate", "suggest")
+
+    app = timer.run("startup", api.create_app)
+    client = app.test_client()
+    for start in range(0, len(notes), batch):
+        response = client.post("/api/notes", json={"notes": notes[start:start + batch]})
+        if response.status_code != 200:
+            raise RuntimeError(f"POST /api/notes returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+
+def run_cli(notes: List[str], batch: int, timer: StageTimer, neo4j: bool):
+    if not neo4j:
+        # graph_db.llama_graph connects to Neo4j and OpenAI on import; keep the step as a no-op
+        llama_graph = types.ModuleType("graph_db.llama_graph")
+        llama_graph.add_note_to_graph = lambda note_text: None
+        sys.modules["graph_db.llama_graph"] = llama_graph
+
+    main = timer.run("startup", __import__, "main")
+    from embeddings.embedder import Embedder
+    from llm.sgllm import SuggestionGenerator
+    from nat.nat_filler import NATFiller
+    from storage.note_store import NoteStore
+    from vector_store.entry_store import EntryStore
+
+    NoteStore(main.NOTES_DB_PATH).add_many(notes)
+    timer.wrap(NATFiller, "fill_nat", "nat")
+    timer.wrap(main, "add_note_to_graph", "graph")
+    timer.wrap(Embedder, "get_embeddings", "embed")
+    timer.wrap(EntryStore, "add", "index")
+    timer.wrap(main, "find_and_generate_suggestions", "match")
+    timer.wrap(SuggestionGenerator, "generate", "suggest")
+    timer.wrap(Embedder, "__init__", "startup")
+    main.main()
+
+
+def run_graphrag(notes: List[str], batch: int, timer: StageTimer, neo4j: bool):
+    graph_rag_integration = timer.run("startup", __import__, "graph_rag_integration")
+    if not graph_rag_integration.GRAPHRAG_AVAILABLE:
+        raise ImportError("langchain is not installed")
+    from graph_rag_integration import DocumentProcessor, GraphRAGConfig, GraphRAGIntegration, KnowledgeGraph
+
+    timer.wrap(DocumentProcessor, "split_documents", "split")
+    timer.wrap(graph_rag_integration, "split_and_extract", "split")
+    timer.wrap(DocumentProcessor, "embed", "embed")
+    timer.wrap(DocumentProcessor, "build_index", "index")
+    timer.wrap(KnowledgeGraph, "build_graph", "graph")
+    if neo4j:
+        timer.wrap(KnowledgeGraph, "_store_in_neo4j", "neo4j")
+    else:
+        KnowledgeGraph._store_in_neo4j = lambda self, splits: None
+
+    integration = timer.run("startup", GraphRAGIntegration, GraphRAGConfig())
+    integration.process_documents(notes)
+
+
+RUNNERS = {"api": run_api, "cli": run_cli, "graphrag": run_graphrag}
+
+
+def worker(args) -> Dict:
+    """Run one pipeline on one corpus in this process (cwd is a scratch directory)."""
+    os.makedirs("notes", exist_ok=True)
+    os.makedirs("vector_store", exist_ok=True)
+    notes = synthetic_notes(args.size, templates=load_templates(args.templates))
+    timer = StageTimer()
+    start = time.perf_counter()
+    try:
+        RUNNERS[args.worker](notes, args.batch, timer, args.neo4j)
+    except ImportError as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    total = time.perf_counter() - start
+    return {"total_seconds": round(total, 6), "notes_per_second": round(len(notes) / total, 3), "stages": timer.report(total)}
+
+
+# --- Driver ---
+
+def run_one(pipeline: str, size: int, args, env: Dict) -> Dict:
+    command = [sys.executable, os.path.abspath(__file__), "--worker", pipeline, "--size", str(size),
+               "--batch", str(args.batch), "--templates", args.templates]
+    if args.neo4j:
+        command.append("--neo4j")
+    with tempfile.TemporaryDirectory() as scratch:
+        result = subprocess.run(command, cwd=scratch, env=env, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode or not lines:
+        error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"error": error}
+    return json.loads(lines[-1])
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def stage_summary(stages: Dict) -> str:
+    return "  ".join(f"{name} {value['seconds']:.2f}" for name, value in stages.items() if value["seconds"] >= 0.005)
+
+
+def print_comparison(runs: List[Dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(run["pipeline"], run["notes"]): run for run in baseline["runs"] if "stages" in run}
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit') or '?'}): time now / before")
+    for run in runs:
+        old = before.get((run["pipeline"], run["notes"]))
+        if "stages" not in run or old is None:
+            continue
+        ratios = [f"total {run['total_seconds'] / old['total_seconds']:.2f}x"]
+        for stage, value in run["stages"].items():
+            old_seconds = old["stages"].get(stage, {}).get("seconds", 0.0)
+            if old_seconds >= 0.005:
+                ratios.append(f"{stage} {value['seconds'] / old_seconds:.2f}x")
+        print(f"{run['pipeline']:>9} {run['notes']:>7}  " + "  ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated corpus sizes (notes)")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES))
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stub LLM latency per call")
+    parser.add_argument("--batch", type=int, default=100, help="Notes per POST /api/notes")
+    parser.add_argument("--templates", default=TEMPLATES_PATH, help="Need/availability templates (dummy_data.json format)")
+    parser.add_argument("--neo4j", action="store_true", help="Keep the Neo4j steps (needs a running database)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="Print time ratios against an earlier --output file")
+    parser.add_argument("--worker", choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.templates = os.path.abspath(args.templates)
+
+    if args.worker:
+        # Pipelines print progress freely; only the result line goes to stdout
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        result = worker(args)
+        stdout.write(json.dumps(result) + "\n")
+        return
+
+    from benchmarks.gemini_stub import GeminiStub
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    pipelines = [p for p in args.pipelines.split(",") if p]
+    runs = []
+    with GeminiStub(latency=args.latency_ms / 1000, templates=load_templates(args.templates)) as stub:
+        env = dict(os.environ, GEMINI_API_BASE=stub.url, GEMINI_API_KEY="benchmark",
+                   ENABLE_NEO4J="true" if args.neo4j else "false")
+        print(f"Gemini stub at {stub.url}, {args.latency_ms:g} ms per call")
+        print(f"{'pipeline':>9} {'notes':>7} {'total s':>9} {'notes/s':>9}  stages (s)")
+        for pipeline in pipelines:
+            for size in sizes:
+                calls_before = dict(stub.calls)
+                result = run_one(pipeline, size, args, env)
+                run = {"pipeline": pipeline, "notes": size, **result,
+                       "llm_calls": {kind: stub.calls[kind] - calls_before[kind] for kind in stub.calls}}
+                runs.append(run)
+                if "stages" in run:
+                    print(f"{pipeline:>9} {size:>7} {run['total_seconds']:>9.2f} {run['notes_per_second']:>9.1f}  "
+                          f"{stage_summary(run['stages'])}")
+                else:
+                    print(f"{pipeline:>9} {size:>7}  {'skipped' if 'skipped' in run else 'failed'}: "
+                          f"{run.get('skipped') or run.get('error')}")
+                    break
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "config": {"sizes": sizes, "latency_ms": args.latency_ms, "batch": args.batch,
+                           "templates": os.path.relpath(args.templates, PROJECT_ROOT), "neo4j": args.neo4j},
+                "runs": runs,
+            }, f, indent=2)
+    if args.compare:
+        print_comparison(runs, args.compare)
+
+
+if __name__ == "__main__":
+    main()
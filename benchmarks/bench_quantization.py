@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Memory, QPS and recall@k of the entry store's vector storage modes
+
+Runs the API's match workload: every query is a "need" entry searched against
+all entries with top_k=5, as match_note_entries does. Recall@k is measured
+against the exact float32 store. Quantized modes are run with each rerank
+factor: 1 is the quantized ranking with exact scores, 4 the default over-fetch.
+
+Vectors come from the real embedder with --embed, otherwise from a synthetic
+topic model (unit vectors scattered around a few hundred topic centres), which
+has the near-duplicate structure of template-generated notes.
+
+Usage: python benchmarks/bench_quantization.py [--entries 100000] [--queries 1000] [--embed]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import synthetic_notes
+from vector_store.entry_store import EntryStore
+from vector_store.quantization import STORAGE_MODES
+
+
+def synthetic_vectors(n: int, dim: int = 384, topics: int = 300, spread: float = 0.6, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim)).astype("float32")
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    noise = rng.standard_normal((n, dim)).astype("float32") / np.sqrt(dim)
+    vectors = centres[rng.integers(0, topics, n)] + spread * noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_entries(n: int):
+    """n (text, kind, note_id) entries, four per note, alternating need / availability."""
+    texts = synthetic_notes(min(n, 10_000))
+    return [(texts[i % len(texts)][:80], "need" if i % 2 == 0 else "availability", i // 4 + 1) for i in range(n)]
+
+
+def run_mode(tmp: str, storage: str, factor: int, entries, vectors, queries, top_k: int):
+    directory = os.path.join(tmp, f"{storage}-{factor}")
+    os.makedirs(directory)
+    index_path = os.path.join(directory, "ht.index")
+    store = EntryStore(
+        index_path, os.path.join(directory, "entries.bin"), None,
+        storage=storage, rerank_factor=factor, compact_ratio=1.0,
+    )
+    store.add(entries, vectors)
+    index_mb = os.path.getsize(index_path) / 1e6
+    side_mb = os.path.getsize(store.vectors_path) / 1e6 if store.vector_file is not None else 0.0
+
+    store.search(queries[:10], top_k)  # warm up
+    start = time.perf_counter()
+    results = store.search(queries, top_k)
+    elapsed = time.perf_counter() - start
+    found = [[entry for entry, _ in hits] for hits in results]
+    return found, {"index_mb": index_mb, "mmap_mb": side_mb, "qps": len(queries) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--factors", default="1,4,16", help="Comma-separated rerank factors")
+    parser.add_argument("--embed", action="store_true", help="Embed the entries with the real model")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    entries = build_entries(args.entries)
+    if args.embed:
+        from embeddings.embedder import Embedder
+        vectors = np.asarray(Embedder().get_embeddings([e[0] for e in entries]), dtype="float32")
+    else:
+        vectors = synthetic_vectors(args.entries)
+    need_rows = np.array([i for i, e in enumerate(entries) if e[1] == "need"])
+    queries = vectors[np.random.default_rng(1).choice(need_rows, args.queries, replace=False)]
+
+    print(f"Match workload: {args.queries} need queries against {args.entries} entries, top_k={args.top_k}")
+    print(f"{'storage':>8} {'rerank':>7} {'index MB':>9} {'mmap MB':>8} {'QPS':>8} {'recall@k':>9}")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        exact, stats = run_mode(tmp, "float32", 1, entries, vectors, queries, args.top_k)
+        runs = [("float32", 1, exact, stats)]
+        for storage in STORAGE_MODES[1:]:
+            for factor in [int(f) for f in args.factors.split(",")]:
+                found, stats = run_mode(tmp, storage, factor, entries, vectors, queries, args.top_k)
+                runs.append((storage, factor, found, stats))
+        for storage, factor, found, stats in runs:
+            recall = np.mean([len(set(f) & set(e)) / max(len(e), 1) for f, e in zip(found, exact)])
+            print(f"{storage:>8} {factor:>7} {stats['index_mb']:>9.1f} {stats['mmap_mb']:>8.1f} "
+                  f"{stats['qps']:>8.0f} {recall:>9.3f}")
+            results.append({"storage": storage, "rerank_factor": factor, "recall_at_k": float(recall), **stats})
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"entries": args.entries, "queries": args.queries, "top_k": args.top_k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark: import time per module, measured with `python -X importtime`
+
+Each target is imported in a fresh interpreter. Reports the total import time
+and the heaviest modules by cumulative time.
+
+Usage: python benchmarks/bench_startup.py [module ...] [--top N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STDLIB_MODULES = set(getattr(sys, "stdlib_module_names", ())) | {"site", "encodings"}
+DEFAULT_TARGETS = ["api", "graph_rag_integration", "embeddings.embedder", "vector_store.faiss_handler"]
+
+
+def import_times(module: str) -> Tuple[List[Tuple[str, int, int]], str]:
+    """Return [(module, self_us, cumulative_us), ...] for a fresh `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    error = result.stderr.strip().splitlines()[-1] if result.returncode else ""
+    return rows, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module import time")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        rows, error = import_times(module)
+        if error:
+            print(f"\n{module}: import failed ({error})")
+            continue
+        # Outermost import of each third-party/project package, standard library left out
+        top_level: Dict[str, int] = {}
+        for name, _, cumulative in rows:
+            root = name.split(".")[0]
+            if root in STDLIB_MODULES:
+                continue
+            top_level[root] = max(top_level.get(root, 0), cumulative)
+        total = next((cum for name, _, cum in rows if name == module), sum(top_level.values()))
+        print(f"\n{module}: {total / 1000:.1f} ms total")
+        print(f"  {'package':<32} {'cumulative ms':>14}")
+        for name, cumulative in sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+            print(f"  {name:<32} {cumulative / 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
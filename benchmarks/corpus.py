@@ -0,0 +1,36 @@
+"""
+Synthetic note corpora for benchmarks, generated from notes/dummy_data.json templates
+"""
+
+import json
+import os
+import random
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TEMPLATES_PATH = os.path.join(PROJECT_ROOT, "notes", "dummy_data.json")
+
+PLACES = ["CubbonPark", "Indiranagar", "Koramangala", "Jayanagar", "Whitefield", "HSR Layout", "Malleshwaram"]
+TIMES = ["on weekends", "every evening", "this month", "before work", "after college", "on Sundays"]
+FEELINGS = ["I feel stuck.", "I am excited about this.", "It would make me happy.", "I have been curious for a while."]
+
+
+def load_templates(path: str = TEMPLATES_PATH) -> Dict[str, List[str]]:
+    """Load the need/availability sentence templates."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def synthetic_notes(n: int, seed: int = 0, templates: Dict[str, List[str]] = None) -> List[str]:
+    """Generate n deterministic notes, each mixing a need, an availability and some context."""
+    templates = templates or load_templates()
+    rng = random.Random(seed)
+    notes = []
+    for i in range(n):
+        need = rng.choice(templates["needs"])
+        availability = rng.choice(templates["availabilities"])
+        place = rng.choice(PLACES)
+        when = rng.choice(TIMES)
+        feeling = rng.choice(FEELINGS)
+        notes.append(f"{need} {feeling} Near {place} {availability.lower()} I am free {when}. (note {i})")
+    return notes
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Deterministic local stand-in for the Gemini generateContent API
+
+Answers the three prompts the pipeline sends, routed by their wording:
+NAT extraction ("note analyzer") returns the dummy_data.json needs and
+availabilities found in the note, subgraph generation ("knowledge graph
+creator") a fixed subgraph, anything else a fixed suggestion. Every reply
+waits --latency-ms first, so runs can model a remote LLM without calling one.
+
+Point the clients at it with GEMINI_API_BASE=http://127.0.0.1:<port>.
+
+Usage: python benchmarks/gemini_stub.py [--port 8765] [--latency-ms 0]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import load_templates
+
+DEFAULT_NAT = {"sentiments": ["curiosity"], "resources_needed": ["a quiet place to work"], "resources_available": ["free weekend time"]}
+SUBGRAPH = {
+    "nodes": [
+        {"id": "user", "type": "PERSON", "attributes": {"role": "author"}},
+        {"id": "resource", "type": "ORGANIZATION", "attributes": {"kind": "community"}},
+    ],
+    "edges": [{"from": "user", "to": "resource", "type": "NEEDS", "attributes": {"strength": 0.8}}],
+    "context": {"location": "city", "time": "weekends", "social": "community", "emotional": "hopeful", "practical": "free"},
+}
+SUGGESTION = (
+    "**Why it works**\n\nThe resource covers the need directly.\n\n"
+    "**Action steps**\n\n1. *Reach out* this week.\n2. Try it once and decide."
+)
+
+
+class GeminiStub:
+    def __init__(self, latency: float = 0.0, port: int = 0, templates: Optional[Dict[str, List[str]]] = None):
+        """
+        Stub server on 127.0.0.1 (port 0 picks a free one), run in a daemon thread.
+
+        Args:
+            latency: Seconds each reply waits before answering
+            templates: Need/availability sentences recognised in notes (default dummy_data.json)
+        """
+        self.latency = latency
+        templates = templates or load_templates()
+        self.needs = [(t.lower(), t) for t in templates["needs"]]
+        self.availabilities = [(t.lower(), t) for t in templates["availabilities"]]
+        self.calls = {"nat": 0, "subgraph": 0, "suggestion": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "GeminiStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "GeminiStub":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def nat(self, prompt: str) -> Dict:
+        """NAT for a note: the template sentences it contains, or a fixed default."""
+        text = prompt.lower()
+        needs = [original for lowered, original in self.needs if lowered in text]
+        availabilities = [original for lowered, original in self.availabilities if lowered in text]
+        if not needs and not availabilities:
+            return DEFAULT_NAT
+        return {"sentiments": ["curiosity"], "resources_needed": needs, "resources_available": availabilities}
+
+    def reply(self, prompt: str) -> str:
+        if "note analyzer" in prompt:
+            kind, text = "nat", json.dumps(self.nat(prompt))
+        elif "knowledge graph creator" in prompt:
+            kind, text = "subgraph", json.dumps(SUBGRAPH)
+        else:
+            kind, text = "suggestion", SUGGESTION
+        with self._lock:
+            self.calls[kind] += 1
+        return text
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+                except (ValueError, KeyError, IndexError):
+                    self.send_error(400, "Expected a generateContent payload")
+                    return
+                if stub.latency:
+                    time.sleep(stub.latency)
+                reply = {"candidates": [{"content": {"parts": [{"text": stub.reply(prompt)}]}}]}
+                data = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = GeminiStub(latency=args.latency_ms / 1000, port=args.port)
+    print(f"Gemini stub listening on {stub.url} ({args.latency_ms:g} ms per reply)")
+    print(f"export GEMINI_API_BASE={stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+        print(f"Calls: {stub.calls}")
+
+
+if __name__ == "__main__":
+    main()
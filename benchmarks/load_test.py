@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Load test for the HiddenThread API: p50/p99 latency at increasing concurrency
+
+Usage:
+    python benchmarks/load_test.py --url http://localhost:3001 --path /api/health
+    python benchmarks/load_test.py --path /api/graphrag/query --data '{"query": "quiet place to read"}'
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+
+def send(url: str, body: Optional[bytes]) -> float:
+    """Send one request; return its latency in seconds (raises on HTTP errors)."""
+    request = urllib.request.Request(url, data=body, method="POST" if body else "GET")
+    if body:
+        request.add_header("Content-Type", "application/json")
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=300) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_level(url: str, body: Optional[bytes], concurrency: int, requests_per_client: int):
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            try:
+                latency = send(url, body)
+                with lock:
+                    latencies.append(latency)
+            except (urllib.error.URLError, OSError):
+                with lock:
+                    errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - start
+    return np.array(latencies), errors, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:3001")
+    parser.add_argument("--path", default="/api/health")
+    parser.add_argument("--data", default=None, help="JSON body; sends POST when given")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client per level")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/") + args.path
+    body = json.dumps(json.loads(args.data)).encode() if args.data else None
+    levels = [int(level) for level in args.levels.split(",")]
+
+    print(f"Load test: {'POST' if body else 'GET'} {url}")
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    results = []
+    for concurrency in levels:
+        latencies, errors, wall = run_level(url, body, concurrency, args.requests)
+        p50 = float(np.percentile(latencies, 50) * 1000) if len(latencies) else float("nan")
+        p99 = float(np.percentile(latencies, 99) * 1000) if len(latencies) else float("nan")
+        throughput = len(latencies) / wall if wall else 0.0
+        print(f"{concurrency:>8} {len(latencies):>9} {errors:>7} {throughput:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+        results.append({
+            "concurrency": concurrency, "requests": len(latencies), "errors": errors,
+            "throughput_rps": throughput, "p50_ms": p50, "p99_ms": p99,
+        })
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"url": url, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
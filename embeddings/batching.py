@@ -0,0 +1,128 @@
+# Dynamic micro-batching: concurrent embedding requests merged into one model.encode call
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+
+from utils.metrics import REGISTRY
+from utils.parallel_ingest import set_torch_threads
+
+BATCH_TEXTS = REGISTRY.histogram(
+    "ht_embed_batch_texts", "Texts per merged embedding call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+
+class BatchingEmbedder:
+    def __init__(
+        self,
+        embedder=None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        torch_threads: int = 0,
+    ):
+        """
+        Embedder front end that merges requests from many threads into shared batches.
+
+        Each get_embedding(s) call is queued; one worker thread takes the
+        first waiting request, keeps collecting until max_batch_size texts or
+        max_wait_ms have gone by, encodes them in one call and hands every
+        caller its rows. Under concurrency the model runs a few large batches
+        instead of many tiny ones; a lone request waits at most max_wait_ms.
+        With max_wait_ms=0 nothing waits: requests that queued up while the
+        model was busy still go out together.
+
+        The worker starts on first use and again in a forked child (threads do
+        not survive a fork), so it can be built in a preloading master.
+
+        Args:
+            embedder: Embedder to wrap (default: a new Embedder())
+            max_batch_size: Texts per merged call (a larger single request runs alone)
+            max_wait_ms: Longest a request waits for others to join its batch
+            torch_threads: torch intra-op threads for encoding (0 leaves torch's default)
+        """
+        if embedder is None:
+            from embeddings.embedder import Embedder
+            embedder = Embedder()
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.torch_threads = torch_threads
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._queue: Optional[queue.Queue] = None
+
+    @property
+    def model(self):
+        return self.embedder.model
+
+    def _ensure_worker(self) -> queue.Queue:
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._run, args=(self._queue,), name="embed-batcher", daemon=True).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _submit(self, texts: List[str]) -> np.ndarray:
+        future = Future()
+        self._ensure_worker().put((texts, future))
+        return future.result()
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        return self._submit([text])[0]
+
+    def get_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        # batch_size is accepted for compatibility with Embedder; merged calls use max_batch_size
+        texts = list(texts)
+        if not texts:
+            return self.embedder.get_embeddings(texts)
+        return self._submit(texts)
+
+    def _run(self, requests: queue.Queue):
+        set_torch_threads(self.torch_threads)
+        while True:
+            batch = [requests.get()]
+            n_texts = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while n_texts < self.max_batch_size:
+                # Past the deadline, still take whatever is already queued (max_wait_ms=0: no waiting)
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = requests.get(timeout=timeout) if timeout > 0 else requests.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n_texts += len(item[0])
+            self._encode(batch, n_texts)
+
+    def _encode(self, batch, n_texts: int):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        BATCH_TEXTS.observe(n_texts)
+        try:
+            vectors = np.asarray(self.embedder.get_embeddings(texts, batch_size=self.max_batch_size))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        start = 0
+        for request_texts, future in batch:
+            future.set_result(vectors[start:start + len(request_texts)])
+            start += len(request_texts)
+
+
+def batching_from_env(embedder):
+    """embedder wrapped in a BatchingEmbedder when EMBED_BATCHING=true (EMBED_MAX_BATCH, EMBED_MAX_WAIT_MS)."""
+    if os.getenv("EMBED_BATCHING", "false").lower() != "true":
+        return embedder
+    return BatchingEmbedder(
+        embedder,
+        max_batch_size=int(os.getenv("EMBED_MAX_BATCH", "64")),
+        max_wait_ms=float(os.getenv("EMBED_MAX_WAIT_MS", "5")),
+        torch_threads=int(os.getenv("WORKER_CPU_THREADS", "0")),
+    )
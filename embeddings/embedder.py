@@ -1,12 +1,33 @@
-from sentence_transformers import SentenceTransformer
+import os
+
+from utils.metrics import span
+
+# torch: SentenceTransformer on PyTorch; onnx / onnx-int8: the model exported by
+# embeddings.onnx_backend, run by ONNX Runtime (torch is then never imported)
+BACKENDS = ("torch", "onnx", "onnx-int8")
 
 class Embedder:
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", backend=None, onnx_dir=None):
+        backend = backend or os.getenv("EMBED_BACKEND", "torch")
+        if backend == "torch":
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model_name)
+        elif backend in ("onnx", "onnx-int8"):
+            from embeddings.onnx_backend import DEFAULT_ONNX_DIR, OnnxEncoder
+            self.model = OnnxEncoder(
+                onnx_dir or os.getenv("EMBED_ONNX_DIR", DEFAULT_ONNX_DIR),
+                quantized=backend == "onnx-int8",
+                intra_op_threads=int(os.getenv("WORKER_CPU_THREADS", "0")),
+            )
+        else:
+            raise ValueError(f"Unknown embedder backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
         print("embedder.py loaded")
 
     def get_embedding(self, text: str):
-        return self.model.encode(text, normalize_embeddings=True)
+        with span("embed"):
+            return self.model.encode(text, normalize_embeddings=True)
 
-    def get_embeddings(self, texts: list[str]):
-        return self.model.encode(texts, normalize_embeddings=True)
+    def get_embeddings(self, texts: list[str], batch_size: int = 32):
+        with span("embed"):
+            return self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
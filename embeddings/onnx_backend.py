@@ -0,0 +1,156 @@
+# ONNX Runtime backend for the embedder: exported (optionally int8-quantized) MiniLM, no torch at run time
+#
+# Export once (needs torch, sentence-transformers and onnx; the server then only needs
+# onnxruntime and tokenizers):
+#   python -m embeddings.onnx_backend --output models/all-MiniLM-L6-v2-onnx
+
+import argparse
+import json
+import os
+from typing import List, Union
+
+import numpy as np
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_ONNX_DIR = "models/all-MiniLM-L6-v2-onnx"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_int8.onnx"
+CONFIG_FILE = "embedder_onnx.json"
+
+
+class OnnxEncoder:
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = True, intra_op_threads: int = 0):
+        """
+        Sentence encoder over an exported transformer, with SentenceTransformer's encode() interface.
+
+        Tokenizes with the exported tokenizer.json, runs the model in ONNX
+        Runtime and applies the same mean pooling over the attention mask and
+        L2 normalization as the sentence-transformers pipeline.
+
+        Args:
+            model_dir: Directory written by export()
+            quantized: Load the dynamically int8-quantized model (model_int8.onnx) instead of model.onnx
+            intra_op_threads: ONNX Runtime intra-op threads (0: its default)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE)) as f:
+            config = json.load(f)
+        self.max_seq_length = config["max_seq_length"]
+        self.dim = config["dim"]
+        self.quantized = quantized
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config["pad_token_id"], pad_token=config["pad_token"])
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype="int64")
+        feed = {"input_ids": np.array([e.ids for e in encodings], dtype="int64"), "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype="int64")
+        token_embeddings = self.session.run(None, feed)[0]
+        # Mean over real tokens, as sentence-transformers' Pooling(mean) does
+        weights = mask[:, :, None].astype("float32")
+        summed = (token_embeddings * weights).sum(axis=1)
+        return summed / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        """Embeddings as a (n, dim) float32 array, or (dim,) for a single string."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(texts), self.dim), dtype="float32")
+        # Longest first, so each batch pads to similar lengths
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            embeddings[rows] = self._encode_batch([texts[i] for i in rows])
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+
+def export(model_name: str = DEFAULT_MODEL, output_dir: str = DEFAULT_ONNX_DIR, quantize: bool = True, opset: int = 14):
+    """
+    Export a sentence-transformers model's transformer and tokenizer for OnnxEncoder.
+
+    Writes model.onnx (float32), model_int8.onnx (dynamic int8 weights, if
+    quantize), tokenizer.json and embedder_onnx.json into output_dir.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    tokenizer.save_pretrained(output_dir)  # fast tokenizers write tokenizer.json
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        # Inputs by name: the positional order of forward() differs between transformers versions
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs)))[0]
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILE), weight_type=QuantType.QInt8)
+
+    with open(os.path.join(output_dir, CONFIG_FILE), "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": st_model.max_seq_length,
+            "dim": transformer.config.hidden_size,
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+        }, f, indent=2)
+    print(f"Exported {model_name} to {output_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model for the ONNX Runtime backend")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--output", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 model")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export(args.model, args.output, quantize=not args.no_quantize, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
@@ -70,14 +70,14 @@ function App() {
     try {
       const response = await apiService.submitNotes(noteTexts);
       
-      // Update the notes state with the processed data from the backend
-      setNotes(prev => {
-        const newNotesMap = new Map(response.processed_notes.map(n => [n.content, n]));
-        return prev.map(note => {
-          const processed = newNotesMap.get(note.content);
-          return processed ? { ...note, ...processed, id: note.id } : note;
-        });
-      });
+      // Update the notes state with the processed data from the backend,
+      // switching to the stored note ids so reprocess can address them
+      const newNotesMap = new Map(response.processed_notes.map(n => [n.content, n]));
+      setNotes(prev => prev.map(note => {
+        const processed = newNotesMap.get(note.content);
+        return processed ? { ...note, ...processed, processed: true } : note;
+      }));
+      setSelectedNoteId(response.processed_notes[0]?.id || null);
 
       // Add new suggestions to the existing list
       setSuggestions(prev => [...response.suggestions, ...prev]);
@@ -94,8 +94,15 @@ function App() {
     setError(null);
 
     try {
-      // This functionality requires a dedicated backend endpoint which does not exist yet.
-      setError("Reprocessing is not yet implemented on the backend.");
+      const { suggestions: noteSuggestions = [], ...processed } = await apiService.reprocessNote(noteId);
+      setNotes(prev => prev.map(note =>
+        note.id === noteId ? { ...note, ...processed, processed: true } : note
+      ));
+      // The backend replaced this note's suggestions; do the same here
+      setSuggestions(prev => [
+        ...noteSuggestions,
+        ...prev.filter(s => s.noteId !== noteId && s.availabilityNoteId !== noteId),
+      ]);
     } catch (err) {
       const error = err as ApiError;
       setError(`Failed to reprocess note: ${error.message}`);
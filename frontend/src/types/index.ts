@@ -11,6 +11,7 @@ export interface Note {
 export interface Suggestion {
   id: string;
   noteId: string;
+  availabilityNoteId?: string;
   need: string;
   availability: string;
   suggestion: string;
@@ -22,6 +23,22 @@ export interface ProcessedNote {
   sentiments: string[];
   resources_needed: string[];
   resources_available: string[];
+  subgraph_stored?: boolean;
+  suggestions?: Suggestion[];
+}
+
+export interface NotesPage {
+  notes: Note[];
+  next_cursor: string | null;
+}
+
+export interface NotesQuery {
+  limit?: number;
+  after?: string | null;
+  need?: string;
+  availability?: string;
+  sentiment?: string;
+  q?: string;
 }
 
 export interface ApiError {
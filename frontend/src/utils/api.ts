@@ -1,4 +1,4 @@
-import { Note, ProcessedNote, Suggestion, ApiError } from '../types';
+import { Note, NotesPage, NotesQuery, ProcessedNote, Suggestion, ApiError } from '../types';
 
 const API_BASE = import.meta.env.VITE_REACT_APP_API_URL || 'http://localhost:3001';
 const USE_MOCK_DATA = false; // Set to true to use mock data during development
@@ -9,6 +9,9 @@ interface SubmitNotesResponse {
 }
 
 class ApiService {
+  // Last page and ETag per notes URL, so unchanged pages come back as 304s
+  private notesCache = new Map<string, { etag: string; page: NotesPage }>();
+
   async submitNotes(notes: string[]): Promise<SubmitNotesResponse> {
     if (USE_MOCK_DATA) {
       // Keep mock data for development
@@ -64,6 +67,40 @@ class ApiService {
     }
   }
 
+  async getNotes(query: NotesQuery = {}): Promise<NotesPage> {
+    const params = new URLSearchParams();
+    Object.entries(query).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        params.set(key, String(value));
+      }
+    });
+    const url = `${API_BASE}/api/notes?${params.toString()}`;
+    const cached = this.notesCache.get(url);
+
+    try {
+      const response = await fetch(url, {
+        headers: cached ? { 'If-None-Match': cached.etag } : {},
+      });
+
+      if (response.status === 304 && cached) {
+        return cached.page;
+      }
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+
+      const page: NotesPage = await response.json();
+      const etag = response.headers.get('ETag');
+      if (etag) {
+        this.notesCache.set(url, { etag, page });
+      }
+      return page;
+    } catch (error) {
+      console.error('Error fetching notes:', error);
+      throw this.handleError(error);
+    }
+  }
+
   async getSuggestions(): Promise<Suggestion[]> {
     if (USE_MOCK_DATA) {
       await new Promise(resolve => setTimeout(resolve, 1000));
@@ -3,18 +3,42 @@ Neo4j Graph Database Handler for HiddenThread
 Manages connections and operations for note subgraphs
 """
 
-from neo4j import GraphDatabase
 import json
 from typing import Dict, List, Any, Optional
 import logging
 import os
 
 
+# Relationship types used to join entities across note subgraphs
+CROSS_NOTE_REL_TYPES = ("SAME_AS", "RELATED")
+
+# Subgraph nodes carry the NoteEntity label so lookups by (note_id, id) use an index
+# instead of scanning every node; the last statement labels nodes stored before it existed
+SCHEMA_STATEMENTS = (
+    "CREATE INDEX note_entity_key IF NOT EXISTS FOR (n:NoteEntity) ON (n.note_id, n.id)",
+    "CREATE INDEX note_entity_note IF NOT EXISTS FOR (n:NoteEntity) ON (n.note_id)",
+    "CREATE INDEX note_metadata_note IF NOT EXISTS FOR (m:NoteMetadata) ON (m.note_id)",
+    "MATCH (n) WHERE n.note_id IS NOT NULL AND NOT n:NoteEntity AND NOT n:NoteMetadata SET n:NoteEntity",
+)
+
+
 class Neo4jHandler:
     def __init__(self, uri: str = "bolt://localhost:7687", user: str = "neo4j", password: str = "hiddenthread"):
         """Initialize Neo4j connection"""
+        # Imported here so that importing this module stays cheap until Neo4j is used
+        from neo4j import GraphDatabase
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self._schema_ready = False
         logging.info(f"Neo4jHandler initialized with URI: {uri}, User: {user}")
+
+    def ensure_schema(self):
+        """Create the subgraph indexes and label older nodes (once per handler, before first use)"""
+        if self._schema_ready:
+            return
+        with self.driver.session() as session:
+            for statement in SCHEMA_STATEMENTS:
+                session.run(statement).consume()
+        self._schema_ready = True
         
     def close(self):
         """Close the Neo4j connection"""
@@ -39,10 +63,15 @@ class Neo4jHandler:
         with self.driver.session() as session:
             logging.info(f"Creating subgraph for note {note_id}")
             try:
-                # Clear existing subgraph for this note if it exists
+                self.ensure_schema()
+                # Clear existing subgraph for this note if it exists. DETACH DELETE only
+                # removes this note's nodes, so cross-note links never take other notes with them.
+                session.run(
+                    "MATCH (n:NoteEntity {note_id: $note_id}) DETACH DELETE n",
+                    note_id=note_id
+                )
                 session.run(
-                    "MATCH (n)-[r]-(m) WHERE n.note_id = $note_id OR m.note_id = $note_id "
-                    "DELETE r, n, m",
+                    "MATCH (meta:NoteMetadata {note_id: $note_id}) DELETE meta",
                     note_id=note_id
                 )
                 logging.info(f"Cleared existing subgraph for note {note_id}")
@@ -50,7 +79,7 @@ class Neo4jHandler:
                 # Create nodes
                 for node in subgraph_data.get('nodes', []):
                     session.run(
-                        "CREATE (n {id: $id, type: $type, note_id: $note_id, attributes: $attributes})",
+                        "CREATE (n:NoteEntity {id: $id, type: $type, note_id: $note_id, attributes: $attributes})",
                         id=node['id'],
                         type=node['type'],
                         note_id=note_id,
@@ -61,8 +90,8 @@ class Neo4jHandler:
                 # Create relationships
                 for edge in subgraph_data.get('edges', []):
                     session.run(
-                        "MATCH (a {id: $from_id, note_id: $note_id}), "
-                        "      (b {id: $to_id, note_id: $note_id}) "
+                        "MATCH (a:NoteEntity {note_id: $note_id, id: $from_id}), "
+                        "      (b:NoteEntity {note_id: $note_id, id: $to_id}) "
                         "CREATE (a)-[r:RELATES {type: $rel_type, attributes: $attributes}]->(b)",
                         from_id=edge['from'],
                         to_id=edge['to'],
@@ -87,6 +116,26 @@ class Neo4jHandler:
                 logging.error(f"Error creating subgraph for note {note_id}: {e}")
                 return False
 
+    def delete_note_subgraph(self, note_id: str) -> bool:
+        """
+        Delete a note's subgraph, including its cross-note links
+        
+        Args:
+            note_id: Unique identifier for the note
+            
+        Returns:
+            bool: Success status
+        """
+        with self.driver.session() as session:
+            try:
+                self.ensure_schema()
+                session.run("MATCH (n:NoteEntity {note_id: $note_id}) DETACH DELETE n", note_id=note_id)
+                session.run("MATCH (meta:NoteMetadata {note_id: $note_id}) DELETE meta", note_id=note_id)
+                logging.info(f"Deleted subgraph for note {note_id}")
+                return True
+            except Exception as e:
+                logging.error(f"Error deleting subgraph for note {note_id}: {e}")
+                return False
     
     def get_note_subgraph(self, note_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -100,10 +149,11 @@ class Neo4jHandler:
         """
         with self.driver.session() as session:
             try:
+                self.ensure_schema()
                 logging.info(f"Retrieving subgraph for note {note_id}")
                 # Get nodes
                 nodes_result = session.run(
-                    "MATCH (n) WHERE n.note_id = $note_id RETURN n",
+                    "MATCH (n:NoteEntity {note_id: $note_id}) RETURN n",
                     note_id=note_id
                 )
                 nodes = []
@@ -118,7 +168,7 @@ class Neo4jHandler:
                 
                 # Get edges
                 edges_result = session.run(
-                    "MATCH (a)-[r]-(b) WHERE a.note_id = $note_id AND b.note_id = $note_id "
+                    "MATCH (a:NoteEntity {note_id: $note_id})-[r]-(b:NoteEntity {note_id: $note_id}) "
                     "RETURN a.id as from_id, b.id as to_id, r.type as rel_type, r.attributes as attributes",
                     note_id=note_id
                 )
@@ -157,6 +207,88 @@ class Neo4jHandler:
                 logging.error(f"Error retrieving subgraph for note {note_id}: {e}")
                 return None
     
+    def get_note_ids(self) -> List[str]:
+        """Return the ids of every note that has a stored subgraph"""
+        with self.driver.session() as session:
+            try:
+                result = session.run("MATCH (meta:NoteMetadata) RETURN DISTINCT meta.note_id AS note_id")
+                return [record['note_id'] for record in result]
+            except Exception as e:
+                logging.error(f"Error listing note ids: {e}")
+                return []
+
+    def get_entity_nodes(self, node_types: List[str], note_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch entity nodes of the given types across note subgraphs
+
+        Args:
+            node_types: Node types to return (e.g. PLACE, PERSON)
+            note_ids: Restrict to these notes, or None for every note
+
+        Returns:
+            List of dicts with note_id, id, type and decoded attributes
+        """
+        query = "MATCH (n:NoteEntity) WHERE n.type IN $node_types "
+        if note_ids is not None:
+            query += "AND n.note_id IN $note_ids "
+        query += "RETURN n.note_id AS note_id, n.id AS id, n.type AS type, n.attributes AS attributes"
+        with self.driver.session() as session:
+            try:
+                self.ensure_schema()
+                result = session.run(query, node_types=node_types, note_ids=note_ids)
+                return [
+                    {
+                        'note_id': record['note_id'],
+                        'id': record['id'],
+                        'type': record['type'],
+                        'attributes': json.loads(record['attributes'] or '{}')
+                    }
+                    for record in result
+                ]
+            except Exception as e:
+                logging.error(f"Error fetching entity nodes: {e}")
+                return []
+
+    def create_cross_note_links(self, rel_type: str, links: List[Dict[str, Any]], batch_size: int = 500) -> int:
+        """
+        Bulk-create relationships between nodes that live in different note subgraphs
+
+        Args:
+            rel_type: Relationship type, one of CROSS_NOTE_REL_TYPES
+            links: Dicts with from_note, from_id, to_note, to_id and score
+            batch_size: Number of links written per UNWIND statement
+
+        Returns:
+            int: Number of links written
+        """
+        if rel_type not in CROSS_NOTE_REL_TYPES:
+            raise ValueError(f"Unsupported cross-note relationship type: {rel_type}")
+        # Relationship types cannot be parameterised, so the checked type is inlined.
+        # Labelled matches on (note_id, id) are index seeks, not scans of the whole graph.
+        query = (
+            "UNWIND $links AS link "
+            "MATCH (a:NoteEntity {note_id: link.from_note, id: link.from_id}), "
+            "      (b:NoteEntity {note_id: link.to_note, id: link.to_id}) "
+            f"MERGE (a)-[r:{rel_type}]->(b) "
+            "SET r.score = link.score"
+        )
+        try:
+            self.ensure_schema()
+        except Exception as e:
+            logging.error(f"Error creating subgraph indexes: {e}")
+            return 0
+        written = 0
+        with self.driver.session() as session:
+            for start in range(0, len(links), batch_size):
+                batch = links[start:start + batch_size]
+                try:
+                    session.run(query, links=batch).consume()
+                    written += len(batch)
+                except Exception as e:
+                    logging.error(f"Error writing {rel_type} links: {e}")
+        logging.info(f"Wrote {written} {rel_type} links")
+        return written
+
     def health_check(self) -> bool:
         """Check if Neo4j is accessible"""
         try:
@@ -3,11 +3,18 @@ SubgraphGenerator LLM Module
 Creates rich, disconnected subgraphs for individual notes
 """
 
+import os
+import logging
 import requests
 import json
 import re
 from typing import Dict, List, Any
 
+from utils.metrics import LLM_ERRORS, span
+
+# Overridable (GEMINI_API_BASE) so benchmarks can point the client at a local stub
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com"
+
 
 class SubgraphGenerator:
     def __init__(self, api_key: str):
@@ -90,9 +97,11 @@ Make the subgraph RICH and DETAILED - capture nuances, implications, and context
         }
 
         try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={self.api_key}"
-            response = requests.post(url, json=payload, headers=headers)
-            print(f"SUBGRAPH RAW RESPONSE: {response.status_code} {response.text}")
+            base = os.getenv("GEMINI_API_BASE", DEFAULT_API_BASE)
+            url = f"{base}/v1beta/models/gemini-1.5-flash:generateContent?key={self.api_key}"
+            with span("subgraph"):
+                response = requests.post(url, json=payload, headers=headers)
+            logging.debug("Subgraph raw response: %s %s", response.status_code, response.text)
             response.raise_for_status()
             
             response_text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
@@ -116,11 +125,12 @@ Make the subgraph RICH and DETAILED - capture nuances, implications, and context
             if not all(key in subgraph_data for key in ['nodes', 'edges', 'context']):
                 raise ValueError("Missing required keys in subgraph data")
             
-            print(f"SUBGRAPH GENERATED: {len(subgraph_data['nodes'])} nodes, {len(subgraph_data['edges'])} edges")
-            print(f"SUBGRAPH CONTEXT: {subgraph_data['context']}")
+            logging.debug("Subgraph generated: %d nodes, %d edges, context %s",
+                          len(subgraph_data['nodes']), len(subgraph_data['edges']), subgraph_data['context'])
             return subgraph_data
             
         except requests.exceptions.RequestException as e:
+            LLM_ERRORS.inc(client="subgraph")
             print(f"API request error in subgraph generation: {e}. Returning empty subgraph.")
             return {
                 "nodes": [],
@@ -128,6 +138,7 @@ Make the subgraph RICH and DETAILED - capture nuances, implications, and context
                 "context": {"error": f"API request failed: {e}", "status": "generation_failed"}
             }
         except (json.JSONDecodeError, KeyError, ValueError) as e:
+            LLM_ERRORS.inc(client="subgraph")
             print(f"Error parsing subgraph response: {e}. Returning empty subgraph.")
             return {
                 "nodes": [],
@@ -0,0 +1,250 @@
+"""
+SubgraphLinker Module
+Joins the disconnected per-note subgraphs by linking matching entities across notes
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from embeddings.embedder import Embedder
+from graph_db.neo4j_handler import Neo4jHandler, get_neo4j_handler
+
+
+# Entity types that are worth joining across notes
+LINKABLE_TYPES = ["PLACE", "ORGANIZATION", "PERSON"]
+
+# Node ids that every subgraph uses for the note author; linking them would connect everything
+DEFAULT_SKIP_IDS = ("user", "me", "author", "narrator")
+
+
+class SubgraphLinker:
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        neo4j_handler: Optional[Neo4jHandler] = None,
+        index_path: str = "vector_store/subgraph_entities.index",
+        entities_path: str = "vector_store/subgraph_entities.json",
+        same_as_threshold: float = 0.9,
+        related_threshold: float = 0.75,
+        top_k: int = 10,
+        skip_ids: Iterable[str] = DEFAULT_SKIP_IDS,
+        dim: int = 384,
+        compact_ratio: float = 0.25,
+    ):
+        """
+        Link PLACE/ORGANIZATION/PERSON entities across note subgraphs
+
+        Entity embeddings live in an HNSW index so that linking a note costs
+        a handful of approximate lookups instead of a comparison with every
+        stored entity. HNSW cannot delete, so entities of re-linked or deleted
+        notes are tombstoned; once they exceed compact_ratio of the index it
+        is rebuilt from the live entities' stored vectors. A lock guards the
+        index and its metadata only, so request threads can share one linker
+        without waiting on each other's Neo4j queries or embeddings.
+
+        Args:
+            embedder: Shared Embedder instance (created if not given)
+            neo4j_handler: Neo4j handler (the global one if not given)
+            index_path: Where the entity vector index is persisted
+            entities_path: Where the entity metadata is persisted
+            same_as_threshold: Minimum similarity for SAME_AS between entities of the same type
+            related_threshold: Minimum similarity for a RELATED link
+            top_k: Neighbours examined per entity
+            skip_ids: Node ids that are never linked
+            dim: Embedding dimension
+            compact_ratio: Fraction of tombstoned rows that triggers a rebuild of the index
+        """
+        self.embedder = embedder or Embedder()
+        self.neo4j_handler = neo4j_handler or get_neo4j_handler()
+        self.index_path = index_path
+        self.entities_path = entities_path
+        self.same_as_threshold = same_as_threshold
+        self.related_threshold = related_threshold
+        self.top_k = top_k
+        self.skip_ids = {s.lower() for s in skip_ids}
+        self.dim = dim
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()  # index and entity metadata; never held across Neo4j or the embedder
+        self.reset()
+        self.load()
+
+    def reset(self):
+        """Drop the in-memory entity index."""
+        self.index = faiss.IndexHNSWFlat(self.dim, 32, faiss.METRIC_INNER_PRODUCT)
+        self.index.hnsw.efSearch = max(64, self.top_k * 4)
+        # Row i of the index -> [note_id, node_id, node_type]
+        self.entities: List[List[str]] = []
+        self.note_rows: Dict[str, List[int]] = {}
+        # HNSW cannot delete, so rows of re-linked notes are tombstoned until the next rebuild
+        self.stale_rows = set()
+
+    def load(self):
+        """Load a previously persisted entity index, if present."""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.entities_path)):
+            return
+        with open(self.entities_path) as f:
+            data = json.load(f)
+        index = faiss.read_index(self.index_path)
+        if index.ntotal != len(data.get("entities", [])):
+            logging.warning("Subgraph entity index and metadata are out of sync, starting empty")
+            return
+        self.index = index
+        self.index.hnsw.efSearch = max(64, self.top_k * 4)
+        self.entities = data["entities"]
+        self.stale_rows = set(data.get("stale_rows", []))
+        self.note_rows = {}
+        for row, (note_id, _, _) in enumerate(self.entities):
+            self.note_rows.setdefault(note_id, []).append(row)
+
+    def save(self):
+        """Persist the entity index and its metadata."""
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        faiss.write_index(self.index, self.index_path)
+        with open(self.entities_path, "w") as f:
+            json.dump({"entities": self.entities, "stale_rows": sorted(self.stale_rows)}, f)
+
+    @staticmethod
+    def node_text(node: Dict[str, Any]) -> str:
+        """Build the text that represents an entity node for embedding."""
+        attributes = node.get("attributes") or {}
+        name = attributes.get("name") or str(node["id"]).replace("_", " ")
+        details = "; ".join(
+            f"{key}: {value}" for key, value in attributes.items()
+            if key != "name" and isinstance(value, (str, int, float))
+        )
+        text = f"{node['type'].lower()} {name}"
+        return f"{text}. {details}" if details else text
+
+    def link_notes(self, note_ids: List[str], save: bool = True) -> Dict[str, int]:
+        """
+        Incrementally link the entities of the given notes to everything already indexed
+
+        Cost depends on the number of entities in these notes, not on the
+        size of the whole graph.
+
+        Args:
+            note_ids: Notes whose subgraphs were just stored
+            save: Persist the index afterwards
+
+        Returns:
+            Dict with the number of entities indexed and links written per type
+        """
+        note_ids = [str(n) for n in note_ids]
+        stats = {"entities": 0, "SAME_AS": 0, "RELATED": 0}
+        if not note_ids:
+            return stats
+        nodes = [
+            node for node in self.neo4j_handler.get_entity_nodes(LINKABLE_TYPES, note_ids)
+            if str(node["id"]).lower() not in self.skip_ids
+        ]
+        vectors = None
+        if nodes:
+            vectors = np.asarray(
+                self.embedder.get_embeddings([self.node_text(n) for n in nodes]), dtype="float32"
+            ).reshape(len(nodes), -1)
+
+        with self._lock:
+            links = self._index_nodes(note_ids, nodes, vectors)
+            self._maybe_compact()
+            if save:
+                self.save()
+        stats["entities"] = len(nodes)
+        for rel_type, batch in links.items():
+            stats[rel_type] = self.neo4j_handler.create_cross_note_links(rel_type, batch)
+        logging.info(f"Linked {len(note_ids)} notes: {stats}")
+        return stats
+
+    def _index_nodes(self, note_ids: List[str], nodes: List[Dict[str, Any]], vectors: Optional[np.ndarray]) -> Dict[str, List[Dict[str, Any]]]:
+        """Replace the notes' entities in the index and find their links (lock held)."""
+        # Re-linked notes replace their earlier entities
+        for note_id in note_ids:
+            self.stale_rows.update(self.note_rows.pop(note_id, []))
+        if not nodes:
+            return {}
+
+        # Index first so that matches between the new notes are found as well
+        first_row = len(self.entities)
+        self.index.add(vectors)
+        for row, node in enumerate(nodes, start=first_row):
+            self.entities.append([str(node["note_id"]), node["id"], node["type"]])
+            self.note_rows.setdefault(str(node["note_id"]), []).append(row)
+
+        scores, rows = self.index.search(vectors, min(self.top_k + 1, self.index.ntotal))
+        return self._collect_links(first_row, scores, rows)
+
+    def forget_note(self, note_id: str, save: bool = True):
+        """Tombstone a deleted note's entities so nothing links to them again."""
+        with self._lock:
+            rows = self.note_rows.pop(str(note_id), [])
+            self.stale_rows.update(rows)
+            if rows:
+                self._maybe_compact()
+                if save:
+                    self.save()
+
+    def _maybe_compact(self):
+        """Rebuild the index without tombstoned rows once they exceed compact_ratio of it."""
+        if not self.stale_rows or len(self.stale_rows) <= self.compact_ratio * self.index.ntotal:
+            return
+        live = [row for row in range(len(self.entities)) if row not in self.stale_rows]
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)[live]
+        entities = [self.entities[row] for row in live]
+        self.reset()
+        if live:
+            self.index.add(np.ascontiguousarray(vectors, dtype="float32"))
+        # Survivors keep their order under new row numbers
+        self.entities = entities
+        for row, (note_id, _, _) in enumerate(entities):
+            self.note_rows.setdefault(note_id, []).append(row)
+        logging.info(f"Compacted the subgraph entity index to {len(entities)} entities")
+
+    def rebuild(self) -> Dict[str, int]:
+        """Batch job: re-index every stored subgraph and re-link all notes."""
+        note_ids = self.neo4j_handler.get_note_ids()
+        with self._lock:
+            self.reset()
+        return self.link_notes(note_ids)
+
+    def _collect_links(self, first_row: int, scores: np.ndarray, rows: np.ndarray) -> Dict[str, List[Dict[str, Any]]]:
+        """Turn neighbour search results into de-duplicated SAME_AS/RELATED links."""
+        best: Dict[Tuple[int, int], float] = {}
+        keep = scores >= self.related_threshold
+        for q, k in zip(*np.nonzero(keep)):
+            a, b = first_row + int(q), int(rows[q, k])
+            if b < 0 or b in self.stale_rows or self.entities[a][0] == self.entities[b][0]:
+                continue
+            key = (min(a, b), max(a, b))
+            best[key] = max(best.get(key, -1.0), float(scores[q, k]))
+
+        links: Dict[str, List[Dict[str, Any]]] = {"SAME_AS": [], "RELATED": []}
+        for (a, b), score in best.items():
+            note_a, id_a, type_a = self.entities[a]
+            note_b, id_b, type_b = self.entities[b]
+            rel_type = "SAME_AS" if type_a == type_b and score >= self.same_as_threshold else "RELATED"
+            links[rel_type].append({
+                "from_note": note_a, "from_id": id_a,
+                "to_note": note_b, "to_id": id_b,
+                "score": score,
+            })
+        return links
+
+
+if __name__ == "__main__":
+    # Run from the project root: python -m graph_db.subgraph_linker [note_id ...]
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Link entities across stored note subgraphs")
+    parser.add_argument("note_ids", nargs="*", help="Notes to link incrementally (default: rebuild all)")
+    args = parser.parse_args()
+
+    linker = SubgraphLinker()
+    result = linker.link_notes(args.note_ids) if args.note_ids else linker.rebuild()
+    print(f"Cross-note linking finished: {result}")
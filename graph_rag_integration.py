@@ -9,6 +9,7 @@ import os
 import sys
 import json
 import networkx as nx
+import numpy as np
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
@@ -18,27 +19,19 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 # Import existing project components
 from embeddings.embedder import Embedder
-from vector_store.faiss_handler import FAISSHandler
-from graph_db.neo4j_handler import Neo4jHandler
+from vector_store.faiss_handler import FAISSHandler, set_num_threads
+from vector_store.bm25_index import BM25Index, tokenize, reciprocal_rank_fusion
+from vector_store.semantic_cache import SemanticCache
+from utils.concept_extractor import ConceptExtractor
+from utils.parallel_ingest import similarity_edges, split_and_extract, set_torch_threads
+from graph_db.neo4j_handler import Neo4jHandler, get_neo4j_handler
+from utils.metrics import span
+from utils.result_cache import ResultCache, normalize_query
 
-# Import third-party GraphRAG components
+# Import third-party GraphRAG components. Only the text splitter is needed up
+# front; Azure embeddings and spaCy are imported when they are configured.
 try:
-    from langchain.vectorstores import FAISS as LangchainFAISS
     from langchain.text_splitter import RecursiveCharacterTextSplitter
-    from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-    from langchain_community.document_loaders import TextLoader
-    import matplotlib.pyplot as plt
-    import matplotlib.patches as patches
-    from sklearn.metrics.pairwise import cosine_similarity
-    from nltk.stem import WordNetLemmatizer
-    from nltk.tokenize import word_tokenize
-    import nltk
-    import spacy
-    import heapq
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    from tqdm import tqdm
-    import numpy as np
-    from pydantic import BaseModel
     GRAPHRAG_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Some GraphRAG dependencies not available: {e}")
@@ -54,12 +47,27 @@ class GraphRAGConfig:
     max_traversal_depth: int = 5
     enable_visualization: bool = True
     use_azure_openai: bool = False
+    retrieval_top_k: int = 5
+    enable_hybrid_search: bool = True
+    rrf_k: int = 60
+    concept_backend: str = "nltk"
+    concept_n_process: int = 1
+    num_workers: int = 1            # >1 enables multi-process ingestion
+    embedding_batch_size: int = 64
+    torch_threads: int = 0          # 0 leaves torch's default intra-op thread count
+    faiss_threads: int = 0          # 0 leaves FAISS's default OpenMP thread count
+    edge_tile_size: int = 1024
+    index_storage: str = "float32"  # float32 | fp16 | sq8; compact chunk vectors, approximate scores
+    cache_size: int = 1024          # query results kept per graph version; 0 disables the cache
+    cache_ttl: float = 300.0        # seconds a cached query result stays valid
+    semantic_cache_threshold: float = 0.9  # query similarity that reuses a paraphrase's result; >1 disables
+    semantic_cache_size: int = 1000
 
 
 class DocumentProcessor:
     """Enhanced document processor that integrates with existing FAISS and Neo4j."""
     
-    def __init__(self, config: GraphRAGConfig):
+    def __init__(self, config: GraphRAGConfig, embedder: Optional[Embedder] = None):
         self.config = config
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=config.chunk_size, 
@@ -68,11 +76,12 @@ class DocumentProcessor:
         
         # Use existing embedder if available
         try:
-            self.embedder = Embedder()
+            self.embedder = embedder or Embedder()
             self.use_existing_embedder = True
         except:
             self.use_existing_embedder = False
             if GRAPHRAG_AVAILABLE and config.use_azure_openai:
+                from langchain_openai import AzureOpenAIEmbeddings
                 self.embeddings = AzureOpenAIEmbeddings(
                     model=os.environ.get("AZURE_OPENAI_EMBEDDING_MODEL"),
                     azure_endpoint=os.environ.get("AZURE_OPENAI_EMBEDDING_ENDPOINT"),
@@ -81,33 +90,38 @@ class DocumentProcessor:
                     api_key=os.environ.get("AZURE_OPENAI_EMBEDDING_KEY")
                 )
 
-    def process_documents(self, documents: List[str]) -> Tuple[List[str], FAISSHandler]:
-        """Process documents and create both FAISS index and graph structure."""
-        # Split documents into chunks
+    def split_documents(self, documents: List[str]) -> List[str]:
+        """Split documents into chunks."""
         splits = []
         for doc in documents:
             splits.extend(self.text_splitter.split_text(doc))
-        
-        # Create embeddings using existing embedder
+        return splits
+
+    def embed(self, splits: List[str]) -> np.ndarray:
+        """Embed chunks in batches on the calling process."""
+        if not splits:
+            return np.zeros((0, 384), dtype="float32")
         if self.use_existing_embedder:
-            embeddings = []
-            for split in splits:
-                embedding = self.embedder.get_embedding(split)
-                embeddings.append(embedding)
-            embeddings = np.array(embeddings)
+            set_torch_threads(self.config.torch_threads)
+            embeddings = self.embedder.get_embeddings(splits, batch_size=self.config.embedding_batch_size)
         else:
             # Use LangChain embeddings if available
             embeddings = self.embeddings.embed_documents(splits)
-            embeddings = np.array(embeddings)
-        
-        # Create FAISS index
-        faiss_handler = FAISSHandler()
+        return np.asarray(embeddings, dtype="float32")
+
+    def build_index(self, embeddings: np.ndarray) -> FAISSHandler:
+        """Create and persist the FAISS index over chunk embeddings."""
+        faiss_handler = FAISSHandler(storage=self.config.index_storage)
         faiss_handler.add(embeddings)
         
         # Store entries for later retrieval (simplified)
         faiss_handler.save_index("vector_store/graphrag.index")
-        
-        return splits, faiss_handler
+        return faiss_handler
+
+    def process_documents(self, documents: List[str]) -> Tuple[List[str], FAISSHandler]:
+        """Process documents and create both FAISS index and graph structure."""
+        splits = self.split_documents(documents)
+        return splits, self.build_index(self.embed(splits))
 
 
 class KnowledgeGraph:
@@ -116,66 +130,96 @@ class KnowledgeGraph:
     def __init__(self, config: GraphRAGConfig):
         self.config = config
         self.graph = nx.Graph()
-        self.neo4j_handler = Neo4jHandler()
-        self.lemmatizer = WordNetLemmatizer()
-        
-        # Download required NLTK data
-        try:
-            nltk.download('punkt', quiet=True)
-            nltk.download('wordnet', quiet=True)
-        except:
-            pass
+        self._neo4j_handler = None
+        self.concept_extractor = ConceptExtractor(
+            backend=config.concept_backend,
+            n_process=config.concept_n_process
+        )
+        self.text_index = BM25Index()
+        # Text of each node as last indexed, and concepts by chunk text, so a rebuild
+        # only extracts and indexes chunks that are new or changed
+        self.indexed_splits: List[str] = []
+        self._concepts_by_text: Dict[str, List[str]] = {}
+
+    @property
+    def neo4j_handler(self) -> Neo4jHandler:
+        """Shared Neo4j handler, connected on first use rather than at construction."""
+        if self._neo4j_handler is None:
+            self._neo4j_handler = get_neo4j_handler()
+        return self._neo4j_handler
 
     def extract_concepts(self, text: str) -> List[str]:
         """Extract key concepts from text using NLP techniques."""
-        # Simple concept extraction - can be enhanced with more sophisticated NLP
-        tokens = word_tokenize(text.lower())
-        concepts = []
-        
-        for token in tokens:
-            if len(token) > 3:  # Filter out short words
-                lemma = self.lemmatizer.lemmatize(token)
-                concepts.append(lemma)
-        
-        return list(set(concepts))  # Remove duplicates
+        return self.concept_extractor.extract(text)
+
+    def index_terms(self, text: str, concepts: Optional[List[str]] = None) -> List[str]:
+        """Terms for the lexical index: raw tokens plus any lemmatized concepts they lack."""
+        tokens = tokenize(text)
+        if concepts is None:
+            concepts = self.extract_concepts(text)
+        seen = set(tokens)
+        return tokens + [c for c in concepts if c not in seen]
 
-    def build_graph(self, splits: List[str], embeddings: np.ndarray):
-        """Build knowledge graph from document splits."""
+    def build_graph(self, splits: List[str], embeddings: np.ndarray, concepts: Optional[List[List[str]]] = None):
+        """Build knowledge graph from document splits (concepts may be precomputed)."""
         print("Building knowledge graph...")
         
-        # Create nodes for each split
-        for i, split in enumerate(splits):
-            self.graph.add_node(i, content=split, concepts=self.extract_concepts(split))
-        
-        # Create edges based on semantic similarity
-        for i in tqdm(range(len(splits)), desc="Creating graph edges"):
-            for j in range(i + 1, len(splits)):
-                similarity = cosine_similarity(
-                    embeddings[i].reshape(1, -1), 
-                    embeddings[j].reshape(1, -1)
-                )[0][0]
-                
-                if similarity > self.config.similarity_threshold:
-                    self.graph.add_edge(i, j, weight=similarity)
+        # Create nodes for each split; only new or changed ones are (re)indexed for lexical search
+        all_concepts = concepts if concepts is not None else self._concepts_for(splits)
+        self._update_text_index(splits, all_concepts)
+        for i, (split, concepts) in enumerate(zip(splits, all_concepts)):
+            self.graph.add_node(i, content=split, concepts=concepts)
+        
+        # Create edges based on semantic similarity, one tile of rows at a time
+        rows, cols, weights = similarity_edges(
+            embeddings,
+            self.config.similarity_threshold,
+            n_workers=self.config.num_workers,
+            tile_size=self.config.edge_tile_size
+        )
+        self.graph.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights.tolist()))
         
         # Store graph in Neo4j
         self._store_in_neo4j(splits)
         
         print(f"Graph built with {self.graph.number_of_nodes()} nodes and {self.graph.number_of_edges()} edges")
 
+    def _concepts_for(self, splits: List[str]) -> List[List[str]]:
+        """Concepts of each split, extracting only chunk texts not seen in the previous build."""
+        new = [split for split in dict.fromkeys(splits) if split not in self._concepts_by_text]
+        if new:
+            self._concepts_by_text.update(zip(new, self.concept_extractor.extract_batch(new)))
+        # Keep only the current chunks, so edited or removed text does not accumulate
+        self._concepts_by_text = {split: self._concepts_by_text[split] for split in splits}
+        return [self._concepts_by_text[split] for split in splits]
+
+    def _update_text_index(self, splits: List[str], all_concepts: List[List[str]]):
+        """Bring the BM25 index in line with splits, touching only the nodes whose text changed."""
+        if len(self.text_index.doc_ids) > 2 * max(len(self.text_index), len(splits)):
+            # Mostly tombstones (which skew document frequencies): start over
+            self.text_index = BM25Index()
+            self.indexed_splits = []
+        for i, (split, concepts) in enumerate(zip(splits, all_concepts)):
+            if i >= len(self.indexed_splits) or self.indexed_splits[i] != split:
+                self.text_index.add(i, self.index_terms(split, concepts))
+        for i in range(len(splits), len(self.indexed_splits)):
+            self.text_index.remove(i)
+        self.indexed_splits = list(splits)
+
     def _store_in_neo4j(self, splits: List[str]):
         """Store graph structure in Neo4j database."""
         try:
-            # Create nodes in Neo4j
-            for i, split in enumerate(splits):
-                self.neo4j_handler.create_document_node(i, split[:200])  # Truncate for Neo4j
+            with span("neo4j_write"):
+                # Create nodes in Neo4j
+                for i, split in enumerate(splits):
+                    self.neo4j_handler.create_document_node(i, split[:200])  # Truncate for Neo4j
             
-            # Create relationships
-            for edge in self.graph.edges(data=True):
-                node1, node2, data = edge
-                self.neo4j_handler.create_similarity_relationship(
-                    node1, node2, data['weight']
-                )
+                # Create relationships
+                for edge in self.graph.edges(data=True):
+                    node1, node2, data = edge
+                    self.neo4j_handler.create_similarity_relationship(
+                        node1, node2, data['weight']
+                    )
         except Exception as e:
             print(f"Warning: Could not store graph in Neo4j: {e}")
 
@@ -188,23 +232,22 @@ class QueryEngine:
         self.knowledge_graph = knowledge_graph
         self.config = config
 
-    def query(self, query: str, embedder: Embedder) -> Tuple[str, List[int], List[str]]:
-        """Query the system using both vector search and graph traversal."""
+    def query(self, query: str, embedder: Embedder, query_embedding: Optional[np.ndarray] = None) -> Tuple[str, List[int], List[str]]:
+        """Query the system using hybrid (vector + BM25) search and graph traversal."""
         # Get query embedding
-        query_embedding = embedder.get_embedding(query)
+        if query_embedding is None:
+            query_embedding = embedder.get_embedding(query)
         
-        # Vector search
-        similar_docs = self.faiss_handler.search(
-            query_embedding.reshape(1, -1), 
-            top_k=5, 
-            threshold=self.config.similarity_threshold
-        )
+        # Hybrid search: dense and lexical rankings fused by reciprocal rank
+        with span("graphrag_search"):
+            ranked_nodes = self._hybrid_search(query, query_embedding)
         
         # Graph traversal
-        traversal_path = self._graph_traversal(query_embedding, similar_docs)
+        with span("graphrag_traversal"):
+            traversal_path = self._graph_traversal(query_embedding, ranked_nodes)
         
         # Combine results
-        all_relevant_nodes = list(set([doc[1] for doc in similar_docs] + traversal_path))
+        all_relevant_nodes = list(set(ranked_nodes + traversal_path))
         
         # Get content from nodes
         relevant_content = []
@@ -220,13 +263,31 @@ class QueryEngine:
         traversal_path = [int(x) for x in traversal_path]
         return response, traversal_path, relevant_content
 
-    def _graph_traversal(self, query_embedding: np.ndarray, similar_docs: List[Tuple]) -> List[int]:
-        """Perform graph traversal starting from similar documents."""
-        if not similar_docs:
+    def _dense_search(self, query_embedding: np.ndarray) -> List[int]:
+        """Rank chunks by embedding similarity, dropping those below the threshold."""
+        _, ids = self.faiss_handler.search_batch(
+            query_embedding, self.config.retrieval_top_k, threshold=self.config.similarity_threshold
+        )
+        return [int(i) for i in ids[0] if i >= 0]
+
+    def _hybrid_search(self, query: str, query_embedding: np.ndarray) -> List[int]:
+        """Fuse dense FAISS results with BM25 results over chunk tokens and concepts."""
+        dense = self._dense_search(query_embedding)
+        if not self.config.enable_hybrid_search:
+            return dense
+        
+        terms = self.knowledge_graph.index_terms(query)
+        lexical = [doc_id for doc_id, _ in self.knowledge_graph.text_index.search(terms, self.config.retrieval_top_k)]
+        fused = reciprocal_rank_fusion([dense, lexical], k=self.config.rrf_k, top_k=self.config.retrieval_top_k)
+        return [doc_id for doc_id, _ in fused]
+
+    def _graph_traversal(self, query_embedding: np.ndarray, ranked_nodes: List[int]) -> List[int]:
+        """Perform graph traversal starting from the best ranked documents."""
+        if not ranked_nodes:
             return []
         
-        # Start from the most similar document
-        start_node = similar_docs[0][1]
+        # Start from the most relevant document
+        start_node = ranked_nodes[0]
         
         # Simple BFS traversal
         visited = set()
@@ -266,46 +327,87 @@ class QueryEngine:
 class GraphRAGIntegration:
     """Main integration class that combines all components."""
     
-    def __init__(self, config: GraphRAGConfig = None):
+    def __init__(self, config: GraphRAGConfig = None, embedder: Optional[Embedder] = None):
         self.config = config or GraphRAGConfig()
         load_dotenv()
+        set_num_threads(self.config.faiss_threads)
         
-        # Initialize components
-        self.document_processor = DocumentProcessor(self.config)
+        # Initialize components (one embedder shared by ingestion and querying)
+        self.embedder = embedder or Embedder()
+        self.document_processor = DocumentProcessor(self.config, embedder=self.embedder)
         self.knowledge_graph = KnowledgeGraph(self.config)
-        self.embedder = Embedder()
         
         # Query engine will be initialized after documents are processed
         self.query_engine = None
+        
+        # Query results by (normalized query, graph version); a new version makes older results unreachable
+        self.graph_version = 0
+        self.query_cache = ResultCache(self.config.cache_size, self.config.cache_ttl, name="graphrag")
+        # Results by query embedding and graph version, for paraphrases the exact cache misses; cleared with each new version
+        self.semantic_cache = SemanticCache(
+            threshold=self.config.semantic_cache_threshold,
+            max_entries=self.config.semantic_cache_size,
+            ttl=self.config.cache_ttl,
+            name="graphrag_semantic",
+        )
 
     def process_documents(self, documents: List[str]):
         """Process documents and build the integrated system."""
         print("Processing documents...")
         
-        # Process documents
-        splits, faiss_handler = self.document_processor.process_documents(documents)
+        # Chunk and extract concepts, across a process pool when configured
+        concepts = None
+        if self.config.num_workers > 1:
+            splits, concepts = split_and_extract(
+                documents,
+                self.config.chunk_size,
+                self.config.chunk_overlap,
+                concept_backend=self.config.concept_backend,
+                n_workers=self.config.num_workers
+            )
+        else:
+            splits = self.document_processor.split_documents(documents)
         
-        # Get embeddings for graph building
-        embeddings = []
-        for split in splits:
-            embedding = self.embedder.get_embedding(split)
-            embeddings.append(embedding)
-        embeddings = np.array(embeddings)
+        # Embed once in batches; the same vectors feed the index and the graph
+        embeddings = self.document_processor.embed(splits)
+        faiss_handler = self.document_processor.build_index(embeddings)
         
         # Build knowledge graph
-        self.knowledge_graph.build_graph(splits, embeddings)
+        self.knowledge_graph.build_graph(splits, embeddings, concepts)
         
         # Initialize query engine
         self.query_engine = QueryEngine(faiss_handler, self.knowledge_graph, self.config)
+        self.invalidate()
         
         print("Document processing complete!")
 
+    def invalidate(self):
+        """Bump the graph version; call after changing the graph or index in place."""
+        self.graph_version += 1
+        self.semantic_cache.clear()
+
     def query(self, query: str) -> Tuple[str, List[int], List[str]]:
-        """Query the integrated system."""
+        """Query the integrated system (repeated queries on an unchanged graph come from the cache)."""
         if not self.query_engine:
             raise ValueError("Documents must be processed before querying")
         
-        return self.query_engine.query(query, self.embedder)
+        # Both caches file the result under the version it was computed on, so a result
+        # finished after a concurrent process_documents() is never served for the new graph
+        version = self.graph_version
+        key = (normalize_query(query), version)
+        result = self.query_cache.get(key)
+        if result is None:
+            query_embedding = self.embedder.get_embedding(query)
+            hit = self.semantic_cache.lookup(query_embedding, version)
+            if hit is not None:
+                result = hit[0]
+            else:
+                result = self.query_engine.query(query, self.embedder, query_embedding=query_embedding)
+                self.semantic_cache.put(query_embedding, result, version)
+            self.query_cache.put(key, result)
+        response, traversal_path, relevant_content = result
+        # Copies, so callers cannot change the cached lists
+        return response, list(traversal_path), list(relevant_content)
 
     def get_graph_info(self) -> Dict:
         """Get information about the current graph."""
@@ -315,17 +417,20 @@ class GraphRAGIntegration:
         return {
             "nodes": self.knowledge_graph.graph.number_of_nodes(),
             "edges": self.knowledge_graph.graph.number_of_edges(),
-            "density": nx.density(self.knowledge_graph.graph)
+            "density": nx.density(self.knowledge_graph.graph),
+            "version": self.graph_version,
+            "query_cache": self.query_cache.stats(),
+            "semantic_cache": self.semantic_cache.stats()
         }
 
 
 # Utility functions for integration with existing system
-def integrate_with_existing_notes(notes_file: str = "notes/user_notes.json") -> GraphRAGIntegration:
+def integrate_with_existing_notes(notes_db: str = "notes/notes.db") -> GraphRAGIntegration:
     """Integrate GraphRAG with existing notes system."""
+    from storage.note_store import NoteStore
+    
     # Load existing notes
-    with open(notes_file, 'r') as f:
-        data = json.load(f)
-        notes = data.get("notes", [])
+    notes = NoteStore(notes_db).texts()
     
     # Initialize GraphRAG
     graph_rag = GraphRAGIntegration()
@@ -0,0 +1,37 @@
+# Gunicorn settings for the HiddenThread API: gunicorn -c gunicorn.conf.py wsgi:app
+
+import os
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:3001")
+workers = int(os.getenv("WEB_WORKERS", "2"))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+
+# Import the app (and load the embedder + FAISS index) once in the master,
+# then fork; workers share the model pages copy-on-write.
+preload_app = True
+
+# LLM calls are slow; don't let the arbiter kill workers waiting on Gemini
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Each worker gets its own share of CPU threads for torch/FAISS instead of
+    # every worker spawning one thread per core.
+    intra_op_threads = int(os.getenv("WORKER_CPU_THREADS", "1"))
+    try:
+        import torch
+        torch.set_num_threads(intra_op_threads)
+    except ImportError:
+        pass
+    try:
+        import faiss
+        faiss.omp_set_num_threads(intra_op_threads)
+    except ImportError:
+        pass
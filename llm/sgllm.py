@@ -1,6 +1,22 @@
+import os
 import requests
 import json
 
+from utils.metrics import LLM_ERRORS, span
+
+# Overridable (GEMINI_API_BASE) so benchmarks can point the client at a local stub
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com"
+
+# Returned by generate() when the API call fails; never stored or cached as a suggestion
+FAILED_SUGGESTION = "Could not generate a suggestion due to an error."
+# Stored by older API versions when generation raised
+LEGACY_FAILED_PREFIX = "Could not generate suggestion:"
+
+
+def is_failed_suggestion(text) -> bool:
+    """True for generate()'s failure text (or an older stored failure), which must be regenerated."""
+    return text is None or text == FAILED_SUGGESTION or text.startswith(LEGACY_FAILED_PREFIX)
+
 class SuggestionGenerator:
     def __init__(self, api_key: str):
         self.api_key = api_key
@@ -35,13 +51,17 @@ class SuggestionGenerator:
             "Content-Type": "application/json"
         }
         try:
-            url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-            response = requests.post(url, json=payload, headers=headers)
+            base = os.getenv("GEMINI_API_BASE", DEFAULT_API_BASE)
+            url = f"{base}/v1beta/models/gemini-2.0-flash:generateContent"
+            with span("suggest"):
+                response = requests.post(url, json=payload, headers=headers)
             response.raise_for_status()
             return response.json()["candidates"][0]["content"]["parts"][0]["text"]
         except requests.exceptions.RequestException as e:
+            LLM_ERRORS.inc(client="suggestion")
             print(f"An API request error occurred: {e}")
         except (KeyError, IndexError, json.JSONDecodeError) as e:
+            LLM_ERRORS.inc(client="suggestion")
             print(f"Error parsing LLM response: {e}")
         
-        return "Could not generate a suggestion due to an error."
+        return FAILED_SUGGESTION
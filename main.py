@@ -8,38 +8,32 @@ import re
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from dotenv import load_dotenv
 from embeddings.embedder import Embedder
-from vector_store.faiss_handler import FAISSHandler
+from vector_store.entry_store import EntryStore
 from llm.sgllm import SuggestionGenerator
 from nat.nat_filler import NATFiller
 from rich.console import Console
 from rich.panel import Panel
 from typing import List, Dict, Tuple
 from graph_db.llama_graph import add_note_to_graph
+from storage.note_store import NoteStore
+from utils.similarity import MatchPolicy, select_pairs
 
 
 # --- Constants ---
-NOTES_FILEPATH = "notes/user_notes.json"
+NOTES_DB_PATH = "notes/notes.db"
 SIMILARITY_THRESHOLD = 0.3
+MATCH_POLICY = MatchPolicy(threshold=SIMILARITY_THRESHOLD, top_k=3, max_per_note=6, budget=50)
 FAISS_INDEX_PATH = "vector_store/ht.index"
-ENTRIES_FILE_PATH = "vector_store/entries.json"
-EMBEDDINGS_FILE_PATH = "vector_store/embeddings.npy"
-
-
-def load_notes(filepath: str) -> List[str]:
-    """Loads user notes from a JSON file."""
-    try:
-        with open(filepath) as f:
-            return json.load(f)["notes"]
-    except (FileNotFoundError, KeyError):
-        return []
+ENTRY_TABLE_PATH = "vector_store/entries.bin"
+ENTRIES_FILE_PATH = "vector_store/entries.json"  # legacy layout, imported once
 
 
 def find_and_generate_suggestions(
     entries: List[Tuple],
     embeddings: np.ndarray,
-    indexer: FAISSHandler,
+    entry_store: EntryStore,
     sgllm: SuggestionGenerator,
-    threshold: float,
+    policy: MatchPolicy,
     console: Console,
 ):
     """Searches the index with the given embeddings and generates suggestions."""
@@ -48,32 +42,43 @@ def find_and_generate_suggestions(
         return
 
     console.print("\nSearching for connections...", style="bold green")
-    similar_pairs = indexer.search(embeddings, top_k=5, threshold=threshold)
-
-    if not similar_pairs:
+    ids = {}  # entry -> integer id for select_pairs
+    candidates = []
+    need_rows = [i for i, entry in enumerate(entries) if entry[1] == "need"]
+    if need_rows:
+        # Only availabilities compete for each need's top 5, so near-duplicate needs cannot crowd them out
+        results = entry_store.search(embeddings[need_rows], top_k=5, kind="availability")
+    else:
+        results = []
+    for row, neighbours in zip(need_rows, results):
+        entry = entries[row]
+        for match, score in neighbours:
+            candidates.append((ids.setdefault(entry, len(ids)), ids.setdefault(match, len(ids)), score, entry[2], match[2]))
+
+    # Columns: need id, availability id, score, need note, availability note
+    columns = [np.array(column) for column in zip(*candidates)] if candidates else [np.empty(0)] * 5
+    need_ids, availability_ids, scores = select_pairs(*columns, policy)
+    if not len(scores):
         console.print("[yellow]No strong connections found between needs and available resources.[/yellow]")
         return
 
-    for query_idx, result_idx, score in similar_pairs:
-        type1 = entries[query_idx][1]
-        type2 = entries[result_idx][1]
-
-        if type1 == "need" and type2 == "availability":
-            need_text = entries[query_idx][0]
-            availability_text = entries[result_idx][0]
+    by_id = list(ids)
+    for need_id, availability_id, score in zip(need_ids, availability_ids, scores):
+        need_text = by_id[need_id][0]
+        availability_text = by_id[availability_id][0]
 
-            with console.status("[bold green]Generating suggestion..."):
-                suggestion_text = sgllm.generate(need_text, availability_text)
+        with console.status("[bold green]Generating suggestion..."):
+            suggestion_text = sgllm.generate(need_text, availability_text)
 
-            suggestion_panel = Panel(
-                f"[bold]Need:[/] [italic]{need_text}[/]\n"
-                f"[bold]Availability:[/] [italic]{availability_text}[/]\n\n"
-                f"---\n[bold bright_green]Suggestion:[/] {suggestion_text}",
-                title="[bold yellow]💡 New Connection Found[/]",
-                border_style="green",
-                subtitle=f"Similarity: {score:.2f}",
-            )
-            console.print(suggestion_panel)
+        suggestion_panel = Panel(
+            f"[bold]Need:[/] [italic]{need_text}[/]\n"
+            f"[bold]Availability:[/] [italic]{availability_text}[/]\n\n"
+            f"---\n[bold bright_green]Suggestion:[/] {suggestion_text}",
+            title="[bold yellow]💡 New Connection Found[/]",
+            border_style="green",
+            subtitle=f"Similarity: {score:.2f}",
+        )
+        console.print(suggestion_panel)
 
 
 def main():
@@ -89,38 +94,33 @@ def main():
     # --- Initialization ---
     nat_filler = NATFiller(api_key=API_KEY)
     embedder = Embedder()
-    indexer = FAISSHandler()
+    entry_store = EntryStore(
+        FAISS_INDEX_PATH, ENTRY_TABLE_PATH, legacy_entries_path=ENTRIES_FILE_PATH,
+        storage=os.getenv("ENTRY_STORAGE", "float32"),
+    )
     sgllm = SuggestionGenerator(api_key=API_KEY)
 
     # --- Workflow ---
     # Check if pre-built index and data exist
-    if all(os.path.exists(p) for p in [FAISS_INDEX_PATH, ENTRIES_FILE_PATH, EMBEDDINGS_FILE_PATH]):
-        console.print(f"Loading pre-built index from [cyan]{FAISS_INDEX_PATH}[/cyan]...", style="bold green")
-        indexer.load_index(FAISS_INDEX_PATH)
-
-        console.print(f"Loading entries from [cyan]{ENTRIES_FILE_PATH}[/cyan]...", style="bold green")
-        with open(ENTRIES_FILE_PATH) as f:
-            entries = json.load(f)
-
-        console.print(f"Loading embeddings from [cyan]{EMBEDDINGS_FILE_PATH}[/cyan]...", style="bold green")
-        embeddings = np.load(EMBEDDINGS_FILE_PATH)
-
-        if indexer.index.ntotal != len(embeddings):
-            console.print("[bold red]Error:[/bold red] Index and embeddings are out of sync. Rebuilding index.")
-        else:
-            find_and_generate_suggestions(entries, embeddings, indexer, sgllm, SIMILARITY_THRESHOLD, console)
-            return
+    # The entry store has already mapped the table and checked it against the index,
+    # and the vectors are read back from the index itself
+    if len(entry_store):
+        console.print(f"Loaded {len(entry_store)} entries from [cyan]{ENTRY_TABLE_PATH}[/cyan]", style="bold green")
+        entries, embeddings = entry_store.entries_with_vectors()
+        find_and_generate_suggestions(entries, embeddings, entry_store, sgllm, MATCH_POLICY, console)
+        return
 
-    # If any file is missing or data is out of sync, rebuild everything
+    # If any file is missing or the table does not match the index, rebuild everything
     console.print("\nBuilding index from scratch...", style="yellow")
-    notes = load_notes(NOTES_FILEPATH)
+    notes = NoteStore(NOTES_DB_PATH).all()
     if not notes:
-        console.print(f"[yellow]No notes found in {NOTES_FILEPATH}.[/yellow]")
+        console.print(f"[yellow]No notes found in {NOTES_DB_PATH}.[/yellow]")
         return
 
     nats = []
-    for i, note_text in enumerate(notes):
-        console.print(f"Processing Note {i + 1}...", style="cyan")
+    for record in notes:
+        i, note_text = record["id"], record["content"]
+        console.print(f"Processing Note {i}...", style="cyan")
         nat_raw = nat_filler.fill_nat(note_text)
         try:
             cleaned = re.sub(r"(^```json\s*|```$)", "", nat_raw.strip(), flags=re.MULTILINE)
@@ -133,7 +133,7 @@ def main():
             # Add to knowledge graph using LlamaIndex
             add_note_to_graph(note_text)
         except (json.JSONDecodeError, TypeError):
-            console.print(f"[bold red]Error:[/bold red] Could not parse JSON for Note {i+1}. Skipping.")
+            console.print(f"[bold red]Error:[/bold red] Could not parse JSON for Note {i}. Skipping.")
 
     entries = []
     for nat in nats:
@@ -149,16 +149,13 @@ def main():
     console.print("\nEmbedding notes and building index...", style="bold green")
     texts = [e[0] for e in entries]
     embeddings = np.array(embedder.get_embeddings(texts)).astype("float32")
-    indexer.add(embeddings)
 
-    # Save artifacts for next time
-    console.print(f"Saving index to [cyan]{FAISS_INDEX_PATH}[/cyan]...", style="bold green")
-    indexer.save_index(FAISS_INDEX_PATH)
-    with open(ENTRIES_FILE_PATH, 'w') as f:
-        json.dump(entries, f)
-    np.save(EMBEDDINGS_FILE_PATH, embeddings)
+    # Save artifacts for next time (entries are grouped by note, so table rows follow this order)
+    console.print(f"Saving index to [cyan]{FAISS_INDEX_PATH}[/cyan] and entries to [cyan]{ENTRY_TABLE_PATH}[/cyan]...", style="bold green")
+    entry_store.clear(save=False)
+    entry_store.add(entries, embeddings)
 
-    find_and_generate_suggestions(entries, embeddings, indexer, sgllm, SIMILARITY_THRESHOLD, console)
+    find_and_generate_suggestions(entries, embeddings, entry_store, sgllm, MATCH_POLICY, console)
 
 
 if __name__ == "__main__":
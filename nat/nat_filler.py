@@ -1,8 +1,15 @@
 # nat/nat_filler.py
 
+import os
+import logging
 import requests
 import json
 
+from utils.metrics import LLM_ERRORS, span
+
+# Overridable (GEMINI_API_BASE) so benchmarks can point the client at a local stub
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com"
+
 class NATFiller:
     def __init__(self, api_key: str):
         self.api_key = api_key
@@ -39,14 +46,18 @@ Do not include any explanation, markdown formatting, or additional text. Only re
         }
 
         try:
-            url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-            response = requests.post(url, json=payload, headers=headers)
-            print("RAW RESPONSE:", response.status_code, response.text)
+            base = os.getenv("GEMINI_API_BASE", DEFAULT_API_BASE)
+            url = f"{base}/v1beta/models/gemini-2.0-flash:generateContent"
+            with span("nat"):
+                response = requests.post(url, json=payload, headers=headers)
+            logging.debug("NAT raw response: %s %s", response.status_code, response.text)
             response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
             return response.json()["candidates"][0]["content"]["parts"][0]["text"]
         except requests.exceptions.RequestException as e:
+            LLM_ERRORS.inc(client="nat")
             print(f"An API request error occurred: {e}")
             return "{}"
         except (KeyError, IndexError, json.JSONDecodeError) as e:
+            LLM_ERRORS.inc(client="nat")
             print(f"Error parsing LLM response: {e}")
             return "{}"
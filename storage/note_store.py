@@ -0,0 +1,437 @@
+# Note storage engine: SQLite in WAL mode with stable ids, timestamps and content hashes
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_DB_PATH = "notes/notes.db"
+LEGACY_NOTES_PATH = "notes/user_notes.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    tenant TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_notes_content_hash ON notes(content_hash);
+CREATE TABLE IF NOT EXISTS note_fields (
+    note_id INTEGER NOT NULL REFERENCES notes(id),
+    field TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_note_fields_note ON note_fields(note_id);
+CREATE INDEX IF NOT EXISTS idx_note_fields_value ON note_fields(field, value);
+CREATE TABLE IF NOT EXISTS nat_records (
+    note_id INTEGER PRIMARY KEY REFERENCES notes(id),
+    record TEXT NOT NULL,
+    processed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS suggestions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    need_note_id INTEGER NOT NULL,
+    availability_note_id INTEGER NOT NULL,
+    need TEXT NOT NULL,
+    availability TEXT NOT NULL,
+    suggestion TEXT NOT NULL,
+    score REAL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_suggestions_need_note ON suggestions(need_note_id);
+CREATE INDEX IF NOT EXISTS idx_suggestions_availability_note ON suggestions(availability_note_id);
+CREATE INDEX IF NOT EXISTS idx_suggestions_pair ON suggestions(need, availability);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+# NAT record fields kept per note (the rest of the LLM output is dropped)
+NAT_FIELDS = ("sentiments", "resources_needed", "resources_available", "subgraph_stored")
+
+# Filter name -> NAT field stored in note_fields
+FILTER_FIELDS = {
+    "need": "resources_needed",
+    "availability": "resources_available",
+    "sentiment": "sentiments",
+}
+
+
+def content_hash(content: str) -> str:
+    """Stable hash of a note's text."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _like_pattern(text: str) -> str:
+    """Case-insensitive substring pattern for LIKE ... ESCAPE '\\'."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class NoteStore:
+    def __init__(self, path: str = DEFAULT_DB_PATH, legacy_json_path: Optional[str] = LEGACY_NOTES_PATH):
+        """
+        Open (or create) the note store.
+
+        Appends are a single indexed INSERT, reads page by primary key, and
+        WAL mode lets readers run alongside one writer while SQLite's locking
+        serialises concurrent writers, across threads and processes alike.
+
+        Args:
+            path: SQLite database file
+            legacy_json_path: notes/user_notes.json to import once into an empty store
+        """
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(notes)")}
+            if "tenant" not in columns:
+                # Databases from before notes recorded their tenant; their tenant stays NULL
+                conn.execute("ALTER TABLE notes ADD COLUMN tenant TEXT")
+        if legacy_json_path and self.count() == 0:
+            self.import_json(legacy_json_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        """
+        One connection per thread and process; sqlite3 connections must not be shared.
+
+        Keyed by pid as well: a store opened in a preloading master (gunicorn
+        preload_app) must not hand the master's connection to a forked
+        worker's main thread, since SQLite connections do not survive a fork.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid != os.getpid():
+            # Inherited across fork: kept referenced so it is never used or closed (finalized) here
+            self._local.inherited = conn
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "content": row["content"],
+            "content_hash": row["content_hash"],
+            "created_at": row["created_at"],
+            "tenant": row["tenant"],
+        }
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def version(self) -> int:
+        """Counter incremented by every write; unchanged version means unchanged notes."""
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def add(self, content: str, tenant: Optional[str] = None) -> Dict:
+        """Append one note and return its record."""
+        return self.add_many([content], tenant)[0]
+
+    def add_many(self, contents: List[str], tenant: Optional[str] = None) -> List[Dict]:
+        """
+        Append several notes in one transaction and return their records in order.
+
+        tenant records who owns the notes (the API's X-Tenant-Id), so later
+        changes reach the entry shard the notes were indexed in.
+        """
+        now = datetime.now().isoformat()
+        records = []
+        conn = self._conn()
+        with conn:
+            for content in contents:
+                digest = content_hash(content)
+                cursor = conn.execute(
+                    "INSERT INTO notes (content, content_hash, created_at, tenant) VALUES (?, ?, ?, ?)",
+                    (content, digest, now, tenant),
+                )
+                records.append({
+                    "id": cursor.lastrowid, "content": content, "content_hash": digest,
+                    "created_at": now, "tenant": tenant,
+                })
+            self._bump_version(conn)
+        return records
+
+    def update(self, note_id: int, content: str) -> Optional[Dict]:
+        """Replace a note's text (keeping its id and creation time). Returns the record, or None."""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE notes SET content = ?, content_hash = ? WHERE id = ?",
+                (content, content_hash(content), note_id),
+            )
+            if cursor.rowcount:
+                self._bump_version(conn)
+        return self.get(note_id) if cursor.rowcount else None
+
+    def delete(self, note_id: int) -> bool:
+        """Delete a note with its NAT record and suggestions. Returns False if it did not exist."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM note_fields WHERE note_id = ?", (note_id,))
+            conn.execute("DELETE FROM nat_records WHERE note_id = ?", (note_id,))
+            conn.execute(
+                "DELETE FROM suggestions WHERE need_note_id = ? OR availability_note_id = ?",
+                (note_id, note_id),
+            )
+            cursor = conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+            self._bump_version(conn)
+        return cursor.rowcount > 0
+
+    def set_analysis(self, note_id: int, nat: Dict):
+        """Replace the stored NAT record of a note (and the field rows that filters search)."""
+        record = {field: nat.get(field) for field in NAT_FIELDS}
+        for field in FILTER_FIELDS.values():
+            record[field] = [str(value) for value in record[field] or []]
+        record["subgraph_stored"] = bool(record["subgraph_stored"])
+        rows = [(note_id, field, value) for field in FILTER_FIELDS.values() for value in record[field]]
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO nat_records (note_id, record, processed_at) VALUES (?, ?, ?)",
+                (note_id, json.dumps(record), datetime.now().isoformat()),
+            )
+            conn.execute("DELETE FROM note_fields WHERE note_id = ?", (note_id,))
+            conn.executemany("INSERT INTO note_fields (note_id, field, value) VALUES (?, ?, ?)", rows)
+            self._bump_version(conn)
+
+    def analysis_for(self, note_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Stored NAT record for each of the given notes.
+
+        Returns:
+            {note_id: {sentiments, resources_needed, resources_available,
+            subgraph_stored, processed, processed_at}}; notes never analysed
+            get empty fields and processed=False
+        """
+        analysis = {
+            note_id: {
+                "sentiments": [], "resources_needed": [], "resources_available": [],
+                "subgraph_stored": False, "processed": False, "processed_at": None,
+            }
+            for note_id in note_ids
+        }
+        if not note_ids:
+            return analysis
+        placeholders = ",".join("?" * len(note_ids))
+        rows = self._conn().execute(
+            f"SELECT note_id, record, processed_at FROM nat_records WHERE note_id IN ({placeholders})",
+            list(note_ids),
+        )
+        for note_id, record, processed_at in rows:
+            analysis[note_id].update(json.loads(record), processed=True, processed_at=processed_at)
+        return analysis
+
+    @staticmethod
+    def _suggestion(row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "need_note_id": row["need_note_id"],
+            "availability_note_id": row["availability_note_id"],
+            "need": row["need"],
+            "availability": row["availability"],
+            "suggestion": row["suggestion"],
+            "score": row["score"],
+            "created_at": row["created_at"],
+        }
+
+    def add_suggestions(self, suggestions: List[Dict]) -> List[Dict]:
+        """
+        Store generated suggestions and return them with ids.
+
+        Args:
+            suggestions: dicts with need_note_id, availability_note_id, need,
+                availability, suggestion and optionally score
+        """
+        now = datetime.now().isoformat()
+        stored = []
+        conn = self._conn()
+        with conn:
+            for s in suggestions:
+                record = {
+                    "need_note_id": s["need_note_id"],
+                    "availability_note_id": s["availability_note_id"],
+                    "need": s["need"],
+                    "availability": s["availability"],
+                    "suggestion": s["suggestion"],
+                    "score": s.get("score"),
+                    "created_at": now,
+                }
+                cursor = conn.execute(
+                    "INSERT INTO suggestions (need_note_id, availability_note_id, need, availability, suggestion, score, created_at)"
+                    " VALUES (:need_note_id, :availability_note_id, :need, :availability, :suggestion, :score, :created_at)",
+                    record,
+                )
+                stored.append(dict(record, id=cursor.lastrowid))
+            if stored:
+                self._bump_version(conn)
+        return stored
+
+    def suggestion_texts(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """
+        Latest stored suggestion text for each (need, availability) pair, via the pair index.
+
+        Lets a reprocess reuse suggestions whose need and availability did not
+        change instead of asking the LLM again.
+        """
+        texts = {}
+        conn = self._conn()
+        for need, availability in set(pairs):
+            row = conn.execute(
+                "SELECT suggestion FROM suggestions WHERE need = ? AND availability = ? ORDER BY id DESC LIMIT 1",
+                (need, availability),
+            ).fetchone()
+            if row:
+                texts[(need, availability)] = row[0]
+        return texts
+
+    def suggestions_for(self, note_id: int) -> List[Dict]:
+        """Suggestions where the note supplies the need or the availability."""
+        rows = self._conn().execute(
+            "SELECT * FROM suggestions WHERE need_note_id = ? UNION "
+            "SELECT * FROM suggestions WHERE availability_note_id = ? ORDER BY id",
+            (note_id, note_id),
+        )
+        return [self._suggestion(row) for row in rows]
+
+    def list_suggestions(self, limit: int = 100, after: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+        """One page of suggestions in id order, like list()."""
+        rows = self._conn().execute(
+            "SELECT * FROM suggestions WHERE id > ? ORDER BY id LIMIT ?",
+            (after or 0, limit + 1),
+        ).fetchall()
+        records = [self._suggestion(row) for row in rows[:limit]]
+        next_cursor = records[-1]["id"] if len(rows) > limit else None
+        return records, next_cursor
+
+    def delete_suggestions_for(self, note_id: int) -> int:
+        """Drop every suggestion involving the note. Returns the number deleted."""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM suggestions WHERE need_note_id = ? OR availability_note_id = ?",
+                (note_id, note_id),
+            )
+            if cursor.rowcount:
+                self._bump_version(conn)
+        return cursor.rowcount
+
+    @staticmethod
+    def _filter_sql(filters: Optional[Dict[str, str]]) -> Tuple[str, List]:
+        """SQL conditions matching notes whose field contains the given text, one per filter."""
+        clauses, params = [], []
+        for name, text in (filters or {}).items():
+            if name not in FILTER_FIELDS:
+                raise ValueError(f"Unknown filter: {name}")
+            clauses.append(
+                " AND EXISTS (SELECT 1 FROM note_fields f WHERE f.note_id = notes.id"
+                " AND f.field = ? AND f.value LIKE ? ESCAPE '\\')"
+            )
+            params.extend([FILTER_FIELDS[name], _like_pattern(text)])
+        return "".join(clauses), params
+
+    def get(self, note_id: int) -> Optional[Dict]:
+        """Fetch one note by id."""
+        row = self._conn().execute("SELECT * FROM notes WHERE id = ?", (note_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def get_many(self, note_ids: List[int]) -> List[Dict]:
+        """Fetch notes by id, in the order given (missing ids are skipped)."""
+        if not note_ids:
+            return []
+        placeholders = ",".join("?" * len(note_ids))
+        rows = self._conn().execute(f"SELECT * FROM notes WHERE id IN ({placeholders})", list(note_ids))
+        by_id = {row["id"]: self._record(row) for row in rows}
+        return [by_id[note_id] for note_id in note_ids if note_id in by_id]
+
+    def filter_ids(self, note_ids: List[int], filters: Dict[str, str]) -> List[int]:
+        """The subset of note_ids matching all filters, in the order given."""
+        if not note_ids:
+            return []
+        where, params = self._filter_sql(filters)
+        placeholders = ",".join("?" * len(note_ids))
+        rows = self._conn().execute(
+            f"SELECT id FROM notes WHERE id IN ({placeholders}){where}",
+            list(note_ids) + params,
+        )
+        keep = {row[0] for row in rows}
+        return [note_id for note_id in note_ids if note_id in keep]
+
+    def list(
+        self,
+        limit: int = 50,
+        after: Optional[int] = None,
+        filters: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        One page of notes in id order.
+
+        Args:
+            limit: Page size
+            after: Cursor from the previous page
+            filters: {"need" | "availability" | "sentiment": text}; a note matches
+                when one of its values for every given field contains the text
+
+        Returns:
+            (records, next_cursor) where next_cursor is the id to pass as `after`
+            for the following page, or None on the last page
+        """
+        where, params = self._filter_sql(filters)
+        rows = self._conn().execute(
+            f"SELECT * FROM notes WHERE id > ?{where} ORDER BY id LIMIT ?",
+            [after or 0] + params + [limit + 1],
+        ).fetchall()
+        records = [self._record(row) for row in rows[:limit]]
+        next_cursor = records[-1]["id"] if len(rows) > limit else None
+        return records, next_cursor
+
+    def all(self) -> List[Dict]:
+        """Every note in id order."""
+        return [self._record(row) for row in self._conn().execute("SELECT * FROM notes ORDER BY id")]
+
+    def texts(self) -> List[str]:
+        """Every note's text in id order."""
+        return [row[0] for row in self._conn().execute("SELECT content FROM notes ORDER BY id")]
+
+    def content_hashes(self) -> Dict[int, str]:
+        """{note_id: content_hash} for every note, without reading the texts."""
+        return dict(self._conn().execute("SELECT id, content_hash FROM notes").fetchall())
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def import_json(self, path: str) -> int:
+        """Import notes from the legacy {"notes": [...]} JSON file. Returns the number imported."""
+        try:
+            with open(path) as f:
+                notes = json.load(f).get("notes", [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        notes = [n for n in notes if isinstance(n, str) and n.strip()]
+        if notes:
+            self.add_many(notes)
+            print(f"Imported {len(notes)} notes from {path} into {self.path}")
+        return len(notes)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            if self._local.pid == os.getpid():
+                conn.close()
+            self._local.conn = None
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the micro-batching embedder: merged calls, per-caller results, error propagation
+"""
+
+import sys
+import os
+import threading
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from embeddings.batching import BatchingEmbedder
+
+
+class FakeEmbedder:
+    """Deterministic 'embeddings' (text length, first char code) with a fixed cost per call."""
+
+    def __init__(self, call_seconds: float = 0.01):
+        self.call_seconds = call_seconds
+        self.batches = []
+
+    def get_embeddings(self, texts, batch_size: int = 32):
+        if any(text == "boom" for text in texts):
+            raise RuntimeError("model failed")
+        self.batches.append(len(texts))
+        time.sleep(self.call_seconds)
+        return np.array([[len(text), ord(text[0]) if text else 0] for text in texts], dtype="float32").reshape(-1, 2)
+
+
+def test_merged_batches():
+    """Concurrent callers share model calls and each gets exactly its own rows."""
+    fake = FakeEmbedder()
+    embedder = BatchingEmbedder(fake, max_batch_size=16, max_wait_ms=20)
+    results, errors = {}, []
+
+    def client(i):
+        try:
+            texts = [f"{chr(97 + i % 26)}{'x' * j}" for j in range(i % 3 + 1)]
+            results[i] = (texts, embedder.get_embeddings(texts))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(24)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    for texts, vectors in results.values():
+        assert vectors.tolist() == [[len(t), ord(t[0])] for t in texts]
+    assert sum(fake.batches) == sum(len(texts) for texts, _ in results.values())
+    assert len(fake.batches) < 24 and max(fake.batches) <= 16 + 2
+    single = embedder.get_embedding("hello")
+    assert single.tolist() == [5, ord("h")]
+    print(f"✓ 24 concurrent requests served by {len(fake.batches)} model calls (sizes {fake.batches})")
+
+
+def test_errors_reach_callers():
+    """A failing batch raises in every caller that was part of it; the worker keeps running."""
+    embedder = BatchingEmbedder(FakeEmbedder(call_seconds=0), max_wait_ms=1)
+    try:
+        embedder.get_embeddings(["ok", "boom"])
+        raise AssertionError("error swallowed")
+    except RuntimeError as e:
+        assert str(e) == "model failed"
+    assert embedder.get_embeddings(["fine"]).shape == (1, 2)
+    print("✓ model errors propagate to the callers")
+
+
+if __name__ == "__main__":
+    test_merged_batches()
+    test_errors_reach_callers()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test that ConceptExtractor gives the same concepts as the per-token NLTK loop it replaced
+"""
+
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from utils.concept_extractor import ConceptExtractor
+
+SENTENCES = [
+    "Need a QUIET place to read, anywhere near Indiranagar?",
+    "Looking for study partners for Data Structures and Algorithms classes.",
+    "Can lend my guitar on weekends; guitar lessons also available.",
+    "Offering Python tutoring in 2024 for beginners - evenings only",
+    "Books, notes and past papers: Physics, Chemistry, Biology!",
+]
+
+
+def previous_extract(text, lemmatize):
+    """KnowledgeGraph.extract_concepts before ConceptExtractor: word_tokenize, len > 3, lemmatize each token."""
+    from nltk.tokenize import word_tokenize
+    try:
+        tokens = word_tokenize(text.lower())
+    except LookupError:
+        # No punkt data: skipping sentence splitting gives the same tokens for one sentence
+        tokens = word_tokenize(text.lower(), preserve_line=True)
+    return list(set(lemmatize(token) for token in tokens if len(token) > 3))
+
+
+def test_matches_previous_extractor():
+    """Same concept sets as the old loop, with the same lemmatizer (WordNet when installed)."""
+    extractor = ConceptExtractor(backend="nltk")
+    lemmatize = extractor._lemmatize or str
+    for text in SENTENCES:
+        expected = sorted(previous_extract(text, lemmatize))
+        assert sorted(extractor.extract(text)) == expected, text
+    batch = extractor.extract_batch(SENTENCES)
+    assert [sorted(c) for c in batch] == [sorted(previous_extract(t, lemmatize)) for t in SENTENCES]
+    print(f"✓ ConceptExtractor matches the previous extractor on {len(SENTENCES)} sentences "
+          f"({'WordNet' if extractor._lemmatize else 'no'} lemmas)")
+
+
+def test_lemma_cache():
+    """Each distinct word is lemmatized once across a batch."""
+    extractor = ConceptExtractor(backend="nltk")
+    calls = []
+    lemmatize = extractor._lemmatize or str
+    extractor._lemmatize = lambda word: calls.append(word) or lemmatize(word)
+    extractor.extract_batch(SENTENCES * 3)
+    assert sorted(calls) == sorted(set(calls))
+    assert len(calls) == len({w for t in SENTENCES for w in previous_extract(t, str)})
+    print(f"✓ ConceptExtractor: {len(calls)} lemma lookups for {len(SENTENCES) * 3} texts")
+
+
+if __name__ == "__main__":
+    test_matches_previous_extractor()
+    test_lemma_cache()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Stress test for shared FAISS access: concurrent searches alongside adds, note replacements and compaction,
+and worker processes sharing the index files
+"""
+
+import sys
+import os
+import multiprocessing
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from vector_store.concurrent_index import ConcurrentFAISSHandler, RWLock
+from vector_store.entry_store import EntryStore
+from vector_store.note_search import NoteSearchIndex
+from storage.note_store import NoteStore
+from test_note_search import WordEmbedder
+
+
+def unit_vectors(n: int, dim: int = 384, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run_threads(targets, seconds: float):
+    """Run each target in a loop on its own thread for a while; re-raise the first error."""
+    stop = threading.Event()
+    errors, counts = [], [0] * len(targets)
+
+    def loop(i, target):
+        try:
+            while not stop.is_set():
+                target()
+                counts[i] += 1
+        except Exception as e:  # reported in the main thread
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=loop, args=(i, t)) for i, t in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return counts
+
+
+def test_rwlock():
+    """Readers overlap; a writer excludes readers and other writers."""
+    lock, inside, peak, writer_alone = RWLock(), [0], [0], [True]
+    guard = threading.Lock()
+
+    def read():
+        with lock.read_lock():
+            with guard:
+                inside[0] += 1
+                peak[0] = max(peak[0], inside[0])
+            time.sleep(0.001)
+            with guard:
+                inside[0] -= 1
+
+    def write():
+        with lock.write_lock():
+            with guard:
+                writer_alone[0] &= inside[0] == 0
+            time.sleep(0.001)
+
+    run_threads([read] * 4 + [write], 0.3)
+    assert peak[0] > 1 and writer_alone[0]
+    print(f"✓ readers-writer lock (up to {peak[0]} concurrent readers)")
+
+
+def test_handler_search_while_adding():
+    """Searches on a shared handler stay valid while another thread keeps adding."""
+    vectors = unit_vectors(20_000)
+    handler = ConcurrentFAISSHandler(num_threads=1)
+    handler.add(vectors[:1000])
+    added = [1000]
+
+    def add():
+        if added[0] < len(vectors):
+            handler.add(vectors[added[0]:added[0] + 100])
+            added[0] += 100
+        time.sleep(0.001)  # leave the readers room between writes
+
+    def search():
+        n = handler.index.ntotal
+        scores, ids = handler.search_batch(vectors[:8], top_k=5, exclude_ids=np.arange(8))
+        assert ids.shape == (8, 5) and np.all(ids >= 0) and np.all(ids < len(vectors))
+        assert n <= handler.index.ntotal
+
+    counts = run_threads([add] + [search] * 4, 1.0)
+    assert handler.index.ntotal == added[0] > 1000
+    print(f"✓ ConcurrentFAISSHandler: {sum(counts[1:])} searches while growing to {added[0]} vectors")
+
+
+def test_entry_store_stress():
+    """EntryStore searches by kind never see half-applied adds, replacements or compactions."""
+    vectors = unit_vectors(4000, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None, compact_ratio=0.2)
+        entries = [(f"text {i}", "need" if i % 2 else "availability", i // 4 + 1) for i in range(2000)]
+        store.add(entries, vectors[:2000], save=False)
+        rng = np.random.default_rng(2)
+        state = {"next": 2000}
+
+        def write():
+            time.sleep(0.001)
+            note_id = int(rng.integers(1, 500))
+            fresh = vectors[rng.integers(0, len(vectors), 4)]
+            new = [(f"note {note_id} v{state['next']}", "need" if i % 2 else "availability", note_id) for i in range(4)]
+            state["next"] += 4
+            if state["next"] % 5 == 0:
+                # A new note: vector ids past every selector built so far
+                new = [(text, kind, 500 + state["next"]) for text, kind, _ in new]
+                store.add(new, fresh, save=False)
+            elif state["next"] % 3:
+                store.replace_note(note_id, new, fresh, save=False)
+            else:
+                store.remove_note(note_id, save=False)
+
+        def search():
+            kind = rng.choice(["need", "availability", None])
+            for hits in store.search(vectors[:16], top_k=5, kind=kind):
+                # Hundreds of live entries of each kind: always a full page
+                assert len(hits) == 5
+                assert kind is None or all(entry[1] == kind for entry, _ in hits)
+                assert all(-1.01 <= score <= 1.01 for _, score in hits)
+
+        counts = run_threads([write] + [search] * 4, 1.5)
+    print(f"✓ EntryStore: {sum(counts[1:])} searches during {counts[0]} adds/replacements/removals")
+
+
+def _worker_writes(tmp: str, worker: int, n_notes: int):
+    """One worker process: add its own notes, replace or remove some of them, search in between."""
+    store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+    vectors = unit_vectors(2 * n_notes, seed=10 + worker)
+    for i in range(n_notes):
+        note_id = worker * 1000 + i
+        store.add([(f"w{worker} n{i}", "need", note_id), (f"w{worker} a{i}", "availability", note_id)], vectors[2 * i:2 * i + 2])
+        if i % 5 == 4:
+            store.remove_note(note_id - 1)
+        store.search(vectors[:1], top_k=5, kind="availability")
+
+
+def test_entry_store_processes(n_workers: int = 4, n_notes: int = 40):
+    """Worker processes writing the same entry files keep each other's changes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        observer = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_worker_writes, args=(tmp, w, n_notes)) for w in range(n_workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert all(worker.exitcode == 0 for worker in workers)
+
+        # The observer was opened before the workers wrote; its next read picks their changes up
+        expected = {w * 1000 + i for w in range(n_workers) for i in range(n_notes) if i % 5 != 3}
+        found, _ = observer.entries_with_vectors()
+        assert {note_id for _, _, note_id in found} == expected and len(found) == 2 * len(expected)
+        reopened = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        assert len(reopened) == len(found)
+    print(f"✓ EntryStore: {n_workers} processes x {n_notes} notes, none lost")
+
+
+def test_note_search_workers():
+    """Edits and deletions indexed by one worker's NoteSearchIndex reach another's."""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        ids = [r["id"] for r in notes.add_many(["guitar lessons wanted", "spare bicycle to lend", "quiet reading room"])]
+        index_path = os.path.join(tmp, "notes.index")
+        first, second = NoteSearchIndex(WordEmbedder(), index_path), NoteSearchIndex(WordEmbedder(), index_path)
+        assert first.sync(notes) == 3 and second.sync(notes) == 0  # the second adopts the first's vectors
+
+        notes.update(ids[1], "piano for sale")
+        first.update(ids[1], "piano for sale")
+        notes.delete(ids[2])
+        first.remove(ids[2])
+        second.sync(notes)
+        assert second.search("piano", top_k=1)[0][0] == ids[1]
+        assert ids[2] not in [note_id for note_id, _ in second.search("quiet reading room")]
+        assert second.index.ntotal == 2
+    print("✓ NoteSearchIndex: edits and removals shared between workers")
+
+
+if __name__ == "__main__":
+    test_rwlock()
+    test_handler_search_while_adding()
+    test_entry_store_stress()
+    test_entry_store_processes()
+    test_note_search_workers()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Test script for the entry table: per-note replacement, binary file load and checksum, change log, compaction
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+import faiss
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from vector_store.entry_store import EntryStore, EntryTable
+from vector_store.migrate import migrate
+
+
+def unit_vectors(n: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, 384)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+entries = [
+    ("quiet reading space", "need", 1),
+    ("free library access", "availability", 2),
+    ("daily free time", "availability", 2),
+    ("café nearby ☕", "need", 3),
+]
+
+
+def test_replace_touches_one_note():
+    """Replacing a note tombstones only its rows, and searches no longer return them."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None, compact_ratio=1.0)
+        vectors = unit_vectors(4, 0)
+        store.add(entries, vectors)
+        assert store.note_rows == {1: (0, 1), 2: (1, 3), 3: (3, 4)}
+
+        store.replace_note(2, [("bike to lend", "availability", 2)], unit_vectors(1, 1))
+        assert store.table.n_dead == 2 and len(store) == 3
+        assert store.note_rows[1] == (0, 1) and store.note_rows[2] == (4, 5)
+        found = [entry for entry, _ in store.search(vectors[1:2], top_k=4)[0]]
+        assert ("free library access", "availability", 2) not in found
+        assert ("bike to lend", "availability", 2) in found
+        print(f"✓ replace kept other rows, search sees {len(found)} live entries")
+
+
+def test_search_by_kind():
+    """kind= restricts results to one entry type, across notes and after replacements."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None, compact_ratio=1.0)
+        vectors = unit_vectors(4, 0)
+        store.add(entries, vectors)
+        found = [entry for entry, _ in store.search(vectors[0:1], top_k=4, kind="availability")[0]]
+        assert sorted(found) == sorted(e for e in entries if e[1] == "availability")
+
+        store.replace_note(2, [("bike to lend", "availability", 2)], unit_vectors(1, 1))
+        found = [entry for entry, _ in store.search(vectors[0:1], top_k=4, kind="availability")[0]]
+        assert found == [("bike to lend", "availability", 2)]
+        found = [entry for entry, _ in store.search(vectors[0:1], top_k=4, kind="need")[0]]
+        assert sorted(found) == [("café nearby ☕", "need", 3), ("quiet reading space", "need", 1)]
+        print("✓ search restricted to one entry kind")
+
+
+def test_search_after_add():
+    """Entries added after a search show up in the next one, with and without kind=."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None, compact_ratio=1.0)
+        vectors = unit_vectors(40, 0)
+        store.add([(f"need {i}", "need", i) for i in range(12)], vectors[:12])
+        store.remove_note(0)
+        assert len(store.search(vectors[:1], top_k=5)[0]) == 5
+        assert store.search(vectors[20:21], top_k=5, kind="availability")[0] == []
+
+        # New availabilities (vector ids past the bitmap the first kind search built)
+        store.add([(f"availability {i}", "availability", i) for i in range(20, 40)], vectors[20:40])
+        hits = store.search(vectors[39:40], top_k=5, kind="availability")[0]
+        assert len(hits) == 5 and all(entry[1] == "availability" for entry, _ in hits)
+        assert hits[0][0] == ("availability 39", "availability", 39) and hits[0][1] > 0.999
+        hits = store.search(vectors[:1], top_k=5, kind="need")[0]
+        assert len(hits) == 5 and all(entry[1] == "need" for entry, _ in hits)
+        assert len(store.search(vectors[:1], top_k=50)[0]) == 31
+        print("✓ searches see entries added after earlier searches")
+
+
+def test_memory_mapped_reload():
+    """A saved table reloads memory-mapped with the same entries and stays appendable."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = (os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        store = EntryStore(*paths, compact_ratio=1.0)
+        store.add(entries, unit_vectors(4, 0))
+        store.remove_note(1)
+
+        reloaded = EntryStore(*paths, compact_ratio=1.0)
+        assert isinstance(reloaded.table.note_ids, np.memmap)
+        assert reloaded.note_entries(3) == [("café nearby ☕", "need", 3)]
+        assert reloaded.note_rows.keys() == {2, 3} and len(reloaded) == 3
+        reloaded.add([("a spare desk", "availability", 5)], unit_vectors(1, 2))
+        assert reloaded.note_entries(5) == [("a spare desk", "availability", 5)]
+        print("✓ memory-mapped reload")
+
+
+def test_change_log():
+    """Saves append to the change log; readers apply just its new records; torn and stale logs are ignored."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = (os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        log_path = os.path.join(tmp, "entries.log")
+        store = EntryStore(*paths, compact_ratio=1.0)
+        store.add(entries, unit_vectors(4, 0))  # the first save writes the index and table
+        snapshot = [os.stat(p).st_mtime_ns for p in paths[:2]]
+        reader = EntryStore(*paths, compact_ratio=1.0)
+        index = reader.indexer.index
+
+        store.add([("a spare desk", "availability", 5)], unit_vectors(1, 2))
+        store.remove_note(1)
+        assert [os.stat(p).st_mtime_ns for p in paths[:2]] == snapshot and os.path.exists(log_path)
+        found = [entry for entry, _ in reader.search(unit_vectors(1, 2), top_k=5)[0]]
+        assert found[0] == ("a spare desk", "availability", 5) and len(found) == 4
+        assert reader.indexer.index is index  # caught up from the log, without re-reading the index
+
+        # A record torn by a writer that died mid-append is skipped, then overwritten
+        with open(log_path, "ab") as f:
+            f.write(b"\x01\x02\x03")
+        assert len(EntryStore(*paths)) == 4
+        store.add([("a quiet corner", "availability", 6)], unit_vectors(1, 3))
+        assert EntryStore(*paths).note_entries(6) == [("a quiet corner", "availability", 6)]
+
+        # A log left next to a newer table (a writer died before dropping it) is not replayed
+        with open(log_path, "rb") as f:
+            stale = f.read()
+        store.save()
+        assert not os.path.exists(log_path)
+        with open(log_path, "wb") as f:
+            f.write(stale)
+        reopened = EntryStore(*paths)
+        assert len(reopened) == 5 and reopened.note_entries(5) == [("a spare desk", "availability", 5)]
+        print("✓ change log appended, replayed incrementally, torn and stale logs ignored")
+
+
+def test_compaction():
+    """Once enough rows are dead the table and index drop them."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None, compact_ratio=0.25)
+        store.add(entries, unit_vectors(4, 0))
+        store.remove_note(2)
+        assert store.table.n_dead == 0 and store.table.size == 2
+        assert store.indexer.index.ntotal == 2
+        assert store.note_entries(3) == [("café nearby ☕", "need", 3)]
+        print("✓ compaction")
+
+
+def test_checksum_mismatch():
+    """A table whose vector ids do not match the index is rejected, not trusted."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = (os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        store = EntryStore(*paths, compact_ratio=1.0)
+        store.add(entries, unit_vectors(4, 0))
+
+        # Same number of vectors, different ids: a count check alone would accept it
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(384))
+        index.add_with_ids(unit_vectors(4, 0), np.arange(10, 14, dtype="int64"))
+        faiss.write_index(index, paths[0])
+        assert len(EntryStore(*paths)) == 0
+
+        # A corrupted id column fails the header checksum
+        store.save()
+        with open(paths[1], "r+b") as f:
+            f.seek(64 + 4 * 8)
+            f.write(np.int64(99).tobytes())
+        assert EntryTable.load(paths[1]) is None
+        print("✓ checksum mismatch rejected")
+
+
+def test_vectors_from_index():
+    """Raw vectors come back from the index, matching what was added."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None, compact_ratio=1.0)
+        vectors = unit_vectors(4, 0)
+        store.add(entries, vectors)
+        store.remove_note(1)
+        found, found_vectors = store.entries_with_vectors()
+        assert found == entries[1:] and np.allclose(found_vectors, vectors[1:])
+        assert np.allclose(store.note_vectors(2), vectors[1:3])
+        print("✓ vectors read back from the index")
+
+
+def test_migrate_embeddings():
+    """entries.json + embeddings.npy without an index migrate to one copy of the vectors."""
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors = unit_vectors(4, 0)
+        with open(os.path.join(tmp, "entries.json"), "w") as f:
+            json.dump([list(e) for e in entries], f)
+        np.save(os.path.join(tmp, "embeddings.npy"), vectors)
+
+        assert migrate(tmp)
+        assert sorted(os.listdir(tmp)) == ["entries.bin", "ht.index", "ht.index.lock"]
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        found, found_vectors = store.entries_with_vectors()
+        assert found == entries and np.allclose(found_vectors, vectors)
+        print("✓ embeddings.npy migrated into the index")
+
+
+def test_quantized_storage():
+    """Quantized modes re-rank from the full-precision file, so scores match float32 exactly."""
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors = unit_vectors(4, 0)
+        paths = (os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), None)
+        exact = EntryStore(*paths)
+        exact.add(entries, vectors)
+        expected = exact.search(vectors, top_k=4)
+
+        for storage in ("fp16", "sq8", "binary"):
+            # Each load converts the index saved by the previous mode
+            store = EntryStore(*paths, storage=storage)
+            assert len(store.vector_file) == 4
+            for got, want in zip(store.search(vectors, top_k=4), expected):
+                assert [e for e, _ in got] == [e for e, _ in want]
+                assert np.allclose([s for _, s in got], [s for _, s in want], atol=1e-5)
+        store.replace_note(2, [("bike to lend", "availability", 2)], unit_vectors(1, 1))
+
+        restored = EntryStore(*paths)
+        assert restored.vector_file is None and not os.path.exists(store.vectors_path)
+        assert restored.note_entries(2) == [("bike to lend", "availability", 2)]
+        assert np.allclose(restored.note_vectors(2), unit_vectors(1, 1))
+        print("✓ fp16/sq8/binary storage with exact re-ranking")
+
+
+def test_legacy_import():
+    """A positional ht.index + entries.json pair (as main.py writes) is imported."""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = faiss.IndexFlatIP(384)
+        index.add(unit_vectors(4, 0))
+        faiss.write_index(index, os.path.join(tmp, "ht.index"))
+        with open(os.path.join(tmp, "entries.json"), "w") as f:
+            json.dump([list(e) for e in entries], f)
+
+        store = EntryStore(os.path.join(tmp, "ht.index"), os.path.join(tmp, "entries.bin"), os.path.join(tmp, "entries.json"))
+        assert len(store) == 4 and store.note_entries(2)[1] == ("daily free time", "availability", 2)
+        print("✓ legacy entries.json imported")
+
+
+if __name__ == "__main__":
+    test_replace_touches_one_note()
+    test_search_by_kind()
+    test_search_after_add()
+    test_memory_mapped_reload()
+    test_change_log()
+    test_compaction()
+    test_checksum_mismatch()
+    test_vectors_from_index()
+    test_migrate_embeddings()
+    test_quantized_storage()
+    test_legacy_import()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for FAISSHandler batch search: array results, thresholds, self-exclusion and range search
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from vector_store.faiss_handler import FAISSHandler
+
+
+def unit_vectors(n: int, dim: int = 384, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_search_batch():
+    """Arbitrary queries get (scores, ids) arrays matching brute force, best first."""
+    vectors, queries = unit_vectors(500), unit_vectors(20, seed=1)
+    handler = FAISSHandler()
+    handler.add(vectors)
+    scores, ids = handler.search_batch(queries, top_k=5)
+    assert scores.shape == ids.shape == (20, 5)
+    expected = np.argsort(-(queries @ vectors.T), axis=1)[:, :5]
+    assert np.array_equal(ids, expected)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+    print("✓ batch search against arbitrary queries")
+
+
+def test_threshold_and_exclusion():
+    """Below-threshold and excluded hits become id -1, surviving hits move to the front."""
+    vectors = unit_vectors(200)
+    handler = FAISSHandler()
+    handler.add(vectors)
+    own = np.arange(10)
+    scores, ids = handler.search_batch(vectors[:10], top_k=3, exclude_ids=own)
+    assert ids.shape == (10, 3) and not np.any(ids == own[:, None]) and np.all(ids >= 0)
+    scores, ids = handler.search_batch(vectors[:10], top_k=3, threshold=0.5, exclude_ids=own)
+    assert np.all(ids == -1) and np.all(scores == -np.inf)  # random vectors are near-orthogonal
+    scores, ids = handler.search_batch(vectors[:10], top_k=3, threshold=0.5)
+    assert np.array_equal(ids[:, 0], own) and np.all(ids[:, 1:] == -1)
+    empty = FAISSHandler()
+    assert empty.search_batch(vectors[:2], top_k=3)[1].shape == (2, 0)
+    print("✓ vectorized threshold and self-exclusion")
+
+
+def test_range_search():
+    """range_search returns every hit above the threshold in FAISS's lims layout."""
+    vectors = unit_vectors(300)
+    vectors[1] = vectors[0] * 0.8 + vectors[1] * 0.2
+    vectors[1] /= np.linalg.norm(vectors[1])
+    handler = FAISSHandler()
+    handler.add(vectors)
+    lims, scores, ids = handler.range_search(vectors[:3], 0.5)
+    assert sorted(ids[lims[0]:lims[1]].tolist()) == [0, 1]
+    assert ids[lims[2]:lims[3]].tolist() == [2]
+    lims, scores, ids = handler.range_search(vectors[:3], 0.5, exclude_ids=np.arange(3))
+    assert lims.tolist() == [0, 1, 2, 2] and ids.tolist() == [1, 0]
+    print("✓ range search with exclusion")
+
+
+def test_search_compatible():
+    """search() keeps its (query row, index id, score) tuples and skips index id == query row."""
+    vectors = unit_vectors(50)
+    handler = FAISSHandler()
+    handler.add(vectors)
+    results = handler.search(vectors[:5], top_k=3, threshold=-1.0)
+    assert len(results) == 10 and all(i != idx for i, idx, _ in results)
+    print("✓ search() compatibility wrapper")
+
+
+if __name__ == "__main__":
+    test_search_batch()
+    test_threshold_and_exclusion()
+    test_range_search()
+    test_search_compatible()
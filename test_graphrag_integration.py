@@ -56,7 +56,32 @@ def test_graphrag_integration():
         print(f"  Response: {response[:100]}...")
         print(f"  Traversal path: {traversal_path}")
         print(f"  Relevant content chunks: {len(relevant_content)}")
-        
+
+        # Test the query cache: a repeat is served from it until the graph changes
+        hits = graph_rag.query_cache.hits
+        cached = graph_rag.query("  what is machine   learning? ")
+        assert cached == (response, traversal_path, relevant_content)
+        assert graph_rag.query_cache.hits == hits + 1
+        version = graph_rag.graph_version
+        graph_rag.process_documents(sample_documents)
+        assert graph_rag.graph_version == version + 1
+        graph_rag.query("What is machine learning?")
+        assert graph_rag.query_cache.hits == hits + 1
+        # A query that started on the old graph and stores its result after the rebuild
+        stale_embedding = graph_rag.embedder.get_embedding("What is deep learning?")
+        graph_rag.semantic_cache.put(stale_embedding, ("stale", [], []), version)
+        assert graph_rag.query("What is deep learning?")[0] != "stale"
+        print("✓ Repeated queries cached until the graph is rebuilt")
+
+        # Test the incremental text index: a rebuild only indexes chunks that are new
+        text_index = graph_rag.knowledge_graph.text_index
+        indexed_rows = len(text_index.doc_ids)
+        graph_rag.process_documents(sample_documents + ["Reinforcement learning trains agents through rewards."])
+        assert graph_rag.knowledge_graph.text_index is text_index
+        assert len(text_index.doc_ids) == indexed_rows + 1 and len(text_index) == indexed_rows + 1
+        assert text_index.search(["reinforcement"], 1)[0][0] == indexed_rows
+        print("✓ Rebuilds index only new chunks for lexical search")
+
         # Test graph info
         graph_info = graph_rag.get_graph_info()
         print(f"✓ Graph info retrieved: {graph_info}")
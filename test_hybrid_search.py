@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the BM25 index and reciprocal rank fusion used by GraphRAG hybrid search
+"""
+
+import sys
+import os
+import time
+import random
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from vector_store.bm25_index import BM25Index, tokenize, reciprocal_rank_fusion
+
+chunks = [
+    "I love reading and would like to join a reading club.",
+    "I found out about CubbonPark Reader's Club, which is a free library near me.",
+    "I need a quiet place to read and would love free access to books.",
+    "I have some daily free time available.",
+]
+
+
+def test_exact_name_hits_right_chunk():
+    """An exact name should rank the chunk containing it first."""
+    index = BM25Index()
+    for i, chunk in enumerate(chunks):
+        index.add(i, tokenize(chunk))
+
+    results = index.search(tokenize("CubbonPark"), top_k=3)
+    assert results and results[0][0] == 1, results
+    print(f"✓ 'CubbonPark' -> chunk {results[0][0]} (score {results[0][1]:.3f})")
+
+
+def test_incremental_add():
+    """Documents added after a search are visible to the next search."""
+    index = BM25Index()
+    index.add(0, tokenize(chunks[0]))
+    assert index.search(tokenize("library"), top_k=3) == []
+
+    index.add(1, tokenize(chunks[1]))
+    results = index.search(tokenize("library"), top_k=3)
+    assert [doc_id for doc_id, _ in results] == [1], results
+    print("✓ Incremental add is searchable")
+
+
+def test_remove_and_replace():
+    """Removed documents stop matching; re-adding a document replaces its text."""
+    index = BM25Index()
+    for i, chunk in enumerate(chunks):
+        index.add(i, tokenize(chunk))
+    assert index.remove(1) and not index.remove(1)
+    assert index.search(tokenize("CubbonPark"), top_k=3) == []
+    index.add(2, tokenize("A CubbonPark bench"))
+    assert [doc_id for doc_id, _ in index.search(tokenize("CubbonPark quiet"), top_k=3)] == [2]
+    assert len(index) == 3
+    print("✓ remove and replace")
+
+
+def test_repeated_edits():
+    """Editing one document many times leaves tombstones that must not turn a term's idf negative."""
+    index = BM25Index()
+    index.add(0, tokenize("guitar lessons wanted"))
+    index.add(1, tokenize("spare bicycle to lend"))
+    for _ in range(5):
+        index.add(0, tokenize("guitar lessons wanted on weekends"))
+    # 'guitar' now has 6 postings but only 1 live document out of 2
+    results = index.search(tokenize("guitar bicycle"), top_k=2)
+    assert all(score > 0 for _, score in results), results
+    results = index.search(tokenize("guitar lessons"), top_k=2)
+    assert [doc_id for doc_id, _ in results] == [0] and results[0][1] > 0, results
+    print("✓ repeated edits keep idf positive")
+
+
+def test_reciprocal_rank_fusion():
+    """A document ranked well by both lists wins over one ranked first by only one."""
+    fused = reciprocal_rank_fusion([[3, 1, 2], [1, 0]], k=60)
+    assert fused[0][0] == 1, fused
+    assert {doc_id for doc_id, _ in fused} == {0, 1, 2, 3}
+    print(f"✓ RRF order: {[doc_id for doc_id, _ in fused]}")
+
+
+def test_query_latency_at_scale(n_chunks: int = 100_000, max_ms: float = 20.0):
+    """Average query latency on a synthetic corpus stays under max_ms."""
+    rng = random.Random(0)
+    vocab = [f"term{i}" for i in range(20_000)]
+    index = BM25Index()
+    for i in range(n_chunks):
+        index.add(i, rng.choices(vocab, k=40))
+
+    queries = [rng.choices(vocab, k=3) for _ in range(200)]
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q, top_k=10)
+    per_query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    assert per_query_ms < max_ms, f"{per_query_ms:.3f} ms/query"
+    print(f"✓ {n_chunks} chunks: {per_query_ms:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    test_exact_name_hits_right_chunk()
+    test_incremental_add()
+    test_remove_and_replace()
+    test_repeated_edits()
+    test_reciprocal_rank_fusion()
+    test_query_latency_at_scale()
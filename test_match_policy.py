@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for need -> availability match selection: top-k, mutual neighbours, per-note caps and budget
+"""
+
+import sys
+import os
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from utils.similarity import MatchPolicy, select_pairs
+
+# 3 needs (notes 1, 1, 2) x 3 availabilities (notes 3, 4, 4)
+scores = np.array([
+    [0.90, 0.80, 0.10],
+    [0.85, 0.20, 0.70],
+    [0.95, 0.60, 0.50],
+])
+need_notes = [1, 1, 2]
+availability_notes = [3, 4, 4]
+
+
+def select_matrix(scores, need_notes, availability_notes, policy: MatchPolicy):
+    """Every cell of a (needs x availabilities) score matrix as a candidate pair, ids = row / column."""
+    rows, cols = np.indices(np.shape(scores)).reshape(2, -1)
+    need_notes, availability_notes = np.asarray(need_notes), np.asarray(availability_notes)
+    return select_pairs(rows, cols, np.asarray(scores)[rows, cols], need_notes[rows], availability_notes[cols], policy)
+
+
+def pairs(policy: MatchPolicy):
+    rows, cols, _ = select_matrix(scores, need_notes, availability_notes, policy)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def test_threshold_and_top_k():
+    """Pairs below the threshold are dropped and each need keeps its best top_k, best first."""
+    assert pairs(MatchPolicy(threshold=0.3, top_k=0)) == [(2, 0), (0, 0), (1, 0), (0, 1), (1, 2), (2, 1), (2, 2)]
+    assert pairs(MatchPolicy(threshold=0.3, top_k=1)) == [(2, 0), (0, 0), (1, 0)]
+    print("✓ threshold and top-k per need")
+
+
+def test_mutual():
+    """Mutual matching keeps a pair only if each side is in the other's top_k."""
+    assert pairs(MatchPolicy(threshold=0.3, top_k=1, mutual=True)) == [(2, 0)]
+    assert pairs(MatchPolicy(threshold=0.3, top_k=2, mutual=True)) == [(2, 0), (0, 0), (0, 1), (1, 2), (2, 1)]
+    print("✓ mutual nearest neighbours")
+
+
+def test_note_cap_and_budget():
+    """No note takes part in more than max_per_note pairs, and budget keeps the best overall."""
+    selected = pairs(MatchPolicy(threshold=0.3, top_k=0, max_per_note=2))
+    assert selected == [(2, 0), (0, 0), (0, 1), (2, 1)]
+    for note in (1, 2, 3, 4):
+        involved = [p for p in selected if need_notes[p[0]] == note or availability_notes[p[1]] == note]
+        assert len(involved) <= 2
+    assert pairs(MatchPolicy(threshold=0.3, top_k=0, budget=2)) == [(2, 0), (0, 0)]
+    own = select_matrix(np.array([[0.9, 0.8]]), [1], [1, 2], MatchPolicy(same_note=False))
+    assert own[1].tolist() == [1]
+    print("✓ per-note cap and global budget")
+
+
+def test_bounded_at_scale():
+    """On a large matrix the output is bounded by the budget and selection stays fast."""
+    rng = np.random.default_rng(0)
+    big = rng.uniform(0, 1, (2000, 2000)).astype("float32")
+    notes = np.arange(2000) // 4
+    policy = MatchPolicy(threshold=0.001, top_k=3, max_per_note=6, budget=50)
+    start = time.perf_counter()
+    rows, cols, picked = select_matrix(big, notes, notes + 1000, policy)
+    elapsed = time.perf_counter() - start
+    assert len(picked) == 50 and np.all(np.diff(picked) <= 0)
+    print(f"✓ 4M candidate pairs -> {len(picked)} suggestions in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    test_threshold_and_top_k()
+    test_mutual()
+    test_note_cap_and_budget()
+    test_bounded_at_scale()
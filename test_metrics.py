@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script for the metrics registry: counters, histograms, spans and the Prometheus text format
+"""
+
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from utils.metrics import MetricsRegistry, REGISTRY, STAGE_SECONDS, span
+
+
+def test_counter():
+    """Counters add up per label set and render one sample each."""
+    registry = MetricsRegistry()
+    errors = registry.counter("llm_errors_total", "Failed calls", ("client",))
+    errors.inc(client="nat")
+    errors.inc(2, client="nat")
+    errors.inc(client="suggestion")
+    assert errors.value(client="nat") == 3
+    assert registry.counter("llm_errors_total", "Failed calls", ("client",)) is errors
+    text = registry.render()
+    assert "# TYPE llm_errors_total counter" in text
+    assert 'llm_errors_total{client="nat"} 3' in text
+    assert 'llm_errors_total{client="suggestion"} 1' in text
+    try:
+        errors.inc(kind="nat")
+        raise AssertionError("wrong labels accepted")
+    except ValueError:
+        pass
+    print("✓ counters")
+
+
+def test_histogram():
+    """Histogram buckets are cumulative, upper-inclusive, and end with +Inf, _sum and _count."""
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage="embed")
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{stage="embed",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="embed",le="1"} 3' in lines
+    assert 'stage_seconds_bucket{stage="embed",le="+Inf"} 4' in lines
+    assert 'stage_seconds_sum{stage="embed"} 3.65' in lines
+    assert 'stage_seconds_count{stage="embed"} 4' in lines
+    print("✓ histograms")
+
+
+def test_span():
+    """span() observes one sample into the shared stage histogram."""
+    before = STAGE_SECONDS.count(stage="test_stage")
+    with span("test_stage"):
+        sum(range(1000))
+    assert STAGE_SECONDS.count(stage="test_stage") == before + 1
+    assert 'ht_stage_seconds_count{stage="test_stage"}' in REGISTRY.render()
+    print("✓ spans")
+
+
+if __name__ == "__main__":
+    test_counter()
+    test_histogram()
+    test_span()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for NoteSearchIndex: keeping the persisted note vectors in step with the note store
+"""
+
+import sys
+import os
+import tempfile
+import zlib
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from vector_store.note_search import NoteSearchIndex
+from storage.note_store import NoteStore
+
+
+class WordEmbedder:
+    """Bag-of-words vectors from hashed tokens: enough to tell notes apart without loading a model."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_embeddings(self, texts):
+        self.calls += len(texts)
+        vectors = np.zeros((len(texts), 384), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 384] += 1
+        return vectors
+
+
+def dense_ranking(search: NoteSearchIndex, query: str):
+    """Note ids by vector similarity alone, so a stale vector cannot hide behind BM25."""
+    _, ids = search.index.search(search._embed([query]), search.index.ntotal)
+    return [int(i) for i in ids[0] if i != -1]
+
+
+def test_edit_while_unloaded():
+    """Notes edited or deleted while no index was loaded are re-indexed by the next sync()."""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        ids = [r["id"] for r in notes.add_many(["guitar lessons wanted", "spare guitar to lend", "quiet reading room"])]
+        index_path = os.path.join(tmp, "notes.index")
+        assert NoteSearchIndex(WordEmbedder(), index_path).sync(notes) == 3
+
+        # Edited and deleted behind the index's back (another worker, or before a restart)
+        notes.update(ids[0], "piano for sale")
+        notes.delete(ids[2])
+
+        embedder = WordEmbedder()
+        search = NoteSearchIndex(embedder, index_path)
+        assert search.sync(notes) == 1 and embedder.calls == 1  # only the edited note is re-embedded
+        assert dense_ranking(search, "piano for sale")[0] == ids[0]
+        assert dense_ranking(search, "guitar lessons wanted")[0] == ids[1]
+        assert search.search("guitar lessons wanted")[0][0] == ids[1]
+        assert search.index.ntotal == 2 and ids[2] not in dense_ranking(search, "quiet reading room")
+
+        # Nothing changed since: no embedding, and a fresh index embeds nothing either
+        assert search.sync(notes) == 0
+        reopened = WordEmbedder()
+        assert NoteSearchIndex(reopened, index_path).sync(notes) == 0 and reopened.calls == 0
+    print("✓ NoteSearchIndex: edits made while unloaded are re-embedded on sync")
+
+
+def test_index_without_hashes():
+    """An index saved without content hashes is re-embedded once rather than trusted."""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        notes.add_many(["guitar lessons wanted", "spare bicycle to lend"])
+        index_path = os.path.join(tmp, "notes.index")
+        NoteSearchIndex(WordEmbedder(), index_path).sync(notes)
+        os.remove(index_path + ".hashes")
+
+        search = NoteSearchIndex(WordEmbedder(), index_path)
+        assert search.sync(notes) == 2 and search.index.ntotal == 2
+        assert search.sync(notes) == 0
+    print("✓ NoteSearchIndex: vectors with no recorded hash are re-embedded")
+
+
+def test_unrelated_query():
+    """A query sharing neither words nor meaning with any note returns no notes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        ids = [r["id"] for r in notes.add_many([f"spare guitar number {i} to lend" for i in range(30)])]
+        search = NoteSearchIndex(WordEmbedder(), os.path.join(tmp, "notes.index"))
+        search.sync(notes)
+        assert search.search("quantum chromodynamics lecture") == []
+        assert len(search.search("guitar")) == len(ids)
+        assert search.search("number 7 wanted")[0][0] == ids[7]
+    print("✓ NoteSearchIndex: unrelated queries return no notes")
+
+
+if __name__ == "__main__":
+    test_edit_while_unloaded()
+    test_index_without_hashes()
+    test_unrelated_query()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQLite note store: stable ids, pagination, concurrent writers and JSON migration
+"""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from storage.note_store import NoteStore, content_hash
+
+
+def test_ids_and_hashes():
+    """Each note gets an increasing id, a timestamp and a content hash."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        first = store.add("I need a quiet place to read.")
+        second, third = store.add_many(["I know a free library nearby.", "I have free time on weekends."])
+        assert first["id"] < second["id"] < third["id"]
+        assert second["content_hash"] == content_hash("I know a free library nearby.")
+        assert store.get(first["id"])["content"] == "I need a quiet place to read."
+        assert store.get(first["id"])["created_at"] == first["created_at"]
+        assert store.count() == 3
+        print(f"✓ ids {[first['id'], second['id'], third['id']]}")
+
+
+def test_pagination():
+    """Cursor pages cover every note exactly once, in order."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        store.add_many([f"note {i}" for i in range(25)])
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            records, cursor = store.list(limit=10, after=cursor)
+            seen.extend(r["content"] for r in records)
+            pages += 1
+            if cursor is None:
+                break
+        assert seen == [f"note {i}" for i in range(25)], seen
+        assert pages == 3
+        print(f"✓ 25 notes in {pages} pages")
+
+
+def test_filters_and_version():
+    """Filters match stored NAT fields by substring; every write bumps the version."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        first, second = store.add_many(["I need a quiet place to read.", "I know a free library nearby."])
+        version = store.version()
+        store.set_analysis(first["id"], {"sentiments": ["curiosity"], "resources_needed": ["quiet reading space"]})
+        store.set_analysis(second["id"], {"sentiments": ["hopeful"], "resources_available": ["100% free library"]})
+        assert store.version() == version + 2
+
+        page, _ = store.list(filters={"need": "QUIET"})
+        assert [r["id"] for r in page] == [first["id"]]
+        page, _ = store.list(filters={"availability": "100%"})
+        assert [r["id"] for r in page] == [second["id"]]
+        page, _ = store.list(filters={"availability": "0%_"})
+        assert page == []
+        assert store.filter_ids([second["id"], first["id"]], {"sentiment": "o"}) == [second["id"], first["id"]]
+        assert store.analysis_for([first["id"]])[first["id"]]["resources_needed"] == ["quiet reading space"]
+        print("✓ need/availability/sentiment filters")
+
+
+def test_nat_records_and_suggestions():
+    """NAT records and suggestions persist, and a note's suggestions can be replaced alone."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        need_note, library_note, other_note = store.add_many(["need", "library", "other"])
+        store.set_analysis(need_note["id"], {"resources_needed": ["quiet reading space"], "subgraph_stored": True})
+        analysis = store.analysis_for([need_note["id"], other_note["id"]])
+        assert analysis[need_note["id"]]["processed"] and analysis[need_note["id"]]["subgraph_stored"]
+        assert not analysis[other_note["id"]]["processed"]
+
+        store.add_suggestions([
+            {"need_note_id": need_note["id"], "availability_note_id": library_note["id"],
+             "need": "quiet reading space", "availability": "free library", "suggestion": "Visit the library"},
+            {"need_note_id": other_note["id"], "availability_note_id": other_note["id"],
+             "need": "a", "availability": "b", "suggestion": "c"},
+        ])
+        assert len(store.suggestions_for(library_note["id"])) == 1
+        assert store.delete_suggestions_for(need_note["id"]) == 1
+        remaining, _ = store.list_suggestions()
+        assert [s["need_note_id"] for s in remaining] == [other_note["id"]]
+        print("✓ NAT records and suggestions persisted")
+
+
+def test_concurrent_writers(n_threads: int = 8, per_thread: int = 50):
+    """Threads appending at once lose no notes and never share an id."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        ids = []
+        lock = threading.Lock()
+
+        def writer(worker: int):
+            for i in range(per_thread):
+                record = store.add(f"worker {worker} note {i}")
+                with lock:
+                    ids.append(record["id"])
+
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(n_threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(ids) == len(set(ids)) == n_threads * per_thread
+        assert store.count() == n_threads * per_thread
+        print(f"✓ {n_threads} threads wrote {len(ids)} notes with unique ids")
+
+
+def test_legacy_json_import():
+    """An empty store imports user_notes.json once; later opens do not duplicate it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "user_notes.json")
+        with open(legacy, "w") as f:
+            json.dump({"notes": ["first note", "second note"]}, f)
+
+        db_path = os.path.join(tmp, "notes.db")
+        assert NoteStore(db_path, legacy_json_path=legacy).texts() == ["first note", "second note"]
+        assert NoteStore(db_path, legacy_json_path=legacy).count() == 2
+        print("✓ legacy JSON imported once")
+
+
+def test_tenant():
+    """Notes keep the tenant they were added for; databases without the column gain it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "notes.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT NOT NULL,"
+                     " content_hash TEXT NOT NULL, created_at TEXT NOT NULL)")
+        conn.execute("INSERT INTO notes (content, content_hash, created_at) VALUES ('old note', 'x', 'then')")
+        conn.commit()
+        conn.close()
+
+        store = NoteStore(db_path, legacy_json_path=None)
+        assert store.get(1)["tenant"] is None
+        record = store.add("team note", tenant="team-a")
+        assert record["tenant"] == "team-a" and store.get(record["id"])["tenant"] == "team-a"
+        assert [r["tenant"] for r in store.add_many(["a", "b"], tenant="team-b")] == ["team-b", "team-b"]
+        print("✓ note tenants recorded (and added to an older database)")
+
+
+def test_fork():
+    """A forked child opens its own connection instead of using the parent's."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(os.path.join(tmp, "notes.db"), legacy_json_path=None)
+        store.add("before fork")
+        parent_conn = store._conn()
+        pid = os.fork()
+        if pid == 0:
+            child_conn = store._conn()
+            store.add("from child")
+            os._exit(0 if child_conn is not parent_conn else 1)
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
+        assert store._conn() is parent_conn and store.texts() == ["before fork", "from child"]
+        print("✓ forked worker uses its own connection")
+
+
+if __name__ == "__main__":
+    test_ids_and_hashes()
+    test_pagination()
+    test_filters_and_version()
+    test_nat_records_and_suggestions()
+    test_concurrent_writers()
+    test_legacy_json_import()
+    test_tenant()
+    test_fork()
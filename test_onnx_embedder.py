@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Parity test for the ONNX Runtime embedder backends against the PyTorch SentenceTransformer path
+
+Exports the model first if the ONNX directory does not exist yet (needs torch,
+sentence-transformers, onnx and onnxruntime). Skipped when the model cannot be
+loaded, e.g. offline with nothing in the Hugging Face cache.
+"""
+
+import sys
+import os
+import json
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from embeddings.embedder import Embedder
+from embeddings.onnx_backend import DEFAULT_MODEL, DEFAULT_ONNX_DIR, export
+
+MIN_COSINE = {"onnx": 0.9999, "onnx-int8": 0.99}
+
+
+def sample_texts():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "notes", "dummy_data.json")) as f:
+        data = json.load(f)
+    texts = data["needs"] + data["availabilities"]
+    # Plus a single word, mixed case and punctuation, and a text past the 256-token limit
+    return texts + ["Tutor", "Need a QUIET place to read... anywhere?!", " ".join(texts * 10)]
+
+
+def test_parity(model_name: str = DEFAULT_MODEL, onnx_dir: str = DEFAULT_ONNX_DIR):
+    """Every ONNX embedding is within MIN_COSINE of the torch one, and neighbours rank the same."""
+    texts = sample_texts()
+    try:
+        # Both need the Hugging Face model: downloaded, or cached when HF_HUB_OFFLINE=1
+        reference = np.asarray(Embedder(model_name, backend="torch").get_embeddings(texts), dtype="float32")
+        if not os.path.exists(os.path.join(onnx_dir, "model_int8.onnx")):
+            export(model_name, onnx_dir)
+    except (ImportError, OSError) as e:
+        print(f"- skipped ONNX parity: {model_name} or {onnx_dir} unavailable ({type(e).__name__}: {str(e).splitlines()[0]})")
+        return
+    for backend, min_cosine in MIN_COSINE.items():
+        embedder = Embedder(model_name, backend=backend, onnx_dir=onnx_dir)
+        vectors = embedder.get_embeddings(texts, batch_size=4)
+        assert vectors.shape == reference.shape
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+        cosines = np.sum(vectors * reference, axis=1)
+        assert cosines.min() >= min_cosine, f"{backend}: min cosine {cosines.min():.5f}"
+        single = embedder.get_embedding(texts[0])
+        assert single.shape == (reference.shape[1],) and float(single @ reference[0]) >= min_cosine
+        same_neighbour = np.mean(np.argsort(-(vectors @ vectors.T), axis=1)[:, 1] == np.argsort(-(reference @ reference.T), axis=1)[:, 1])
+        print(f"✓ {backend}: min cosine {cosines.min():.5f}, mean {cosines.mean():.5f}, nearest neighbour agreement {same_neighbour:.0%}")
+
+
+if __name__ == "__main__":
+    test_parity(*sys.argv[1:3])
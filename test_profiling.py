@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for request profiling: stack sampling, header and threshold triggers, slowest-request log
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from flask import Flask, jsonify
+
+from utils.metrics import span
+from utils.profiling import RequestProfiler, StackSampler
+
+
+def busy_embed(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def make_app(profiler: RequestProfiler) -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/fast")
+    def fast():
+        return jsonify({"ok": True})
+
+    @app.route("/slow")
+    def slow():
+        with span("embed"):
+            busy_embed(0.15)
+        return jsonify({"ok": True})
+
+    profiler.init_app(app)
+    return app
+
+
+def test_sampler():
+    """The sampler attributes samples to the function a thread is running."""
+    sampler = StackSampler(interval=0.002)
+    stacks = sampler.track(threading.get_ident())
+    busy_embed(0.1)
+    stacks = sampler.untrack(threading.get_ident())
+    assert sum(stacks.values()) > 5
+    assert any(stack.endswith("test_profiling.py:busy_embed") for stack in stacks)
+    print(f"✓ stack sampler ({sum(stacks.values())} samples)")
+
+
+def test_header_and_threshold():
+    """X-Profile always writes a profile; without it only requests over slow_ms do."""
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = RequestProfiler(output_dir=tmp, slow_ms=100, interval=0.002)
+        client = make_app(profiler).test_client()
+
+        assert "X-Profile-File" not in client.get("/fast").headers
+        slow = client.get("/slow")
+        name = slow.headers["X-Profile-File"]
+        assert name.endswith(".collapsed")
+        with open(os.path.join(tmp, name)) as f:
+            lines = f.read().splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any("busy_embed" in line for line in lines)
+
+        name = client.get("/fast", headers={"X-Profile": "cprofile"}).headers["X-Profile-File"]
+        assert name.endswith(".prof") and os.path.exists(os.path.join(tmp, name))
+        assert len(os.listdir(tmp)) == 2
+    print("✓ header and threshold triggers")
+
+
+def test_slowest():
+    """slowest() lists recent requests, slowest first, with their stage breakdown."""
+    profiler = RequestProfiler(output_dir=tempfile.mkdtemp(), history=10)
+    client = make_app(profiler).test_client()
+    for path in ("/fast", "/slow", "/fast"):
+        client.get(path)
+    slowest = profiler.slowest(2)
+    assert [r["route"] for r in slowest] == ["/slow", "/fast"]
+    assert slowest[0]["stages_ms"]["embed"] >= 150
+    assert slowest[0]["profile"] is None and slowest[1]["stages_ms"] == {}
+    print("✓ slowest requests with stage breakdown")
+
+
+if __name__ == "__main__":
+    test_sampler()
+    test_header_and_threshold()
+    test_slowest()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the LRU + TTL result cache used for GraphRAG queries
+"""
+
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from utils.metrics import CACHE_HITS
+from utils.result_cache import ResultCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru():
+    """The least recently used entry goes first once the cache is full."""
+    cache = ResultCache(max_entries=2, ttl=0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a is now the most recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+    print("✓ LRU eviction")
+
+
+def test_ttl():
+    """Entries expire ttl seconds after they are stored."""
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    cache.put("q", "result")
+    clock.now = 9.9
+    assert cache.get("q") == "result"
+    clock.now = 10.1
+    assert cache.get("q", "expired") == "expired" and len(cache) == 0
+    print("✓ TTL expiry")
+
+
+def test_versioned_keys_and_stats():
+    """A new version in the key misses; hits and misses are counted, also in the metrics."""
+    cache = ResultCache(name="test_cache")
+    before = CACHE_HITS.value(cache="test_cache")
+    key = (normalize_query("  What is   Machine Learning? "), 1)
+    assert key[0] == "what is machine learning?"
+    cache.put(key, ("response", [1, 2], ["chunk"]))
+    assert cache.get((normalize_query("what is machine learning?"), 1)) is not None
+    assert cache.get((key[0], 2)) is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert CACHE_HITS.value(cache="test_cache") == before + 1
+    disabled = ResultCache(max_entries=0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None
+    print("✓ versioned keys, hit/miss stats, disabled cache")
+
+
+if __name__ == "__main__":
+    test_lru()
+    test_ttl()
+    test_versioned_keys_and_stats()
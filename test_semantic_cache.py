@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the semantic cache: nearest-neighbour hits above a threshold, multi-part keys, versions, LRU and size eviction, TTL, stats
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from vector_store.semantic_cache import SemanticCache
+
+
+def unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def near(vector: np.ndarray, cosine: float, seed: int = 0) -> np.ndarray:
+    """A unit vector at the given cosine similarity to vector."""
+    noise = np.random.default_rng(seed).standard_normal(len(vector)).astype("float32")
+    noise = unit(noise - noise.dot(vector) * vector)
+    return unit(cosine * vector + np.sqrt(1 - cosine ** 2) * noise)
+
+
+def test_threshold():
+    """A paraphrase close enough to a stored request hits; a more distant one misses."""
+    base = unit(np.random.default_rng(1).standard_normal(16))
+    cache = SemanticCache(dim=16, threshold=0.9)
+    cache.put(base, "stored answer")
+    value, score = cache.lookup(near(base, 0.95))
+    assert value == "stored answer" and abs(score - 0.95) < 1e-4
+    assert cache.lookup(near(base, 0.8)) is None
+    assert cache.stats()["hit_rate"] == 0.5
+    print("✓ hits above the similarity threshold only")
+
+
+def test_parts():
+    """Two-part keys hit only when each part is close: the same need with another availability misses."""
+    rng = np.random.default_rng(2)
+    need, availability = unit(rng.standard_normal(16)), unit(rng.standard_normal(16))
+    cache = SemanticCache(dim=16, parts=2, threshold=0.9)
+    cache.put(np.concatenate([need, availability]), "suggestion for availability A")
+
+    # Mean similarity (1 + 0.81) / 2 = 0.905 would pass; the availability alone does not
+    assert cache.lookup(np.concatenate([need, near(availability, 0.81)])) is None
+    value, score = cache.lookup(np.concatenate([near(need, 0.95, seed=1), near(availability, 0.93, seed=2)]))
+    assert value == "suggestion for availability A" and abs(score - 0.93) < 1e-4
+
+    # The same need paired with several availabilities keeps one entry per availability
+    other = near(availability, 0.5, seed=3)
+    cache.put(np.concatenate([need, other]), "suggestion for availability B")
+    assert cache.get(np.concatenate([need, other])) == "suggestion for availability B"
+    assert cache.get(np.concatenate([need, availability])) == "suggestion for availability A"
+    print("✓ multi-part keys need every part above the threshold")
+
+
+def test_version():
+    """An entry put for an older version (e.g. a query that outlived an invalidation) never hits."""
+    key = unit([1, 0, 0, 0])
+    cache = SemanticCache(dim=4)
+    cache.clear()  # graph rebuilt to version 2 while a version-1 query was still running
+    cache.put(key, "computed on version 1", version=1)
+    assert cache.get(key, version=2) is None
+    cache.put(key, "computed on version 2", version=2)
+    assert cache.get(key, version=2) == "computed on version 2"
+    assert cache.get(key, version=1) == "computed on version 1"
+    print("✓ entries only answer lookups for their own version")
+
+
+def test_eviction():
+    """Least recently used entries are dropped beyond max_entries; a hit refreshes an entry."""
+    keys = np.eye(32, dtype="float32")
+    cache = SemanticCache(dim=32, threshold=0.99, max_entries=10)
+    for i in range(10):
+        cache.put(keys[i], i)
+    assert cache.get(keys[0]) == 0  # 0 is now the most recently used
+    cache.put(keys[10], 10)  # over capacity: back down to 90%, dropping the oldest, 1 and 2
+    assert len(cache) == 9 and cache.index.ntotal == 9
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is None
+    assert cache.get(keys[0]) == 0 and cache.get(keys[3]) == 3 and cache.get(keys[10]) == 10
+    print("✓ LRU eviction by size")
+
+
+def test_ttl_and_disable():
+    now = [0.0]
+    cache = SemanticCache(dim=4, ttl=60, clock=lambda: now[0])
+    cache.put(unit([1, 0, 0, 0]), "fresh")
+    now[0] = 59
+    assert cache.get(unit([1, 0, 0, 0])) == "fresh"
+    now[0] = 61
+    assert cache.get(unit([1, 0, 0, 0])) is None and len(cache) == 0
+    off = SemanticCache(dim=4, threshold=1.01)
+    off.put(unit([1, 0, 0, 0]), "x")
+    assert not off.enabled and off.get(unit([1, 0, 0, 0])) is None and len(off) == 0
+    print("✓ TTL expiry, threshold above 1 disables")
+
+
+if __name__ == "__main__":
+    test_threshold()
+    test_parts()
+    test_version()
+    test_eviction()
+    test_ttl_and_disable()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for per-tenant entry shards: routing, separate files, LRU eviction under a budget, parallel fan-out
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from vector_store.sharded_index import ShardedIndexManager, check_tenant
+
+
+def unit_vectors(n: int, dim: int = 384, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(manager: ShardedIndexManager, tenant: str, n: int, seed: int) -> np.ndarray:
+    vectors = unit_vectors(n, seed=seed)
+    entries = [(f"{tenant} entry {i}", "need" if i % 2 else "availability", i // 2 + 1) for i in range(n)]
+    manager.add(tenant, entries, vectors)
+    return vectors
+
+
+def test_routing_and_persistence():
+    """Each tenant's entries go to its own files and searches only see that tenant's entries."""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ShardedIndexManager(tmp)
+        alice = fill(manager, "alice", 40, seed=1)
+        fill(manager, "bob", 60, seed=2)
+        assert manager.tenants() == ["alice", "bob"]
+        assert os.path.exists(os.path.join(tmp, "alice", "ht.index"))
+        assert os.path.exists(os.path.join(tmp, "bob", "entries.bin"))
+
+        hits = manager.search("alice", alice[:3], top_k=5)
+        assert all(entry[0].startswith("alice") for results in hits for entry, _ in results)
+        assert hits[0][0][0][0] == "alice entry 0" and abs(hits[0][0][1] - 1.0) < 1e-4
+
+        # A fresh manager loads the shards lazily from disk
+        manager.close()
+        reopened = ShardedIndexManager(tmp)
+        assert reopened.loaded() == {}
+        assert reopened.search("bob", unit_vectors(1, seed=2), top_k=1)[0][0][0][0] == "bob entry 0"
+        assert list(reopened.loaded()) == ["bob"]
+        assert reopened.remove_note("bob", 1) == 2
+        reopened.close()
+    print("✓ searches routed per tenant, shards saved to separate files")
+
+
+def test_lru_eviction():
+    """Idle shards are dropped least recently used first once the loaded ones exceed the budget."""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ShardedIndexManager(tmp, memory_budget_mb=1e9)
+        for i, tenant in enumerate(("a", "b", "c")):
+            fill(manager, tenant, 200, seed=i)
+        one_shard = max(manager.loaded().values())
+        manager.memory_budget = int(2.5 * one_shard)
+
+        manager.search("a", unit_vectors(1), top_k=1)  # a is now the most recently used
+        with manager.shard("b"):
+            manager.search("d", unit_vectors(1), top_k=1)  # a new (empty) shard triggers eviction
+            assert set(manager.loaded()) == {"a", "b", "d"}, manager.loaded()  # b held, c evicted
+            manager.search("c", unit_vectors(1), top_k=1)
+            assert "b" in manager.loaded() and "c" in manager.loaded()
+            assert sum(manager.loaded().values()) <= manager.memory_budget + one_shard
+        manager.evict_all()
+        assert manager.loaded() == {}
+        assert len(manager.search("c", unit_vectors(1, seed=2), top_k=3)[0]) == 3
+        manager.close()
+    print(f"✓ LRU eviction under the memory budget (~{one_shard // 1024} KiB per shard)")
+
+
+def test_fan_out():
+    """search_many merges the shards' results by score."""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ShardedIndexManager(tmp, max_workers=3)
+        vectors = {tenant: fill(manager, tenant, 30, seed=i) for i, tenant in enumerate(("t1", "t2", "t3"))}
+        queries = np.stack([vectors["t2"][4], vectors["t3"][7]])
+        merged = manager.search_many(None, queries, top_k=4)
+        assert [len(results) for results in merged] == [4, 4]
+        assert merged[0][0][:2] == ("t2", ("t2 entry 4", "availability", 3))
+        assert merged[1][0][0] == "t3" and merged[1][0][1][0] == "t3 entry 7"
+        assert all(a[2] >= b[2] for results in merged for a, b in zip(results, results[1:]))
+        only = manager.search_many(["t1"], queries, top_k=2)
+        assert all(tenant == "t1" for results in only for tenant, _, _ in results)
+        manager.close()
+    print("✓ cross-shard fan-out merged by score")
+
+
+def test_tenant_ids():
+    for bad in ("", "../x", ".hidden", "a/b", "x" * 65):
+        try:
+            check_tenant(bad)
+            raise AssertionError(f"accepted {bad!r}")
+        except ValueError:
+            pass
+    assert check_tenant("team-1.prod_a") == "team-1.prod_a"
+    print("✓ tenant ids validated")
+
+
+if __name__ == "__main__":
+    test_routing_and_persistence()
+    test_lru_eviction()
+    test_fan_out()
+    test_tenant_ids()
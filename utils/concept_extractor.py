@@ -0,0 +1,102 @@
+# Batched concept extraction with a memoized lemma cache
+
+from typing import Callable, Dict, List, Optional
+
+from vector_store.bm25_index import tokenize
+
+
+class ConceptExtractor:
+    def __init__(
+        self,
+        backend: str = "nltk",
+        n_process: int = 1,
+        batch_size: int = 256,
+        min_length: int = 4,
+        spacy_model: str = "en_core_web_sm",
+        max_cache_size: int = 500_000,
+    ):
+        """
+        Extract lemmatized key concepts from many texts at once.
+
+        Args:
+            backend: "nltk" (WordNet lemmas, cached per word) or "spacy" (nlp.pipe)
+            n_process: Worker processes for the spaCy backend
+            batch_size: Texts per spaCy batch
+            min_length: Shortest token kept as a concept
+            spacy_model: spaCy pipeline to load for the spaCy backend
+            max_cache_size: Lemma cache entries kept before the cache is reset
+        """
+        self.n_process = n_process
+        self.batch_size = batch_size
+        self.min_length = min_length
+        self.max_cache_size = max_cache_size
+        self._lemmas: Dict[str, str] = {}
+        self._lemmatize: Optional[Callable[[str], str]] = None
+        self.nlp = None
+
+        if backend == "spacy":
+            self.nlp = self._load_spacy(spacy_model)
+        self.backend = "spacy" if self.nlp is not None else "nltk"
+        if self.backend == "nltk":
+            self._lemmatize = self._load_wordnet()
+
+    @staticmethod
+    def _load_spacy(model: str):
+        """Load a spaCy pipeline with only the components lemmatization needs."""
+        try:
+            import spacy
+            return spacy.load(model, disable=["parser", "ner"])
+        except (ImportError, OSError) as e:
+            print(f"Warning: spaCy model '{model}' not available ({e}); using the NLTK backend")
+            return None
+
+    @staticmethod
+    def _load_wordnet() -> Optional[Callable[[str], str]]:
+        """Use locally installed WordNet data; never downloads at runtime."""
+        try:
+            import nltk
+            from nltk.stem import WordNetLemmatizer
+            nltk.data.find("corpora/wordnet")
+            return WordNetLemmatizer().lemmatize
+        except (ImportError, LookupError) as e:
+            print(
+                f"Warning: WordNet data not available ({type(e).__name__}); concepts will not be lemmatized. "
+                "Install it once with `python -m nltk.downloader wordnet` (honours NLTK_DATA)."
+            )
+            return None
+
+    def lemma(self, word: str) -> str:
+        """Memoized WordNet lemma of a lowercase word."""
+        cached = self._lemmas.get(word)
+        if cached is None:
+            cached = self._lemmatize(word) if self._lemmatize else word
+            if len(self._lemmas) >= self.max_cache_size:
+                self._lemmas.clear()
+            self._lemmas[word] = cached
+        return cached
+
+    def extract(self, text: str) -> List[str]:
+        """Extract the unique concepts of a single text."""
+        return self.extract_batch([text])[0]
+
+    def extract_batch(self, texts: List[str]) -> List[List[str]]:
+        """Extract the unique concepts of each text."""
+        if self.backend == "spacy":
+            return self._extract_spacy(texts)
+
+        results = []
+        for text in texts:
+            # De-duplicate before lemmatizing so each distinct word costs at most one lookup
+            words = {token for token in tokenize(text) if len(token) >= self.min_length}
+            results.append(list({self.lemma(word) for word in words}))
+        return results
+
+    def _extract_spacy(self, texts: List[str]) -> List[List[str]]:
+        results = []
+        docs = self.nlp.pipe(texts, batch_size=self.batch_size, n_process=self.n_process)
+        for doc in docs:
+            results.append(list({
+                token.lemma_.lower() for token in doc
+                if len(token.text) >= self.min_length and (token.is_alpha or token.like_num)
+            }))
+        return results
@@ -0,0 +1,192 @@
+# Process-pool helpers for GraphRAG ingestion: chunking, concept extraction and tiled edge building
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Per-worker state, created once by the pool initializer
+_splitter = None
+_extractor = None
+
+
+def _init_text_worker(chunk_size: int, chunk_overlap: int, concept_backend: str):
+    global _splitter, _extractor
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from utils.concept_extractor import ConceptExtractor
+    _splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    _extractor = ConceptExtractor(backend=concept_backend, n_process=1)
+
+
+def _split_and_extract(documents: List[str]) -> Tuple[List[str], List[List[str]]]:
+    splits = []
+    for doc in documents:
+        splits.extend(_splitter.split_text(doc))
+    return splits, _extractor.extract_batch(splits)
+
+
+def split_and_extract(
+    documents: List[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    concept_backend: str = "nltk",
+    n_workers: int = 2,
+    docs_per_task: int = 64,
+) -> Tuple[List[str], List[List[str]]]:
+    """Chunk documents and extract chunk concepts across a process pool, preserving order."""
+    # Fail here with a clear ImportError rather than with a broken pool
+    from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: F401
+    batches = [documents[i:i + docs_per_task] for i in range(0, len(documents), docs_per_task)]
+    splits: List[str] = []
+    concepts: List[List[str]] = []
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_text_worker,
+        initargs=(chunk_size, chunk_overlap, concept_backend),
+    ) as executor:
+        for batch_splits, batch_concepts in executor.map(_split_and_extract, batches):
+            splits.extend(batch_splits)
+            concepts.extend(batch_concepts)
+    return splits, concepts
+
+
+def _edge_tile(embeddings: np.ndarray, start: int, end: int, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Edges (i, j, weight) with start <= i < end, j > i and cosine similarity above threshold."""
+    tile = end - start
+    rows_out, cols_out, weights_out = [], [], []
+    for col_start in range(start, len(embeddings), tile):
+        block = embeddings[start:end] @ embeddings[col_start:col_start + tile].T
+        keep = block > threshold
+        if col_start == start:
+            # Diagonal block: only j > i, so each pair comes once and nothing links to itself
+            # (masked by index, not by zeroing scores, which a negative threshold would let through)
+            keep &= np.arange(block.shape[1]) > np.arange(block.shape[0])[:, None]
+        rows, cols = np.nonzero(keep)
+        rows_out.append(rows + start)
+        cols_out.append(cols + col_start)
+        weights_out.append(block[rows, cols])
+    return (
+        np.concatenate(rows_out).astype("int64"),
+        np.concatenate(cols_out).astype("int64"),
+        np.concatenate(weights_out).astype("float32"),
+    )
+
+
+# An edge in a shared result block: int64 row, int64 column, float32 weight, stored column by column
+_EDGE_BYTES = 8 + 8 + 4
+
+
+def _edge_views(buf, n_edges: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The rows, columns and weights arrays of a shared result block."""
+    return (
+        np.ndarray(n_edges, dtype="int64", buffer=buf),
+        np.ndarray(n_edges, dtype="int64", buffer=buf, offset=8 * n_edges),
+        np.ndarray(n_edges, dtype="float32", buffer=buf, offset=16 * n_edges),
+    )
+
+
+def _shared_edge_tile(args) -> Tuple[Optional[str], int]:
+    """
+    Build one tile's edges from the shared embeddings and write them to a new
+    shared memory block; returns (block name, edge count), so only the name
+    travels back through the pool. The parent merges and unlinks the block.
+    """
+    shm_name, shape, start, end, threshold = args
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        embeddings = np.ndarray(shape, dtype="float32", buffer=shm.buf)
+        edges = _edge_tile(embeddings, start, end, threshold)
+        del embeddings
+    finally:
+        shm.close()
+    n_edges = len(edges[0])
+    if not n_edges:
+        return None, 0
+    out = shared_memory.SharedMemory(create=True, size=n_edges * _EDGE_BYTES)
+    views = _edge_views(out.buf, n_edges)
+    for view, column in zip(views, edges):
+        view[:] = column
+    del views
+    out.close()
+    return out.name, n_edges
+
+
+def _merge_shared_edges(results: List[Tuple[Optional[str], int]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Copy the workers' result blocks, in tile order, into one set of arrays and unlink the blocks."""
+    total = sum(n_edges for _, n_edges in results)
+    merged = (np.empty(total, "int64"), np.empty(total, "int64"), np.empty(total, "float32"))
+    offset = 0
+    for name, n_edges in results:
+        if name is None:
+            continue
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            views = _edge_views(block.buf, n_edges)
+            for target, view in zip(merged, views):
+                target[offset:offset + n_edges] = view
+            del views
+        finally:
+            block.close()
+            block.unlink()
+        offset += n_edges
+    return merged
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def similarity_edges(
+    embeddings: np.ndarray,
+    threshold: float,
+    n_workers: int = 1,
+    tile_size: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    All pairs (i < j) whose cosine similarity exceeds threshold, as (i, j, weight) arrays.
+
+    Rows are processed in tiles of tile_size. With n_workers > 1 the tiles are
+    spread over a process pool that reads the embeddings from shared memory
+    instead of receiving a pickled copy each, and hands its edges back the same
+    way: each tile's arrays go to a shared block that the parent copies into
+    the merged result, rather than being pickled through the pool.
+    """
+    embeddings = _normalize(embeddings)
+    n = len(embeddings)
+    empty = (np.empty(0, "int64"), np.empty(0, "int64"), np.empty(0, "float32"))
+    if n < 2:
+        return empty
+
+    tiles = [(start, min(start + tile_size, n)) for start in range(0, n, tile_size)]
+    if n_workers <= 1 or len(tiles) == 1:
+        parts = [_edge_tile(embeddings, start, end, threshold) for start, end in tiles]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=embeddings.nbytes)
+        try:
+            shared = np.ndarray(embeddings.shape, dtype="float32", buffer=shm.buf)
+            shared[:] = embeddings
+            tasks = [(shm.name, embeddings.shape, start, end, threshold) for start, end in tiles]
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = list(executor.map(_shared_edge_tile, tasks))
+            del shared
+        finally:
+            shm.close()
+            shm.unlink()
+        return _merge_shared_edges(results)
+
+    parts = [p for p in parts if len(p[0])] or [empty]
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def set_torch_threads(n_threads: Optional[int]):
+    """Set torch intra-op threads for the embedding step (no-op when unset or torch is missing)."""
+    if not n_threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
@@ -0,0 +1,207 @@
+# Opt-in request profiling: stack sampling or cProfile per request, collapsed-stack dumps, slowest requests
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import Flask, g, request
+
+from utils.metrics import collect_stages
+
+PROFILE_HEADER = "X-Profile"  # "1"/"sample" for the stack sampler, "cprofile" for cProfile
+
+
+_frame_labels: Dict = {}  # code object -> "file:function"
+
+
+def collapse(frame) -> str:
+    """A frame's stack, root first, as "file:function;file:function" (the flamegraph.pl input format)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        label = _frame_labels.get(code)
+        if label is None:
+            label = _frame_labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        names.append(label)
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    def __init__(self, interval: float = 0.005):
+        """
+        Samples the stacks of registered threads from one background thread.
+
+        Nothing is traced between samples, so the cost to a profiled request is
+        one stack walk per interval rather than a hook on every call (cProfile).
+        """
+        self.interval = interval
+        self._stacks: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def track(self, thread_id: int) -> Counter:
+        """Start sampling a thread; returns the {collapsed stack: samples} counter it fills."""
+        stacks = Counter()
+        with self._lock:
+            self._stacks[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        return stacks
+
+    def untrack(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._stacks.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._stacks:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._stacks.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        slow_ms: float = 0.0,
+        interval: float = 0.005,
+        history: int = 200,
+    ):
+        """
+        Per-request profiling for a Flask app (install with init_app).
+
+        Every request gets a stage breakdown from the metrics spans. A request
+        is profiled when it carries the X-Profile header, or, with slow_ms set,
+        when it turns out slower than slow_ms: all requests are then sampled
+        and only the slow ones are written out. Sampled profiles are written as
+        collapsed stacks (flamegraph.pl, speedscope), cProfile ones as .prof.
+
+        Args:
+            output_dir: Directory for profile files
+            slow_ms: Latency threshold in milliseconds (0 profiles on the header only)
+            interval: Seconds between stack samples
+            history: Recent requests kept for slowest()
+        """
+        self.output_dir = output_dir
+        self.slow_ms = slow_ms
+        self.sampler = StackSampler(interval)
+        self.recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+
+    def _before(self):
+        mode = request.headers.get(PROFILE_HEADER, "").lower()
+        g.profile = {"start": time.perf_counter(), "stages": {}, "mode": None, "thread": threading.get_ident()}
+        collect_stages(g.profile["stages"])
+        if mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                g.profile.update(mode="cprofile", cprofile=profile)
+                return
+            except ValueError:
+                pass  # another request is already under cProfile (one per process on 3.12+); sample instead
+        if mode or self.slow_ms:
+            g.profile["mode"] = "sample"
+            g.profile["samples"] = self.sampler.track(g.profile["thread"])
+
+    def _stop(self, state: Dict):
+        collect_stages(None)
+        if state["mode"] == "cprofile":
+            state["cprofile"].disable()
+        elif state["mode"] == "sample":
+            state["samples"] = self.sampler.untrack(state["thread"])
+
+    def _after(self, response):
+        state = g.pop("profile", None)
+        if state is None:
+            return response
+        elapsed_ms = (time.perf_counter() - state["start"]) * 1000
+        self._stop(state)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": request.url_rule.rule if request.url_rule else None,
+            "status": response.status_code,
+            "duration_ms": round(elapsed_ms, 2),
+            "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+            "stages_ms": {stage: round(seconds * 1000, 2) for stage, seconds in sorted(state["stages"].items())},
+            "profile": None,
+        }
+        requested = bool(request.headers.get(PROFILE_HEADER))
+        if state["mode"] and (requested or elapsed_ms >= self.slow_ms):
+            record["profile"] = self._write(record, state)
+            response.headers["X-Profile-File"] = record["profile"]
+        with self._lock:
+            self.recent.append(record)
+        return response
+
+    def _teardown(self, exc=None):
+        # after_request is skipped when a view raises; still stop the profiler
+        state = g.pop("profile", None)
+        if state is not None:
+            self._stop(state)
+
+    def _write(self, record: Dict, state: Dict) -> str:
+        """Write the request's profile; returns the file name (relative to output_dir)."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        route = re.sub(r"[^A-Za-z0-9]+", "_", record["route"] or record["path"]).strip("_") or "root"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        base = f"{stamp}-{record['method']}-{route}-{record['duration_ms']:.0f}ms"
+        if state["mode"] == "cprofile":
+            name = base + ".prof"
+            state["cprofile"].dump_stats(os.path.join(self.output_dir, name))
+            record["top_functions"] = top_functions(state["cprofile"])
+        else:
+            name = base + ".collapsed"
+            with open(os.path.join(self.output_dir, name), "w") as f:
+                for stack, count in state["samples"].most_common():
+                    f.write(f"{stack} {count}\n")
+        return name
+
+    def slowest(self, n: int = 10) -> List[Dict]:
+        """The n slowest of the recent requests, slowest first."""
+        with self._lock:
+            records = list(self.recent)
+        return sorted(records, key=lambda r: r["duration_ms"], reverse=True)[:n]
+
+
+def top_functions(profile: cProfile.Profile, n: int = 15) -> List[str]:
+    """The n functions with the most cumulative time, as pstats prints them."""
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(n)
+    lines = out.getvalue().splitlines()
+    start = next((i for i, line in enumerate(lines) if line.lstrip().startswith("ncalls")), len(lines))
+    return [line.strip() for line in lines[start + 1:] if line.strip()]
+
+
+def profiler_from_env() -> Optional[RequestProfiler]:
+    """A RequestProfiler configured from PROFILE_* variables, or None unless PROFILE_REQUESTS=true."""
+    if os.getenv("PROFILE_REQUESTS", "false").lower() != "true":
+        return None
+    return RequestProfiler(
+        output_dir=os.getenv("PROFILE_DIR", "profiles"),
+        slow_ms=float(os.getenv("PROFILE_SLOW_MS", "0")),
+        interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+        history=int(os.getenv("PROFILE_HISTORY", "200")),
+    )
@@ -0,0 +1,87 @@
+# In-process LRU result cache with a time-to-live, for repeated queries
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from utils.metrics import CACHE_HITS, CACHE_MISSES
+
+
+def normalize_query(text: str) -> str:
+    """Case-folded text with whitespace collapsed, so trivially different spellings share a cache key."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        name: str = "result",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Thread-safe LRU cache whose entries also expire ttl seconds after being stored.
+
+        Callers put what the result depends on into the key (e.g. a graph
+        version), so changes never need to find and drop stale entries: they
+        stop being looked up and age out. Hits and misses are counted in
+        ht_cache_hits_total / ht_cache_misses_total under cache=name.
+
+        Args:
+            max_entries: Entries kept; the least recently used go first (0 disables the cache)
+            ttl: Seconds an entry stays valid (0 or less: no expiry)
+            name: Label for the cache metrics
+            clock: Time source (for tests)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires, value), LRU first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = self.clock()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] < now:
+                del self._entries[key]
+                item = None
+            if item is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        (CACHE_MISSES if item is None else CACHE_HITS).inc(cache=self.name)
+        return default if item is None else item[1]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        expires = self.clock() + self.ttl if self.ttl > 0 else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
@@ -1 +1,96 @@
-# Similarity filtering logic
+# Similarity filtering logic: which need -> availability pairs become suggestions
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+Matches = Tuple[np.ndarray, np.ndarray, np.ndarray]  # (need ids, availability ids, scores), best first
+
+
+@dataclass
+class MatchPolicy:
+    """
+    How many need -> availability pairs to keep, and which.
+
+    Every stage bounds the output, so the number of LLM calls per request is
+    at most budget (or needs * top_k without a budget). 0 disables a limit.
+    """
+    threshold: float = 0.3     # minimum cosine similarity
+    top_k: int = 3             # availabilities kept per need
+    mutual: bool = False       # also require the need to be among the availability's top_k needs
+    max_per_note: int = 0      # suggestions involving any one note, on either side
+    budget: int = 0            # suggestions per request, best scores first
+    same_note: bool = True     # allow pairing a note's need with its own availability
+
+
+def _group_rank(keys: np.ndarray) -> np.ndarray:
+    """Position of each item among the earlier items with the same key (0 for the first)."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    sizes = np.diff(np.r_[starts, len(keys)])
+    ranks = np.empty(len(keys), dtype="int64")
+    ranks[order] = np.arange(len(keys)) - np.repeat(starts, sizes)
+    return ranks
+
+
+def select_pairs(
+    need_ids: np.ndarray,
+    availability_ids: np.ndarray,
+    scores: np.ndarray,
+    need_notes: np.ndarray,
+    availability_notes: np.ndarray,
+    policy: MatchPolicy,
+) -> Matches:
+    """
+    Apply a policy to candidate pairs given as parallel arrays.
+
+    need_ids / availability_ids identify the entries (any integers), the notes
+    arrays give each side's note id. Thresholding, ordering and the top-k /
+    mutual stages are array operations (ranks within each need or availability
+    group). The per-note cap then walks the survivors, at most needs * top_k
+    of them, best first, and stops as soon as the budget is filled.
+    """
+    need_ids, availability_ids = np.asarray(need_ids), np.asarray(availability_ids)
+    scores = np.asarray(scores, dtype="float32")
+    need_notes, availability_notes = np.asarray(need_notes), np.asarray(availability_notes)
+
+    keep = scores > policy.threshold
+    if not policy.same_note:
+        keep &= need_notes != availability_notes
+    # Best first; ties broken by ids so the selection is deterministic
+    order = np.flatnonzero(keep)
+    order = order[np.lexsort((availability_ids[order], need_ids[order], -scores[order]))]
+    need_ids, availability_ids, scores = need_ids[order], availability_ids[order], scores[order]
+    need_notes, availability_notes = need_notes[order], availability_notes[order]
+
+    keep = np.ones(len(order), dtype="bool")
+    if policy.top_k:
+        keep &= _group_rank(need_ids) < policy.top_k
+        if policy.mutual:
+            keep &= _group_rank(availability_ids) < policy.top_k
+    selected = np.flatnonzero(keep)
+    if policy.max_per_note:
+        selected = _cap_notes(selected, need_notes, availability_notes, policy.max_per_note, policy.budget)
+    if policy.budget:
+        selected = selected[:policy.budget]
+    return need_ids[selected], availability_ids[selected], scores[selected]
+
+
+def _cap_notes(candidates: np.ndarray, need_notes: np.ndarray, availability_notes: np.ndarray, cap: int, budget: int) -> np.ndarray:
+    """Greedily keep candidates (best first) while both of their notes are under the cap."""
+    counts: Dict[int, int] = {}
+    kept = []
+    for i, need_note, availability_note in zip(
+        candidates.tolist(), need_notes[candidates].tolist(), availability_notes[candidates].tolist()
+    ):
+        if counts.get(need_note, 0) >= cap or counts.get(availability_note, 0) >= cap:
+            continue
+        counts[need_note] = counts.get(need_note, 0) + 1
+        counts[availability_note] = counts.get(availability_note, 0) + (need_note != availability_note)
+        kept.append(i)
+        if budget and len(kept) == budget:
+            break
+    return np.array(kept, dtype="int64")
+
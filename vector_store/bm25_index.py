@@ -0,0 +1,133 @@
+# Inverted index with BM25 scoring, plus reciprocal rank fusion for hybrid search
+
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; keeps names like 'CubbonPark' as a single term."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> ([row, ...], [term frequency, ...]); rows are internal positions
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        # term -> (rows, tfs) as arrays, rebuilt lazily for terms touched by add()
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.doc_ids: List[int] = []
+        self._rows: Dict[int, int] = {}  # doc_id -> row of its live version
+        self._doc_lengths = np.zeros(1024, dtype="float32")
+        self._dead = np.zeros(1024, dtype="bool")
+        self._n_dead = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids) - self._n_dead
+
+    def remove(self, doc_id: int) -> bool:
+        """
+        Drop a document from results. Its postings stay until the index is
+        rebuilt; searches skip them, in document frequencies too.
+        """
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        self._dead[row] = True
+        self._n_dead += 1
+        self._total_length -= int(self._doc_lengths[row])
+        return True
+
+    def add(self, doc_id: int, terms: Iterable[str]):
+        """Index one document incrementally; earlier documents are not touched (re-adding replaces)."""
+        self.remove(doc_id)
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+
+        row = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self._rows[doc_id] = row
+        if row >= len(self._doc_lengths):
+            self._doc_lengths = np.concatenate([self._doc_lengths, np.zeros_like(self._doc_lengths)])
+            self._dead = np.concatenate([self._dead, np.zeros_like(self._dead)])
+        length = sum(counts.values())
+        self._doc_lengths[row] = length
+        self._total_length += length
+
+        for term, tf in counts.items():
+            rows, tfs = self.postings.setdefault(term, ([], []))
+            rows.append(row)
+            tfs.append(tf)
+            self._arrays.pop(term, None)
+
+    def search(self, terms: Iterable[str], top_k: int = 10) -> List[Tuple[int, float]]:
+        """Return up to top_k (doc_id, score) pairs, best first."""
+        n_docs = len(self)
+        if n_docs == 0:
+            return []
+        avgdl = self._total_length / n_docs or 1.0
+
+        row_parts, weight_parts = [], []
+        for term in set(terms):
+            posting = self._posting(term)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            # Live postings only: counting tombstones could push df past n_docs and make idf negative
+            df = int(np.count_nonzero(~self._dead[rows])) if self._n_dead else len(rows)
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self._doc_lengths[rows] / avgdl)
+            row_parts.append(rows)
+            weight_parts.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+        if not row_parts:
+            return []
+
+        if len(row_parts) == 1:
+            rows, scores = row_parts[0], weight_parts[0]
+        else:
+            # Sum per-term contributions over candidate documents only
+            rows, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weight_parts))
+
+        if self._n_dead:
+            live = ~self._dead[rows]
+            rows, scores = rows[live], scores[live]
+            if not len(rows):
+                return []
+
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.doc_ids[int(rows[i])], float(scores[i])) for i in best]
+
+    def _posting(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        cached = self._arrays.get(term)
+        if cached is None:
+            posting = self.postings.get(term)
+            if posting is None:
+                return None
+            cached = (np.asarray(posting[0], dtype="int64"), np.asarray(posting[1], dtype="float32"))
+            self._arrays[term] = cached
+        return cached
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60, top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Fuse several ranked id lists: score(d) = sum over lists of 1 / (k + rank)."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return ordered[:top_k] if top_k is not None else ordered
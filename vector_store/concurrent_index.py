@@ -0,0 +1,158 @@
+# Readers-writer locking for FAISS indexes shared by the threads of one server process,
+# and file locking for index files shared by the worker processes of one server
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, where the API runs as a single process
+    fcntl = None
+
+from vector_store.faiss_handler import FAISSHandler, set_num_threads
+
+
+class RWLock:
+    def __init__(self):
+        """
+        Any number of readers or one writer.
+
+        FAISS searches are const and release the GIL, so they can run in
+        parallel; adds and removes resize the index and must run alone. A
+        waiting writer holds back new readers so a steady search load cannot
+        starve it. Not reentrant: a thread must not take the read lock again
+        while holding it.
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read_lock(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write_lock(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class FileLock:
+    def __init__(self, path: str):
+        """
+        Advisory lock on a file, shared by every process that opens the same path.
+
+        Workers forked from one master each hold their own copy of an index;
+        whoever changes it takes the exclusive lock, reloads the files if
+        another worker saved since, applies the change and saves before
+        releasing. Readers that find the files changed reload under the shared
+        lock, so they never see one file saved and the next not yet. A no-op
+        where fcntl is missing.
+
+        Args:
+            path: Lock file (created on first use; its contents are unused)
+        """
+        self.path = path
+
+    @contextmanager
+    def _locked(self, mode):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            fcntl.flock(f, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def shared(self):
+        return self._locked(fcntl.LOCK_SH if fcntl else None)
+
+    def exclusive(self):
+        return self._locked(fcntl.LOCK_EX if fcntl else None)
+
+
+def file_signature(*paths: str) -> tuple:
+    """Changes whenever one of the files is replaced or rewritten (inode, mtime, size; None if missing)."""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class ConcurrentFAISSHandler:
+    def __init__(self, handler: Optional[FAISSHandler] = None, num_threads: Optional[int] = None, **kwargs):
+        """
+        FAISSHandler safe to share between request threads: searches take a
+        read lock, adds and loads a write lock.
+
+        Args:
+            handler: Handler to wrap (default: a new FAISSHandler(**kwargs))
+            num_threads: OpenMP threads for FAISS in this process; under a
+                threaded server, parallelism comes from concurrent requests, so
+                1-2 per worker avoids oversubscribing the cores
+        """
+        self.handler = handler or FAISSHandler(**kwargs)
+        self.lock = RWLock()
+        set_num_threads(num_threads)
+
+    @property
+    def index(self):
+        return self.handler.index
+
+    def add(self, vectors: np.ndarray):
+        with self.lock.write_lock():
+            self.handler.add(vectors)
+
+    def search_batch(self, queries: np.ndarray, top_k: int = 5, threshold: Optional[float] = None,
+                     exclude_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        with self.lock.read_lock():
+            return self.handler.search_batch(queries, top_k, threshold=threshold, exclude_ids=exclude_ids)
+
+    def range_search(self, queries: np.ndarray, threshold: float,
+                     exclude_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self.lock.read_lock():
+            return self.handler.range_search(queries, threshold, exclude_ids=exclude_ids)
+
+    def search(self, query: np.ndarray, top_k: int = 5, threshold: float = 0.85):
+        with self.lock.read_lock():
+            return self.handler.search(query, top_k, threshold)
+
+    def save_index(self, path: str):
+        with self.lock.read_lock():
+            self.handler.save_index(path)
+
+    def load_index(self, path: str):
+        with self.lock.write_lock():
+            self.handler.load_index(path)
@@ -0,0 +1,802 @@
+# Persistent need/availability entries and their vectors, updatable one note at a time
+
+import json
+import logging
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from utils.metrics import span
+from vector_store.concurrent_index import FileLock, RWLock, file_signature
+from vector_store.faiss_handler import FAISSHandler
+from vector_store.quantization import VectorFile, make_index, rerank, storage_of
+
+# An entry is (text, "need" | "availability", note_id)
+Entry = Tuple[str, str, int]
+
+TYPE_NAMES = ("need", "availability")
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+# Binary layout of an entries file, little-endian:
+#   64-byte header: magic, format version, rows, string heap size, indexed notes,
+#   dead rows, crc32 of the vector id column (must match the FAISS index ids)
+#   then fixed-width columns, each starting on an 8-byte boundary:
+#   note_ids, vector_ids: int64[rows]; text_offsets: int64[rows + 1]
+#   index_notes, index_starts, index_ends: int64[notes] (sorted note -> row range)
+#   type_codes: int8[rows]; live: bool[rows]
+#   text_pool: the string heap, UTF-8 bytes addressed by text_offsets
+_MAGIC = b"HTENTRY\0"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIQQQQI")
+_HEADER_SIZE = 64
+
+# Change log next to the table (entries.log), replayed on top of it:
+#   header: magic, then rows, dead rows and vector id crc32 of the table it continues
+#   (a log left over from an older table is ignored)
+#   then records: crc32 and length of the payload; payload = op, note id, first vector
+#   id, entry count, and for appends type_codes int8[n], text lengths int64[n], the
+#   UTF-8 texts and the float32 vectors
+_LOG_MAGIC = b"HTELOG\0\0"
+_LOG_HEADER = struct.Struct("<8sQQI")
+_LOG_RECORD = struct.Struct("<II")
+_LOG_OP = struct.Struct("<BqqI")
+_LOG_KILL, _LOG_APPEND = 0, 1
+_LOG_MIN_BYTES = 1 << 20  # log size below which no snapshot is rewritten
+
+
+def _layout(size: int, pool_size: int, n_notes: int) -> Tuple[List[Tuple[str, str, int, int]], int]:
+    """(name, dtype, count, byte offset) of every section, and the total file size."""
+    counts = [
+        ("note_ids", "<i8", size),
+        ("vector_ids", "<i8", size),
+        ("text_offsets", "<i8", size + 1),
+        ("index_notes", "<i8", n_notes),
+        ("index_starts", "<i8", n_notes),
+        ("index_ends", "<i8", n_notes),
+        ("type_codes", "i1", size),
+        ("live", "?", size),
+        ("text_pool", "u1", pool_size),
+    ]
+    sections, offset = [], _HEADER_SIZE
+    for name, dtype, count in counts:
+        offset = (offset + 7) // 8 * 8
+        sections.append((name, dtype, count, offset))
+        offset += count * np.dtype(dtype).itemsize
+    return sections, offset
+
+
+def _log_record(payload: bytes) -> bytes:
+    return _LOG_RECORD.pack(zlib.crc32(payload), len(payload)) + payload
+
+
+def _kill_record(note_id: int) -> bytes:
+    return _log_record(_LOG_OP.pack(_LOG_KILL, note_id, 0, 0))
+
+
+def _append_record(entries: List[Entry], vector_ids: np.ndarray, embeddings: np.ndarray) -> bytes:
+    encoded = [text.encode("utf-8") for text, _, _ in entries]
+    return _log_record(b"".join([
+        _LOG_OP.pack(_LOG_APPEND, entries[0][2], int(vector_ids[0]), len(entries)),
+        np.array([TYPE_CODES[kind] for _, kind, _ in entries], dtype="i1").tobytes(),
+        np.array([len(b) for b in encoded], dtype="<i8").tobytes(),
+        *encoded,
+        np.ascontiguousarray(embeddings, dtype="<f4").tobytes(),
+    ]))
+
+
+def _log_records(data: bytes, dim: int) -> Iterator[Tuple[int, int, int, int, List[Entry], Optional[np.ndarray]]]:
+    """(end offset, op, note id, first vector id, entries, vectors) of each complete record in data."""
+    offset = 0
+    while offset + _LOG_RECORD.size <= len(data):
+        crc, length = _LOG_RECORD.unpack_from(data, offset)
+        start = offset + _LOG_RECORD.size
+        end = start + length
+        if end > len(data) or zlib.crc32(data[start:end]) != crc:
+            return  # torn by a writer that died mid-append; the next append overwrites it
+        op, note_id, first_id, count = _LOG_OP.unpack_from(data, start)
+        entries, vectors = [], None
+        if op == _LOG_APPEND:
+            pos = start + _LOG_OP.size
+            codes = np.frombuffer(data, dtype="i1", count=count, offset=pos).tolist()
+            pos += count
+            lengths = np.frombuffer(data, dtype="<i8", count=count, offset=pos).tolist()
+            pos += 8 * count
+            for code, n in zip(codes, lengths):
+                entries.append((data[pos:pos + n].decode("utf-8"), TYPE_NAMES[code], note_id))
+                pos += n
+            vectors = np.frombuffer(data, dtype="<f4", count=count * dim, offset=pos).reshape(count, dim)
+        yield end, op, note_id, first_id, entries, vectors
+        offset = end
+
+
+class EntryTable:
+    def __init__(self):
+        """
+        Columnar entry table: parallel NumPy columns plus a UTF-8 string pool.
+
+        Rows are append-only. Replacing or deleting a note tombstones its rows
+        (live=False) instead of shifting the table, and every note maps to the
+        contiguous [start, end) range of its live rows, so an invalidation
+        touches only that note's rows. The note index is a sorted array saved
+        with the table plus a dict of ranges changed since it was built.
+        """
+        self.size = 0
+        self.note_ids = np.empty(0, dtype="int64")
+        self.type_codes = np.empty(0, dtype="int8")
+        self.vector_ids = np.empty(0, dtype="int64")
+        self.live = np.empty(0, dtype="bool")
+        self.text_offsets = np.zeros(1, dtype="int64")
+        self.text_pool = np.empty(0, dtype="uint8")
+        self.pool_size = 0
+        self.n_dead = 0
+        # Sorted note ids with their row ranges, plus ranges changed since; (0, 0) = removed
+        self.index_notes = np.empty(0, dtype="int64")
+        self.index_starts = np.empty(0, dtype="int64")
+        self.index_ends = np.empty(0, dtype="int64")
+        self.note_changes: Dict[int, Tuple[int, int]] = {}
+        self.ids_crc = 0  # crc32 of vector_ids when loaded from disk
+
+    def __len__(self) -> int:
+        return self.size - self.n_dead
+
+    @staticmethod
+    def _grow(column: np.ndarray, needed: int) -> np.ndarray:
+        """Return column with capacity for needed items (doubling; copies read-only maps once)."""
+        if needed <= len(column) and column.flags.writeable:
+            return column
+        grown = np.empty(max(needed, 2 * len(column), 64), dtype=column.dtype)
+        grown[:len(column)] = column
+        return grown
+
+    def note_range(self, note_id: int) -> Tuple[int, int]:
+        """[start, end) rows of a note's live entries; (0, 0) if it has none."""
+        if note_id in self.note_changes:
+            return self.note_changes[note_id]
+        i = np.searchsorted(self.index_notes, note_id)
+        if i < len(self.index_notes) and self.index_notes[i] == note_id:
+            return int(self.index_starts[i]), int(self.index_ends[i])
+        return 0, 0
+
+    @property
+    def note_rows(self) -> Dict[int, Tuple[int, int]]:
+        """Every note's row range as a dict (builds the whole map; for inspection)."""
+        rows = {int(n): (int(s), int(e)) for n, s, e in zip(self.index_notes, self.index_starts, self.index_ends)}
+        rows.update(self.note_changes)
+        return {note_id: r for note_id, r in rows.items() if r[1] > r[0]}
+
+    def append(self, entries: List[Entry], vector_ids: np.ndarray) -> Tuple[int, int]:
+        """Append entries (all of one note) and return their row range."""
+        start, end = self.size, self.size + len(entries)
+        encoded = [text.encode("utf-8") for text, _, _ in entries]
+        lengths = np.fromiter((len(b) for b in encoded), dtype="int64", count=len(encoded))
+
+        self.note_ids = self._grow(self.note_ids, end)
+        self.type_codes = self._grow(self.type_codes, end)
+        self.vector_ids = self._grow(self.vector_ids, end)
+        self.live = self._grow(self.live, end)
+        self.text_offsets = self._grow(self.text_offsets, end + 1)
+        self.text_pool = self._grow(self.text_pool, self.pool_size + int(lengths.sum()))
+
+        self.note_ids[start:end] = [note_id for _, _, note_id in entries]
+        self.type_codes[start:end] = [TYPE_CODES[kind] for _, kind, _ in entries]
+        self.vector_ids[start:end] = vector_ids
+        self.live[start:end] = True
+        self.text_offsets[start + 1:end + 1] = self.pool_size + np.cumsum(lengths)
+        blob = b"".join(encoded)
+        self.text_pool[self.pool_size:self.pool_size + len(blob)] = np.frombuffer(blob, dtype="uint8")
+        self.pool_size += len(blob)
+        self.size = end
+        self.note_changes[entries[0][2]] = (start, end)
+        return start, end
+
+    def kill_note(self, note_id: int) -> np.ndarray:
+        """Tombstone a note's rows and return their vector ids."""
+        start, end = self.note_range(note_id)
+        if end <= start:
+            return np.empty(0, dtype="int64")
+        self.note_changes[note_id] = (0, 0)
+        if not self.live.flags.writeable:
+            self.live = self._grow(self.live, self.size)
+        self.live[start:end] = False
+        self.n_dead += end - start
+        return np.array(self.vector_ids[start:end])
+
+    def text(self, row: int) -> str:
+        return bytes(self.text_pool[self.text_offsets[row]:self.text_offsets[row + 1]]).decode("utf-8")
+
+    def entry(self, row: int) -> Entry:
+        return (self.text(row), TYPE_NAMES[self.type_codes[row]], int(self.note_ids[row]))
+
+    def entries(self, rows: Optional[np.ndarray] = None) -> List[Entry]:
+        """The entries at rows (default: every live row), decoded in one pass over the pool."""
+        if rows is None:
+            rows = np.flatnonzero(self.live[:self.size])
+        pool = bytes(self.text_pool[:self.pool_size])
+        starts = self.text_offsets[rows].tolist()
+        ends = self.text_offsets[rows + 1].tolist()
+        kinds = self.type_codes[rows].tolist()
+        notes = self.note_ids[rows].tolist()
+        return [
+            (pool[start:end].decode("utf-8"), TYPE_NAMES[kind], note_id)
+            for start, end, kind, note_id in zip(starts, ends, kinds, notes)
+        ]
+
+    def rows_for_vectors(self, vector_ids: np.ndarray) -> np.ndarray:
+        """Row of each vector id (vector ids increase with the row number)."""
+        return np.searchsorted(self.vector_ids[:self.size], vector_ids)
+
+    def dead_vector_ids(self) -> np.ndarray:
+        return np.ascontiguousarray(self.vector_ids[:self.size][~self.live[:self.size]])
+
+    def _build_note_index(self):
+        """Rebuild the note index from the live rows (each note's live rows are contiguous)."""
+        self.note_changes = {}
+        rows = np.flatnonzero(self.live[:self.size])
+        if len(rows) == 0:
+            self.index_notes = self.index_starts = self.index_ends = np.empty(0, dtype="int64")
+            return
+        notes = np.asarray(self.note_ids[rows])
+        firsts = np.concatenate([[0], np.flatnonzero((np.diff(notes) != 0) | (np.diff(rows) != 1)) + 1])
+        lasts = np.concatenate([firsts[1:], [len(rows)]]) - 1
+        order = np.argsort(notes[firsts], kind="stable")
+        self.index_notes = notes[firsts][order]
+        self.index_starts = rows[firsts][order].astype("int64")
+        self.index_ends = rows[lasts][order].astype("int64") + 1
+
+    def _merged_note_index(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The saved note index with the changes folded in."""
+        if not self.note_changes:
+            return self.index_notes, self.index_starts, self.index_ends
+        changed = np.fromiter(self.note_changes.keys(), dtype="int64", count=len(self.note_changes))
+        ranges = np.array(list(self.note_changes.values()), dtype="int64").reshape(-1, 2)
+        keep = ~np.isin(self.index_notes, changed)
+        present = ranges[:, 1] > ranges[:, 0]
+        notes = np.concatenate([self.index_notes[keep], changed[present]])
+        starts = np.concatenate([self.index_starts[keep], ranges[present, 0]])
+        ends = np.concatenate([self.index_ends[keep], ranges[present, 1]])
+        order = np.argsort(notes, kind="stable")
+        return notes[order], starts[order], ends[order]
+
+    def compacted(self) -> "EntryTable":
+        """A copy without tombstoned rows (vector ids are kept)."""
+        keep = np.flatnonzero(self.live[:self.size])
+        table = EntryTable()
+        if len(keep):
+            starts = self.text_offsets[keep]
+            lengths = self.text_offsets[keep + 1] - starts
+            new_offsets = np.concatenate([[0], np.cumsum(lengths)])
+            # Byte positions of the kept texts in the old pool, in order
+            positions = np.arange(new_offsets[-1]) + np.repeat(starts - new_offsets[:-1], lengths)
+            table.note_ids = self.note_ids[keep]
+            table.type_codes = self.type_codes[keep]
+            table.vector_ids = self.vector_ids[keep]
+            table.live = np.ones(len(keep), dtype="bool")
+            table.text_pool = self.text_pool[positions]
+            table.text_offsets = new_offsets
+            table.pool_size = len(table.text_pool)
+            table.size = len(keep)
+        table._build_note_index()
+        return table
+
+    def save(self, path: str):
+        """
+        Write the table as one binary file (see the layout above _HEADER).
+
+        The file is written aside and renamed into place, so a table that is
+        itself memory-mapped from this path is never overwritten in place.
+        """
+        notes, starts, ends = self._merged_note_index()
+        vector_ids = np.ascontiguousarray(self.vector_ids[:self.size])
+        sections = {
+            "note_ids": self.note_ids[:self.size],
+            "vector_ids": vector_ids,
+            "text_offsets": self.text_offsets[:self.size + 1],
+            "index_notes": notes,
+            "index_starts": starts,
+            "index_ends": ends,
+            "type_codes": self.type_codes[:self.size],
+            "live": self.live[:self.size],
+            "text_pool": self.text_pool[:self.pool_size],
+        }
+        header = _HEADER.pack(
+            _MAGIC, _FORMAT_VERSION, self.size, self.pool_size, len(notes), self.n_dead,
+            zlib.crc32(memoryview(vector_ids)),
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(_HEADER_SIZE, b"\0"))
+            for name, dtype, count, offset in _layout(self.size, self.pool_size, len(notes))[0]:
+                f.seek(offset)
+                f.write(memoryview(np.ascontiguousarray(sections[name], dtype=dtype)))
+        os.replace(tmp_path, path)
+        self.index_notes, self.index_starts, self.index_ends = notes, starts, ends
+        self.note_changes = {}
+        self.ids_crc = zlib.crc32(memoryview(vector_ids))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["EntryTable"]:
+        """
+        Memory-map a saved table: no parsing, pages are read on demand.
+
+        Returns None when the file is missing, truncated, of another format,
+        or its vector ids do not match the checksum in its header.
+        """
+        if not os.path.exists(path) or os.path.getsize(path) < _HEADER_SIZE:
+            return None
+        data = np.memmap(path, dtype="uint8", mode="r")
+        magic, version, size, pool_size, n_notes, n_dead, ids_crc = _HEADER.unpack(bytes(data[:_HEADER.size]))
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            return None
+        sections, total = _layout(size, pool_size, n_notes)
+        if len(data) != total:
+            return None
+        table = cls()
+        for name, dtype, count, offset in sections:
+            setattr(table, name, data[offset:offset + count * np.dtype(dtype).itemsize].view(dtype))
+        if zlib.crc32(memoryview(np.ascontiguousarray(table.vector_ids))) != ids_crc:
+            return None
+        table.size, table.pool_size, table.n_dead, table.ids_crc = size, pool_size, n_dead, ids_crc
+        return table
+
+
+class EntryStore:
+    def __init__(
+        self,
+        index_path: str = "vector_store/ht.index",
+        table_path: str = "vector_store/entries.bin",
+        legacy_entries_path: Optional[str] = "vector_store/entries.json",
+        dim: int = 384,
+        compact_ratio: float = 0.25,
+        storage: str = "float32",
+        vectors_path: Optional[str] = None,
+        rerank_factor: int = 4,
+        checkpoint_ratio: float = 0.5,
+    ):
+        """
+        Entries of every processed note plus their FAISS vectors, kept in sync on disk.
+
+        Vectors live in an IndexIDMap2 keyed by each row's vector id. Replacing
+        or removing a note tombstones its rows and excludes their vector ids
+        from searches, so the cost is proportional to that note's entries; the
+        table and index are compacted once tombstones exceed compact_ratio.
+
+        Changes are saved as deltas: the entries and vectors a request added
+        and the notes it dropped are appended to a change log next to the
+        table, so a save writes only that request's entries. The index and
+        table are rewritten (and the log dropped) on compaction, or once the
+        log outgrows checkpoint_ratio of them.
+
+        Several worker processes may open the same files: every change takes
+        an exclusive file lock, first catches up with what other processes
+        saved since, and saves before releasing it. Searches that find the
+        files changed catch up too: a longer log costs only its new records,
+        and the index and table are re-read only after they were rewritten. A
+        change made with save=False stays local (and wins over other
+        processes' changes) until the next save.
+
+        With a quantized storage mode the index keeps only compact codes and
+        the float32 vectors go to a memory-mapped side file; searches fetch
+        rerank_factor * top_k candidates from the codes and re-rank them
+        exactly from that file, so scores stay exact inner products.
+
+        Args:
+            index_path: FAISS index file
+            table_path: Binary entry table file, memory-mapped on load
+            legacy_entries_path: entries.json (positional, written by older main.py)
+                to import when no matching table exists
+            dim: Embedding dimension
+            compact_ratio: Fraction of dead rows that triggers compaction
+            storage: "float32", "fp16", "sq8" or "binary" (see vector_store.quantization)
+            vectors_path: Full-precision vector file for quantized modes
+                (default: index_path with a .f32 suffix)
+            rerank_factor: Candidates fetched per result before exact re-ranking
+            checkpoint_ratio: Log size, relative to the index and table files, that triggers rewriting them
+        """
+        self.index_path = index_path
+        self.table_path = table_path
+        self.log_path = os.path.splitext(table_path)[0] + ".log"
+        self.legacy_entries_path = legacy_entries_path
+        self.dim = dim
+        self.compact_ratio = compact_ratio
+        self.storage = storage
+        self.rerank_factor = rerank_factor
+        self.checkpoint_ratio = checkpoint_ratio
+        self.indexer = FAISSHandler(dim)
+        self.indexer.index = faiss.IndexIDMap2(make_index(storage, dim))
+        # Exact copy of quantized vectors, row-aligned with the table; None when the index is exact
+        self.vectors_path = vectors_path or os.path.splitext(index_path)[0] + ".f32"
+        self.vector_file = VectorFile(self.vectors_path, dim) if storage != "float32" else None
+        self.table = EntryTable()
+        self.next_vector_id = 0
+        # Per entry kind (None = all): ID selector excluding tombstoned (and other-kind) vectors;
+        # dropped by every add, removal and compaction and rebuilt by the next search
+        # (under the read lock: concurrent builders race, the first stored wins)
+        self._search_params: Dict[Optional[str], tuple] = {}
+        self._lock = RWLock()  # searches share it, changes take it alone
+        # Shared with other processes using the same files; see _reload_if_changed()
+        self._file_lock = FileLock(index_path + ".lock")
+        self._disk_state = None  # file signature of the index and table as last loaded or saved here
+        self._dirty = False      # unsaved changes (save=False)
+        self._pending: List[bytes] = []  # log records of the change in progress
+        self._log_base = (0, 0, 0)       # rows, dead rows and id checksum of the table the log continues
+        self._log_offset = 0             # log bytes applied here (0: no log yet)
+        self._log_state = None           # file signature of the log as last read or written here
+        self._snapshot_bytes = 0         # size of the index and table files
+        self._checkpoint_due = False     # the next save must rewrite the index and table
+        with self._file_lock.exclusive():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @property
+    def note_rows(self) -> Dict[int, Tuple[int, int]]:
+        return self.table.note_rows
+
+    @staticmethod
+    def _matches(table: Optional[EntryTable], index) -> bool:
+        """True if the table describes exactly the vectors of the index, id for id."""
+        if table is None or not isinstance(index, faiss.IndexIDMap2) or index.ntotal != table.size:
+            return False
+        index_ids = np.ascontiguousarray(faiss.vector_to_array(index.id_map), dtype="<i8")
+        return zlib.crc32(memoryview(index_ids)) == table.ids_crc
+
+    def load(self):
+        """Map the table, read the index and replay the change log; fall back to importing an older layout."""
+        self._log_offset, self._log_state, self._checkpoint_due = 0, None, False
+        self._load_files()
+        self._disk_state = self._files_signature()
+        self._snapshot_bytes = self._files_size()
+
+    def _files_signature(self) -> tuple:
+        return file_signature(self.index_path, self.table_path)
+
+    def _files_size(self) -> int:
+        return sum(os.path.getsize(p) for p in (self.index_path, self.table_path) if os.path.exists(p))
+
+    def _changed_on_disk(self) -> bool:
+        return self._files_signature() != self._disk_state or file_signature(self.log_path)[0] != self._log_state
+
+    def _reload_if_changed(self):
+        """Catch up with changes another process saved since this one read or wrote the files (file lock held)."""
+        if self._dirty:
+            return
+        if self._files_signature() == self._disk_state:
+            log_state = file_signature(self.log_path)[0]
+            if log_state == self._log_state:
+                return
+            same_log = self._log_state is None or log_state is not None and log_state[0] == self._log_state[0]
+            if log_state is not None and same_log and log_state[2] >= self._log_offset:
+                # Same index and table, longer log: apply just the new records
+                self._read_log()
+                return
+        self.indexer.index = faiss.IndexIDMap2(make_index(self.storage, self.dim))
+        if self.vector_file is not None:
+            self.vector_file = VectorFile(self.vectors_path, self.dim)  # the file may have grown
+        self.table = EntryTable()
+        self.next_vector_id = 0
+        self._search_params = {}
+        self.load()
+
+    def _refresh(self):
+        """Before a read: pick up changes saved by another process."""
+        if self._dirty or not self._changed_on_disk():
+            return
+        with self._lock.write_lock(), self._file_lock.shared():
+            self._reload_if_changed()
+
+    def _load_files(self):
+        if not os.path.exists(self.index_path):
+            self._skip_log()
+            return
+        index = faiss.read_index(self.index_path)
+        table = EntryTable.load(self.table_path)
+        if self._matches(table, index):
+            self.indexer.index = index
+            self.table = table
+            self.next_vector_id = int(table.vector_ids[-1]) + 1 if table.size else 0
+            self._log_base = (table.size, table.n_dead, table.ids_crc)
+            self._read_log()
+            self._check_storage()
+            return
+        if self._import_legacy(index):
+            return
+        logging.warning("Entry index and entry table are out of sync, starting empty")
+        self._skip_log()
+        if self.vector_file is not None:
+            self.vector_file.truncate(0)
+
+    def _skip_log(self):
+        """No table for a log to continue: ignore it, and write the index and table on the next save."""
+        self._log_state = file_signature(self.log_path)[0]
+        self._checkpoint_due = True
+
+    def _log_header(self) -> bytes:
+        return _LOG_HEADER.pack(_LOG_MAGIC, *self._log_base)
+
+    def _read_log(self):
+        """Apply the log records written since this process last read the log (file lock held)."""
+        log_state = file_signature(self.log_path)[0]
+        if log_state is None:
+            self._log_state = None
+            return
+        with open(self.log_path, "rb") as f:
+            if self._log_offset == 0:
+                if f.read(_LOG_HEADER.size) != self._log_header():
+                    # Left over from an earlier table (the writer died before dropping it)
+                    self._log_state = log_state
+                    return
+                self._log_offset = _LOG_HEADER.size
+            f.seek(self._log_offset)
+            data = f.read()
+        applied = 0
+        for end, op, note_id, first_id, entries, vectors in _log_records(data, self.dim):
+            if op == _LOG_KILL:
+                self._kill_note(note_id, replay=True)
+            else:
+                self.next_vector_id = first_id
+                self._append(entries, vectors, replay=True)
+            applied = end
+        self._log_offset += applied
+        self._log_state = log_state
+        if applied and self.vector_file is not None:
+            self.vector_file = VectorFile(self.vectors_path, self.dim)  # the writers appended the vectors
+
+    def _write_log(self):
+        """Append the records of the change in progress to the log (file lock held)."""
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "r+b" if os.path.exists(self.log_path) else "w+b") as f:
+            if self._log_offset == 0:
+                f.write(self._log_header())
+            else:
+                f.seek(self._log_offset)
+            f.write(b"".join(self._pending))
+            f.truncate()  # a torn record past the end of the last good one
+            self._log_offset = f.tell()
+        self._log_state = file_signature(self.log_path)[0]
+        self._pending = []
+
+    def _check_storage(self):
+        """Bring the loaded index and vector file in line with the configured storage mode."""
+        index = self.indexer.index
+        current = storage_of(index.index)
+        # A side file left by an earlier quantized run also serves a conversion back to float32
+        vector_file = self.vector_file
+        if vector_file is None and current != self.storage and os.path.exists(self.vectors_path):
+            vector_file = VectorFile(self.vectors_path, self.dim)
+        full = None
+        if vector_file is not None:
+            vector_file.truncate(self.table.size)
+            if len(vector_file) == self.table.size:
+                full = vector_file.data
+        if full is None:
+            if current not in ("float32", "fp16") and self.table.size:
+                logging.warning("No full-precision vectors for the %s entry index, using decoded codes", current)
+            full = self._index_vectors()
+            if self.vector_file is not None:
+                self.vector_file.rewrite(full)
+        if current != self.storage:
+            converted = faiss.IndexIDMap2(make_index(self.storage, self.dim))
+            if self.table.size:
+                converted.add_with_ids(np.ascontiguousarray(full, dtype="float32"), faiss.vector_to_array(index.id_map))
+            self.indexer.index = converted
+            self.save()
+            if self.vector_file is None and vector_file is not None:
+                vector_file.remove()
+            print(f"Converted {self.index_path} from {current} to {self.storage} storage")
+
+    def _import_legacy(self, index) -> bool:
+        """Convert a positional index + entries.json pair into the table layout."""
+        if not (self.legacy_entries_path and os.path.exists(self.legacy_entries_path)):
+            return False
+        if isinstance(index, faiss.IndexIDMap2):
+            return False
+        with open(self.legacy_entries_path) as f:
+            entries = [tuple(e) for e in json.load(f)]
+        if index.ntotal != len(entries):
+            return False
+        vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, self.dim), "float32")
+        by_note: Dict[int, List[int]] = {}
+        for row, entry in enumerate(entries):
+            by_note.setdefault(entry[2], []).append(row)
+        for note_id, rows in by_note.items():
+            self._append([entries[row] for row in rows], vectors[rows])
+        self.save()
+        print(f"Imported {len(entries)} entries from {self.legacy_entries_path} into {self.table_path}")
+        return True
+
+    def save(self):
+        """Persist the index and the table in full, replacing the change log."""
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        self.indexer.save_index(self.index_path)
+        self.table.save(self.table_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._log_base = (self.table.size, self.table.n_dead, self.table.ids_crc)
+        self._log_offset, self._log_state, self._pending = 0, None, []
+        self._disk_state = self._files_signature()
+        self._snapshot_bytes = self._files_size()
+        self._dirty = self._checkpoint_due = False
+
+    def _commit(self, save: bool):
+        if not save:
+            self._pending = []
+            self._dirty = True
+        elif self._dirty or self._checkpoint_due or self._log_offset > max(self.checkpoint_ratio * self._snapshot_bytes, _LOG_MIN_BYTES):
+            self.save()
+        elif self._pending:
+            self._write_log()
+
+    def _append(self, entries: List[Entry], embeddings: np.ndarray, replay: bool = False):
+        """Append one note's entries and vectors (replay: applying another process's log record)."""
+        ids = np.arange(self.next_vector_id, self.next_vector_id + len(entries), dtype="int64")
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        self.indexer.index.add_with_ids(embeddings, ids)
+        if self.vector_file is not None and not replay:
+            self.vector_file.append(embeddings)
+        self.next_vector_id += len(entries)
+        self.table.append(entries, ids)
+        self._search_params = {}
+        if not (replay or self._dirty):
+            self._pending.append(_append_record(entries, ids, embeddings))
+
+    def _kill_note(self, note_id: int, replay: bool = False) -> int:
+        killed = len(self.table.kill_note(note_id))
+        if killed:
+            self._search_params = {}
+            if not (replay or self._dirty):
+                self._pending.append(_kill_record(note_id))
+        return killed
+
+    def _maybe_compact(self):
+        if self.table.n_dead and self.table.n_dead > self.compact_ratio * self.table.size:
+            self.indexer.index.remove_ids(faiss.IDSelectorBatch(self.table.dead_vector_ids()))
+            if self.vector_file is not None:
+                self.vector_file.rewrite(self.vector_file.data[self.table.live[:self.table.size]])
+            self.table = self.table.compacted()
+            self._search_params = {}
+            self._checkpoint_due = True  # rows moved: the log cannot describe it
+
+    def _params(self, kind: Optional[str] = None) -> Tuple[Optional[faiss.SearchParameters], int]:
+        """Search parameters restricting results to live entries (of one kind), and how many there are."""
+        if kind is None and not self.table.n_dead:
+            return None, len(self.table)
+        size = self.table.size
+        if kind is None:
+            n = len(self.table)
+        else:
+            allowed = self.table.live[:size] & (self.table.type_codes[:size] == TYPE_CODES[kind])
+            n = int(np.count_nonzero(allowed))
+        cached = self._search_params.get(kind)
+        if cached is None:
+            if kind is None:
+                batch = faiss.IDSelectorBatch(self.table.dead_vector_ids())
+                selector = faiss.IDSelectorNot(batch)
+                # The SWIG wrappers do not own each other; keep the selectors alive with the params
+                keep_alive = (batch, selector)
+            else:
+                bitmap = np.zeros(self.next_vector_id, dtype="bool")
+                bitmap[self.table.vector_ids[:size][allowed]] = True
+                bits = np.packbits(bitmap, bitorder="little")
+                # The bitmap's length in bytes: ids past it are rejected, never read
+                selector = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))
+                keep_alive = (bits, selector)
+            # setdefault, not assignment: replacing an entry another search is using would free its selector
+            cached = self._search_params.setdefault(kind, (selector, keep_alive))
+        selector, _ = cached
+        # Fresh parameters per search: IndexIDMap2 swaps params.sel in place while searching
+        return faiss.SearchParameters(sel=selector), n
+
+    def add(self, entries: List[Entry], embeddings: np.ndarray, save: bool = True):
+        """Append entries with their (normalized) embeddings, grouped by note."""
+        if not entries:
+            return
+        with self._lock.write_lock(), self._file_lock.exclusive():
+            self._reload_if_changed()
+            by_note: Dict[int, List[int]] = {}
+            for i, entry in enumerate(entries):
+                by_note.setdefault(entry[2], []).append(i)
+            for note_id, positions in by_note.items():
+                # A note added again replaces its earlier entries
+                self._kill_note(note_id)
+                self._append([entries[i] for i in positions], embeddings[positions])
+            self._maybe_compact()
+            self._commit(save)
+
+    def clear(self, save: bool = True):
+        """Drop every entry and vector."""
+        with self._lock.write_lock(), self._file_lock.exclusive():
+            self.indexer.index = faiss.IndexIDMap2(make_index(self.storage, self.dim))
+            if self.vector_file is not None:
+                self.vector_file.truncate(0)
+            self.table = EntryTable()
+            self.next_vector_id = 0
+            self._search_params = {}
+            self._pending = []
+            self._checkpoint_due = True
+            self._commit(save)
+
+    def remove_note(self, note_id: int, save: bool = True) -> int:
+        """Drop every entry of a note. Returns the number removed."""
+        with self._lock.write_lock(), self._file_lock.exclusive():
+            self._reload_if_changed()
+            removed = self._kill_note(note_id)
+            if removed:
+                self._maybe_compact()
+                self._commit(save)
+        return removed
+
+    def replace_note(self, note_id: int, entries: List[Entry], embeddings: np.ndarray, save: bool = True):
+        """Swap a note's entries for new ones, leaving every other note's rows untouched."""
+        with self._lock.write_lock(), self._file_lock.exclusive():
+            self._reload_if_changed()
+            self._kill_note(note_id)
+            if entries:
+                self._append(entries, embeddings)
+            self._maybe_compact()
+            self._commit(save)
+
+    def note_entries(self, note_id: int) -> List[Entry]:
+        """The live entries of one note."""
+        self._refresh()
+        with self._lock.read_lock():
+            start, end = self.table.note_range(note_id)
+            return [self.table.entry(row) for row in range(start, end)]
+
+    def _index_vectors(self) -> np.ndarray:
+        """Every vector in row order: the full-precision file, a view on a flat index, or decoded codes."""
+        if self.vector_file is not None and len(self.vector_file) == self.table.size:
+            return self.vector_file.data
+        base = faiss.downcast_index(self.indexer.index.index)
+        n = base.ntotal
+        if n == 0:
+            return np.zeros((0, self.dim), dtype="float32")
+        if isinstance(base, faiss.IndexFlat):
+            return faiss.rev_swig_ptr(base.get_xb(), n * self.dim).reshape(n, self.dim)
+        return base.reconstruct_n(0, n)
+
+    def entries_with_vectors(self) -> Tuple[List[Entry], np.ndarray]:
+        """Every live entry with its vector, read back from the index or the vector file."""
+        self._refresh()
+        with self._lock.read_lock():
+            rows = np.flatnonzero(self.table.live[:self.table.size])
+            vectors = np.array(self._index_vectors()[rows], dtype="float32")
+            return self.table.entries(rows), vectors
+
+    def note_vectors(self, note_id: int) -> np.ndarray:
+        """The vectors of one note's live entries, in the order of note_entries()."""
+        self._refresh()
+        with self._lock.read_lock():
+            start, end = self.table.note_range(note_id)
+            return np.array(self._index_vectors()[start:end], dtype="float32")
+
+    def search(self, vectors: np.ndarray, top_k: int = 5, kind: Optional[str] = None) -> List[List[Tuple[Entry, float]]]:
+        """
+        Nearest live entries for each query vector, as [(entry, score), ...] lists, best first.
+
+        kind ("need" or "availability") restricts the results to entries of that type.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, self.dim)
+        self._refresh()
+        with self._lock.read_lock(), span("faiss_search"):
+            params, n_live = self._params(kind)
+            if n_live == 0:
+                return [[] for _ in range(len(vectors))]
+            if self.vector_file is None:
+                scores, ids = self.indexer.index.search(vectors, min(top_k, n_live), params=params)
+                rows = np.where(ids != -1, self.table.rows_for_vectors(ids), -1)
+            else:
+                # Over-fetch from the compact codes, then score the candidates exactly
+                _, ids = self.indexer.index.search(vectors, min(top_k * self.rerank_factor, n_live), params=params)
+                candidates = np.where(ids != -1, self.table.rows_for_vectors(ids), -1)
+                scores, rows = rerank(vectors, candidates, self.vector_file.data, top_k)
+            results = []
+            for row_ids, row_scores in zip(rows, scores):
+                valid = row_ids != -1
+                results.append([(self.table.entry(int(r)), float(s)) for r, s in zip(row_ids[valid], row_scores[valid])])
+            return results
@@ -1,46 +1,137 @@
 # FAISS storage/retrieval logic
 
+import logging
+import os
+
 import faiss
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from utils.metrics import span
+from vector_store.quantization import make_index
+
+
+def set_num_threads(n_threads: Optional[int]):
+    """Set FAISS's OpenMP worker threads for this process (no-op when unset)."""
+    if n_threads:
+        faiss.omp_set_num_threads(n_threads)
+
 
 class FAISSHandler:
-    def __init__(self, dim=384):
-        self.index = faiss.IndexFlatIP(dim)
+    def __init__(self, dim=384, storage="float32"):
+        # storage: float32 | fp16 | sq8 | binary, see vector_store.quantization
+        self.index = make_index(storage, dim)
 
     def add(self, vectors: np.ndarray):
         if vectors.ndim == 1:  # single vector case
             vectors = vectors.reshape(1, -1)
         self.index.add(vectors)
 
+    @property
+    def higher_is_closer(self) -> bool:
+        """Inner product scores rank high-first; distances (binary storage) low-first."""
+        return self.index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    def _passes(self, scores: np.ndarray, threshold: float) -> np.ndarray:
+        return scores > threshold if self.higher_is_closer else scores < threshold
+
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        threshold: Optional[float] = None,
+        exclude_ids: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest neighbours of every query row, as arrays.
+
+        Args:
+            queries: (n, dim) query matrix (any rows, not necessarily indexed ones)
+            top_k: Neighbours per query
+            threshold: Keep only scores above it (distances below it for binary storage)
+            exclude_ids: (n,) index id to drop from each query's results, e.g. the
+                query's own id when the queries are indexed vectors; -1 for none
+
+        Returns:
+            (scores, ids) of shape (n, min(top_k, ntotal)), best first; slots without
+            a result have id -1 and the worst possible score
+        """
+        queries = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.index.d)
+        k = min(top_k, self.index.ntotal)
+        worst = -np.inf if self.higher_is_closer else np.inf
+        if k == 0 or len(queries) == 0:
+            return np.full((len(queries), k), worst, dtype="float32"), np.full((len(queries), k), -1, dtype="int64")
+
+        # One extra neighbour makes room for the excluded id
+        fetch = min(k + 1, self.index.ntotal) if exclude_ids is not None else k
+        with span("faiss_search"):
+            scores, ids = self.index.search(queries, fetch)
+        valid = ids >= 0
+        if threshold is not None:
+            valid &= self._passes(scores, threshold)
+        if exclude_ids is not None:
+            valid &= ids != np.asarray(exclude_ids, dtype="int64").reshape(-1, 1)
+        if fetch != k or not valid.all():
+            # Move the surviving results to the front of each row, keeping their order
+            order = np.argsort(~valid, axis=1, kind="stable")[:, :k]
+            scores = np.take_along_axis(scores, order, axis=1)
+            ids = np.take_along_axis(ids, order, axis=1)
+            valid = np.take_along_axis(valid, order, axis=1)
+            scores[~valid] = worst
+            ids[~valid] = -1
+        return scores, ids
+
+    def range_search(
+        self,
+        queries: np.ndarray,
+        threshold: float,
+        exclude_ids: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Every indexed vector within threshold of each query (score above it for inner product).
+
+        Returns:
+            (lims, scores, ids) in FAISS's range-search layout: the results of
+            query i are scores[lims[i]:lims[i + 1]] / ids[lims[i]:lims[i + 1]],
+            in no particular order
+        """
+        queries = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.index.d)
+        with span("faiss_search"):
+            lims, scores, ids = self.index.range_search(queries, threshold)
+        lims = lims.astype("int64")
+        if exclude_ids is not None:
+            query_of = np.repeat(np.arange(len(queries)), np.diff(lims))
+            keep = ids != np.asarray(exclude_ids, dtype="int64")[query_of]
+            counts = np.bincount(query_of[keep], minlength=len(queries))
+            lims = np.concatenate([[0], np.cumsum(counts)]).astype("int64")
+            scores, ids = scores[keep], ids[keep]
+        return lims, scores, ids
+
     def search(self, query: np.ndarray, top_k: int = 5, threshold: float = 0.85):
-        print(f"FAISS DEBUG: Searching with threshold {threshold}")
-        print(f"FAISS DEBUG: Query shape: {query.shape}, Index total: {self.index.ntotal}")
-        
+        """
+        (query row, index id, score) tuples above threshold, skipping index id == query row.
+
+        Kept for callers written against an index built from the query matrix
+        itself; new code should use search_batch.
+        """
+        logging.debug("FAISS search: query shape %s, index total %d, threshold %s", query.shape, self.index.ntotal, threshold)
         try:
-            scores, indices = self.index.search(query, top_k)
-            print(f"FAISS DEBUG: Search completed successfully")
-            print(f"FAISS DEBUG: Raw scores shape: {scores.shape}")
-            print(f"FAISS DEBUG: Score ranges: min={scores.min():.4f}, max={scores.max():.4f}")
-            
-            results = []
-            for i, idx_list in enumerate(indices):
-                for j, idx in enumerate(idx_list):
-                    print(f"FAISS DEBUG: Query {i} -> Index {idx} = {scores[i][j]:.4f} (threshold: {threshold})")
-                    if scores[i][j] > threshold and idx != i:
-                        results.append((i, idx, scores[i][j]))
-            print(f"FAISS DEBUG: Found {len(results)} results above threshold")
+            scores, ids = self.search_batch(query, top_k, threshold=threshold)
+            rows = np.arange(len(ids)).reshape(-1, 1)
+            hits = np.nonzero((ids >= 0) & (ids != rows))
+            results = [(int(i), int(idx), score) for i, idx, score in zip(hits[0], ids[hits], scores[hits])]
+            logging.debug("FAISS search: %d results above threshold", len(results))
             return results
         except Exception as e:
-            print(f"FAISS DEBUG: Search failed with error: {e}")
-            import traceback
-            traceback.print_exc()
+            logging.exception(f"FAISS search failed: {e}")
             return []
-    
+
     def save_index(self, path: str):
-        """Save the FAISS index to disk."""
-        faiss.write_index(self.index, path)
-    
+        """Save the FAISS index to disk (written aside and renamed, so readers never see a partial file)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, path)
+
     def load_index(self, path: str):
         """Load the FAISS index from disk."""
         self.index = faiss.read_index(path)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Migrate CLI/API vector artifacts to a single copy of every vector
+
+Older versions wrote the entry vectors twice, into ht.index and into
+embeddings.npy, with the entry metadata in entries.json. This converts them to
+ht.index + entries.bin: vectors are taken from ht.index when it matches
+entries.json, otherwise from embeddings.npy. The redundant files are removed
+afterwards unless --keep is given.
+
+Usage: python -m vector_store.migrate [--dir vector_store] [--keep]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from vector_store.entry_store import EntryStore
+
+
+def disk_usage(paths) -> int:
+    return sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+
+
+def migrate(directory: str, keep: bool = False) -> bool:
+    """Convert the artifacts in directory. Returns False if nothing consistent was found."""
+    index_path = os.path.join(directory, "ht.index")
+    table_path = os.path.join(directory, "entries.bin")
+    entries_path = os.path.join(directory, "entries.json")
+    embeddings_path = os.path.join(directory, "embeddings.npy")
+    before = disk_usage([index_path, table_path, entries_path, embeddings_path])
+
+    # Loading imports ht.index + entries.json when they match
+    store = EntryStore(index_path, table_path, legacy_entries_path=entries_path)
+    if not len(store) and os.path.exists(entries_path) and os.path.exists(embeddings_path):
+        with open(entries_path) as f:
+            entries = [tuple(e) for e in json.load(f)]
+        embeddings = np.load(embeddings_path)
+        if len(entries) != len(embeddings):
+            print(f"Error: {entries_path} has {len(entries)} entries but {embeddings_path} has {len(embeddings)} vectors")
+            return False
+        print(f"Rebuilding {index_path} from {embeddings_path}")
+        store.clear(save=False)
+        store.add(entries, embeddings)
+
+    if not len(store):
+        print(f"Nothing to migrate in {directory}")
+        return False
+
+    if not keep:
+        for path in (entries_path, embeddings_path):
+            if os.path.exists(path):
+                os.remove(path)
+                print(f"Removed {path}")
+    after = disk_usage([index_path, table_path, entries_path, embeddings_path])
+    print(f"{len(store)} entries in {index_path} + {table_path}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="vector_store", help="Directory holding ht.index and friends")
+    parser.add_argument("--keep", action="store_true", help="Keep entries.json and embeddings.npy")
+    args = parser.parse_args()
+    sys.exit(0 if migrate(args.dir, args.keep) else 1)
+
+
+if __name__ == "__main__":
+    main()
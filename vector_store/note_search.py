@@ -0,0 +1,208 @@
+# Hybrid keyword + vector search over whole notes, kept in step with the note store
+
+import json
+import os
+import threading
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from storage.note_store import content_hash
+from vector_store.bm25_index import BM25Index, tokenize, reciprocal_rank_fusion
+from vector_store.concurrent_index import FileLock, file_signature
+
+
+class NoteSearchIndex:
+    def __init__(
+        self,
+        embedder,
+        index_path: str = "vector_store/notes.index",
+        dim: int = 384,
+        rrf_k: int = 60,
+        min_similarity: float = 0.3,
+    ):
+        """
+        Search notes by keywords (BM25) and by meaning (FAISS), fused with RRF.
+        Only notes at least min_similarity close to the query take part in the
+        vector ranking, so an unrelated query finds few notes or none instead
+        of every note in similarity order.
+
+        Vectors are keyed by note id and persisted with the content hash each
+        was embedded from, so sync() re-embeds only notes added or edited
+        since, whichever process made the edit and whether or not an index was
+        loaded at the time. The BM25 index is rebuilt in memory from the note
+        texts, which needs no model calls.
+
+        Worker processes share the vector file the way EntryStore does: syncs,
+        edits and removals hold an exclusive file lock and reload the index if
+        another worker saved it since; any read that finds the file changed
+        reloads it and rebuilds the BM25 index on the next sync(), so edits and
+        deletions made in other workers show up here too.
+
+        Args:
+            embedder: Shared Embedder instance
+            index_path: Where the note vector index is persisted (hashes go to index_path + ".hashes")
+            dim: Embedding dimension
+            rrf_k: Reciprocal rank fusion constant
+            min_similarity: Cosine similarity a note needs to match by meaning
+        """
+        self.embedder = embedder
+        self.index_path = index_path
+        self.hashes_path = index_path + ".hashes"
+        self.dim = dim
+        self.rrf_k = rrf_k
+        self.min_similarity = min_similarity
+        self.text_index = BM25Index()
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.text_hashes: Dict[int, str] = {}    # note id -> content hash in the BM25 index
+        self.vector_hashes: Dict[int, str] = {}  # note id -> content hash its vector was embedded from
+        self._store_version = None  # note store version at the last sync
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(index_path + ".lock")
+        self._disk_state = None  # file signature of the index as last loaded or saved here
+        with self._file_lock.shared():
+            self.load()
+
+    def load(self):
+        """Load the persisted vector index and hashes, if present."""
+        self._disk_state = file_signature(self.index_path, self.hashes_path)
+        if not os.path.exists(self.index_path):
+            return
+        self.index = faiss.read_index(self.index_path)
+        try:
+            with open(self.hashes_path) as f:
+                hashes = json.load(f)
+        except FileNotFoundError:
+            hashes = {}
+        # A vector with no recorded hash never matches, so the next sync() re-embeds it
+        ids = faiss.vector_to_array(self.index.id_map)
+        self.vector_hashes = {int(note_id): hashes.get(str(note_id)) for note_id in ids}
+
+    def save(self):
+        """Persist the vector index and hashes (atomically, so concurrent workers never read a partial file)."""
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.hashes_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({str(note_id): digest for note_id, digest in self.vector_hashes.items()}, f)
+        os.replace(tmp_path, self.hashes_path)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        self._disk_state = file_signature(self.index_path, self.hashes_path)
+
+    def _changed(self) -> bool:
+        return file_signature(self.index_path, self.hashes_path) != self._disk_state
+
+    def _reload(self):
+        """Adopt the index another process saved (lock held); texts are re-read by the next sync()."""
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+        self.vector_hashes = {}
+        self.text_index = BM25Index()
+        self.text_hashes = {}
+        self._store_version = None
+        self.load()
+
+    def _refresh(self):
+        """Before a read (self._lock held): pick up a save by another process."""
+        if self._changed():
+            with self._file_lock.shared():
+                self._reload()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.ascontiguousarray(self.embedder.get_embeddings(texts), dtype="float32")
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def sync(self, note_store, batch_size: int = 256) -> int:
+        """
+        Bring both indexes in line with the note store: index new notes,
+        re-index notes whose content hash changed and drop deleted ones.
+        Returns the number of notes embedded.
+        """
+        with self._lock:
+            self._refresh()
+            version = note_store.version()
+            if version == self._store_version:
+                return 0
+            current = note_store.content_hashes()
+            embedded = 0
+            if current != self.text_hashes or current != self.vector_hashes:
+                with self._file_lock.exclusive():
+                    if self._changed():
+                        self._reload()
+                    embedded = self._sync(note_store, current, batch_size)
+            self._store_version = version
+            return embedded
+
+    def _sync(self, note_store, current: Dict[int, str], batch_size: int) -> int:
+        for note_id in [i for i in self.text_hashes if i not in current]:
+            self.text_index.remove(note_id)
+            del self.text_hashes[note_id]
+        gone = [i for i in self.vector_hashes if i not in current]
+        if gone:
+            self.index.remove_ids(np.array(gone, dtype="int64"))
+            for note_id in gone:
+                del self.vector_hashes[note_id]
+
+        stale = sorted(
+            note_id for note_id, digest in current.items()
+            if self.text_hashes.get(note_id) != digest or self.vector_hashes.get(note_id) != digest
+        )
+        embedded = 0
+        for start in range(0, len(stale), batch_size):
+            records = note_store.get_many(stale[start:start + batch_size])
+            for record in records:
+                if self.text_hashes.get(record["id"]) != record["content_hash"]:
+                    self.text_index.add(record["id"], tokenize(record["content"]))
+                    self.text_hashes[record["id"]] = record["content_hash"]
+            changed = [r for r in records if self.vector_hashes.get(r["id"]) != r["content_hash"]]
+            if changed:
+                ids = np.array([r["id"] for r in changed], dtype="int64")
+                self.index.remove_ids(ids)  # edited notes drop the vector of their old text
+                self.index.add_with_ids(self._embed([r["content"] for r in changed]), ids)
+                self.vector_hashes.update((r["id"], r["content_hash"]) for r in changed)
+                embedded += len(changed)
+        if embedded or gone:
+            self.save()
+        return embedded
+
+    def remove(self, note_id: int):
+        """Drop a deleted note from both indexes."""
+        with self._lock, self._file_lock.exclusive():
+            if self._changed():
+                self._reload()
+            if self.text_hashes.pop(note_id, None) is not None:
+                self.text_index.remove(note_id)
+            if note_id in self.vector_hashes:
+                del self.vector_hashes[note_id]
+                self.index.remove_ids(np.array([note_id], dtype="int64"))
+                self.save()
+
+    def update(self, note_id: int, content: str):
+        """Re-index an edited note in place (notes not yet synced are left to sync())."""
+        vector = self._embed([content])
+        digest = content_hash(content)
+        with self._lock, self._file_lock.exclusive():
+            if self._changed():
+                self._reload()
+            if note_id in self.text_hashes:
+                self.text_index.add(note_id, tokenize(content))
+                self.text_hashes[note_id] = digest
+            if note_id in self.vector_hashes:
+                self.index.remove_ids(np.array([note_id], dtype="int64"))
+                self.index.add_with_ids(vector, np.array([note_id], dtype="int64"))
+                self.vector_hashes[note_id] = digest
+                self.save()
+
+    def search(self, query: str, top_k: int = 200) -> List[Tuple[int, float]]:
+        """Up to top_k (note_id, fused score) pairs, best first."""
+        query_vector = self._embed([query])
+        with self._lock:
+            self._refresh()
+            keyword = [doc_id for doc_id, _ in self.text_index.search(tokenize(query), top_k)]
+            dense = []
+            if self.index.ntotal:
+                scores, ids = self.index.search(query_vector, min(top_k, self.index.ntotal))
+                dense = [int(i) for score, i in zip(scores[0], ids[0]) if i != -1 and score >= self.min_similarity]
+        return reciprocal_rank_fusion([keyword, dense], k=self.rrf_k, top_k=top_k)
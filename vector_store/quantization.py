@@ -0,0 +1,125 @@
+# Compact vector storage modes for FAISS indexes, with exact re-ranking from a memory-mapped file
+
+import os
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# float32: exact (4 bytes/dim); fp16: half precision (2 bytes/dim);
+# sq8: 8-bit scalar quantization (1 byte/dim); binary: sign bits (1 bit/dim, Hamming distance)
+STORAGE_MODES = ("float32", "fp16", "sq8", "binary")
+
+# sq8 codes cover [-SQ8_RANGE, SQ8_RANGE] on every dimension. Components of
+# normalized 384-dim embeddings stay well inside it; larger ones are clipped,
+# which the re-ranking step corrects for.
+SQ8_RANGE = 0.5
+
+
+def make_index(storage: str = "float32", dim: int = 384) -> faiss.Index:
+    """An empty, ready-to-add inner product index in the given storage mode."""
+    if storage == "float32":
+        return faiss.IndexFlatIP(dim)
+    if storage == "fp16":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    if storage == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit_uniform, faiss.METRIC_INNER_PRODUCT)
+        index.train(np.array([[-SQ8_RANGE] * dim, [SQ8_RANGE] * dim], dtype="float32"))
+        return index
+    if storage == "binary":
+        # Sign bits of the raw components; ranks by Hamming distance (lower is closer)
+        return faiss.IndexLSH(dim, dim, False, False)
+    raise ValueError(f"Unknown storage mode {storage!r}, expected one of {STORAGE_MODES}")
+
+
+def storage_of(index: faiss.Index) -> Optional[str]:
+    """The storage mode of an index built by make_index (None for anything else)."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexFlat):
+        return "float32"
+    if isinstance(index, faiss.IndexLSH):
+        return "binary"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return {
+            faiss.ScalarQuantizer.QT_fp16: "fp16",
+            faiss.ScalarQuantizer.QT_8bit_uniform: "sq8",
+        }.get(index.sq.qtype)
+    return None
+
+
+class VectorFile:
+    def __init__(self, path: str, dim: int = 384):
+        """
+        Append-only float32 vectors in a raw file, read through a memory map.
+
+        Holds the full-precision copy of vectors whose index stores them
+        quantized: only the rows being re-ranked are paged in.
+        """
+        self.path = path
+        self.dim = dim
+        self.data = np.zeros((0, dim), dtype="float32")
+        self._map()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def _map(self):
+        rows = os.path.getsize(self.path) // (4 * self.dim) if os.path.exists(self.path) else 0
+        if rows:
+            self.data = np.memmap(self.path, dtype="float32", mode="r", shape=(rows, self.dim))
+        else:
+            self.data = np.zeros((0, self.dim), dtype="float32")
+
+    def append(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, self.dim)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(memoryview(vectors))
+        self._map()
+
+    def truncate(self, rows: int):
+        """Drop rows past the first rows (left over from an unsaved index)."""
+        if rows < len(self.data):
+            with open(self.path, "r+b") as f:
+                f.truncate(rows * 4 * self.dim)
+            self._map()
+
+    def rewrite(self, vectors: np.ndarray):
+        """Replace the whole file (written aside and renamed, so open maps stay valid)."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, self.dim)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(memoryview(vectors))
+        os.replace(tmp_path, self.path)
+        self._map()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._map()
+
+
+def rerank(queries: np.ndarray, candidates: np.ndarray, vectors: np.ndarray, top_k: int):
+    """
+    Exact inner products of each query with its candidate rows, best top_k first.
+
+    Args:
+        queries: (n, dim) query vectors
+        candidates: (n, k') candidate rows into vectors, -1 for none
+        vectors: Full-precision vectors (e.g. VectorFile.data)
+        top_k: Results to keep per query
+
+    Returns:
+        (scores, rows) arrays of shape (n, top_k), padded with -inf / -1
+    """
+    n, k = candidates.shape
+    valid = candidates >= 0
+    gathered = np.asarray(vectors[np.where(valid, candidates, 0).ravel()]).reshape(n, k, -1)
+    scores = np.einsum("nkd,nd->nk", gathered, queries)
+    scores[~valid] = -np.inf
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+    rows = np.take_along_axis(candidates, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    rows[~np.isfinite(scores)] = -1
+    return scores, rows
@@ -0,0 +1,175 @@
+# Semantic cache: past requests in a small FAISS index, answered again when a new one is close enough
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from utils.metrics import CACHE_HITS, CACHE_MISSES
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        dim: int = 384,
+        parts: int = 1,
+        threshold: float = 0.9,
+        max_entries: int = 1000,
+        ttl: float = 0.0,
+        name: str = "semantic",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Results keyed by request embedding instead of exact text.
+
+        A lookup finds the nearest stored request by inner product (cosine for
+        normalized embeddings) and returns its result when the score is at
+        least threshold, so near-paraphrases reuse one LLM answer. Lowering
+        threshold or raising ttl trades freshness and precision for fewer
+        LLM calls. The least recently used entries are dropped beyond
+        max_entries. Hits and misses go to ht_cache_hits_total /
+        ht_cache_misses_total under cache=name.
+
+        A key can be several embeddings side by side (parts > 1, e.g. a need
+        and an availability). Candidates are found on the concatenation, but
+        one only hits when every part alone is at least threshold similar, so
+        a close need cannot make up for a different availability.
+
+        Entries can carry a version (e.g. the graph version a result was
+        computed on); a lookup for another version passes them over, so a
+        result put after an invalidation never answers for the newer state.
+
+        Args:
+            dim: Dimension of each key part
+            parts: Embeddings per key
+            threshold: Minimum similarity for a hit (above 1 never hits)
+            max_entries: Entries kept (0 disables the cache)
+            ttl: Seconds an entry stays valid (0 or less: no expiry)
+            name: Label for the cache metrics
+            clock: Time source (for tests)
+        """
+        self.dim = dim
+        self.parts = parts
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self.clock = clock
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(parts * dim))
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (expires, version, parts, value), LRU first
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.threshold <= 1.0
+
+    def _parts(self, vector: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(vector, dtype="float32").reshape(self.parts, self.dim)
+
+    def _key(self, parts: np.ndarray) -> np.ndarray:
+        # Scaled so the inner product of two keys is the mean of their part similarities
+        return parts.reshape(1, -1) / np.sqrt(self.parts)
+
+    def _remove(self, ids):
+        for entry_id in ids:
+            del self._entries[entry_id]
+        self.index.remove_ids(np.asarray(ids, dtype="int64"))
+
+    def lookup(self, vector: np.ndarray, version: Any = None, candidates: int = 4) -> Optional[Tuple[Any, float]]:
+        """
+        (stored result, similarity) of the nearest live entry of this version
+        whose every part is at or above threshold, or None; similarity is that
+        of its least similar part. vector holds the parts side by side, shape
+        (parts * dim,).
+        """
+        if not self.enabled:
+            return None
+        parts = self._parts(vector)
+        now = self.clock()
+        hit = None
+        with self._lock:
+            if self.index.ntotal:
+                _, ids = self.index.search(self._key(parts), min(candidates, self.index.ntotal))
+                expired = []
+                for entry_id in ids[0]:
+                    if entry_id < 0:
+                        break
+                    expires, entry_version, stored, value = self._entries[int(entry_id)]
+                    if expires < now:
+                        expired.append(int(entry_id))
+                        continue
+                    if entry_version != version:
+                        continue
+                    score = float(np.min(np.einsum("ij,ij->i", parts, stored)))
+                    if score >= self.threshold:
+                        self._entries.move_to_end(int(entry_id))
+                        hit = (value, score)
+                        break
+                if expired:
+                    self._remove(expired)
+            if hit is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        (CACHE_MISSES if hit is None else CACHE_HITS).inc(cache=self.name)
+        return hit
+
+    def get(self, vector: np.ndarray, default: Any = None, version: Any = None) -> Any:
+        hit = self.lookup(vector, version)
+        return default if hit is None else hit[0]
+
+    def put(self, vector: np.ndarray, value: Any, version: Any = None):
+        if not self.enabled:
+            return
+        parts = self._parts(vector).copy()
+        expires = self.clock() + self.ttl if self.ttl > 0 else float("inf")
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(self._key(parts), np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (expires, version, parts, value)
+            if len(self._entries) > self.max_entries:
+                # Down to 90% at once: each remove_ids rewrites the flat index
+                excess = len(self._entries) - self.max_entries + self.max_entries // 10
+                self._remove(list(self._entries)[:excess])
+
+    def clear(self):
+        with self._lock:
+            self.index.reset()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "threshold": self.threshold,
+        }
+
+
+def semantic_cache_from_env(prefix: str, dim: int = 384, parts: int = 1, name: str = "semantic") -> SemanticCache:
+    """
+    A SemanticCache configured from <prefix>_THRESHOLD, <prefix>_SIZE and <prefix>_TTL.
+
+    Defaults: threshold 0.9, 1000 entries, one hour; <prefix>_SIZE=0 disables it.
+    """
+    return SemanticCache(
+        dim=dim,
+        parts=parts,
+        threshold=float(os.getenv(f"{prefix}_THRESHOLD", "0.9")),
+        max_entries=int(os.getenv(f"{prefix}_SIZE", "1000")),
+        ttl=float(os.getenv(f"{prefix}_TTL", "3600")),
+        name=name,
+    )
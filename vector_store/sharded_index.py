@@ -0,0 +1,209 @@
+# Per-tenant entry indexes: shards loaded on demand, evicted LRU under a memory budget
+
+import heapq
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from vector_store.entry_store import Entry, EntryStore
+
+# Tenant ids become directory names
+_TENANT_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+def check_tenant(tenant: str) -> str:
+    """Return tenant if it is a valid shard name (letters, digits, _ . -; up to 64), else raise ValueError."""
+    if not isinstance(tenant, str) or not _TENANT_ID.fullmatch(tenant):
+        raise ValueError(f"Invalid tenant id {tenant!r}")
+    return tenant
+
+
+def shard_bytes(store: EntryStore) -> int:
+    """Estimated resident size of a loaded shard: index codes, id maps and entry table."""
+    base = faiss.downcast_index(store.indexer.index.index)
+    code_size = getattr(base, "code_size", 4 * store.dim)
+    table = store.table
+    # IndexIDMap2 keeps the ids twice (array + reverse hash map); table: 26 bytes per row + text
+    return store.indexer.index.ntotal * (code_size + 40) + table.size * 26 + table.pool_size
+
+
+class ShardedIndexManager:
+    def __init__(
+        self,
+        root_dir: str = "vector_store/shards",
+        memory_budget_mb: float = 512,
+        max_workers: int = 4,
+        **store_kwargs,
+    ):
+        """
+        One EntryStore per tenant, saved under root_dir/<tenant>/.
+
+        A search scans only its tenant's vectors, so its latency follows that
+        tenant's data size rather than everyone's. Shards are loaded on first
+        use and kept in LRU order; once the loaded shards' estimated size
+        exceeds memory_budget_mb, the least recently used ones that no caller
+        holds are dropped (every change is saved, so their files are current).
+        search_many fans one query out to several shards on a thread pool.
+
+        Args:
+            root_dir: Directory holding one subdirectory per tenant
+            memory_budget_mb: Size of the loaded shards above which idle ones are evicted
+            max_workers: Threads for cross-shard searches
+            store_kwargs: Passed to every EntryStore (storage, dim, compact_ratio, ...)
+        """
+        self.root_dir = root_dir
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.store_kwargs = store_kwargs
+        self._shards: "OrderedDict[str, EntryStore]" = OrderedDict()  # least recently used first
+        self._pins: Dict[str, int] = {}
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard-search")
+
+    def shard_dir(self, tenant: str) -> str:
+        return os.path.join(self.root_dir, check_tenant(tenant))
+
+    def tenants(self) -> List[str]:
+        """Every tenant with a saved or loaded shard."""
+        saved = set()
+        if os.path.isdir(self.root_dir):
+            saved = {name for name in os.listdir(self.root_dir) if os.path.exists(os.path.join(self.root_dir, name, "ht.index"))}
+        with self._lock:
+            return sorted(saved | set(self._shards))
+
+    def loaded(self) -> Dict[str, int]:
+        """Estimated bytes of each loaded shard, least recently used first."""
+        with self._lock:
+            return {tenant: shard_bytes(store) for tenant, store in self._shards.items()}
+
+    def acquire(self, tenant: str) -> EntryStore:
+        """
+        The tenant's shard, loaded (or created empty) if needed and held until release().
+
+        A held shard is never evicted, so changes made through it cannot race
+        a fresh copy loaded from disk.
+        """
+        check_tenant(tenant)
+        with self._lock:
+            self._pins[tenant] = self._pins.get(tenant, 0) + 1
+            store = self._shards.get(tenant)
+            if store is not None:
+                self._shards.move_to_end(tenant)
+                return store
+            loading = self._loading.setdefault(tenant, threading.Lock())
+        try:
+            # Load outside the manager lock so other tenants are not held up; one loader per tenant
+            with loading:
+                with self._lock:
+                    store = self._shards.get(tenant)
+                if store is None:
+                    store = self._open(tenant)
+                    with self._lock:
+                        self._shards[tenant] = store
+                        self._loading.pop(tenant, None)
+        except Exception:
+            self.release(tenant)
+            raise
+        self._evict()
+        return store
+
+    def release(self, tenant: str):
+        with self._lock:
+            self._pins[tenant] -= 1
+            if not self._pins[tenant]:
+                del self._pins[tenant]
+        self._evict()
+
+    @contextmanager
+    def shard(self, tenant: str):
+        """Hold a tenant's shard for the duration of a with block."""
+        store = self.acquire(tenant)
+        try:
+            yield store
+        finally:
+            self.release(tenant)
+
+    def _open(self, tenant: str) -> EntryStore:
+        directory = self.shard_dir(tenant)
+        store = EntryStore(
+            os.path.join(directory, "ht.index"),
+            os.path.join(directory, "entries.bin"),
+            legacy_entries_path=None,
+            **self.store_kwargs,
+        )
+        logging.debug("Loaded shard %s (%d entries)", tenant, len(store))
+        return store
+
+    def _evict(self):
+        """Drop idle shards, least recently used first, until the loaded ones fit the budget."""
+        with self._lock:
+            sizes = {tenant: shard_bytes(store) for tenant, store in self._shards.items()}
+            total = sum(sizes.values())
+            # The most recently used shard stays even when it alone exceeds the budget
+            for tenant in list(self._shards)[:-1]:
+                if total <= self.memory_budget:
+                    break
+                if tenant in self._pins:
+                    continue
+                del self._shards[tenant]
+                total -= sizes[tenant]
+                logging.debug("Evicted shard %s (%d bytes)", tenant, sizes[tenant])
+
+    def evict_all(self):
+        """Drop every idle shard."""
+        with self._lock:
+            for tenant in [t for t in self._shards if t not in self._pins]:
+                del self._shards[tenant]
+
+    # --- Routed operations (each holds the shard only for the call) ---
+
+    def add(self, tenant: str, entries: List[Entry], embeddings: np.ndarray, save: bool = True):
+        with self.shard(tenant) as store:
+            store.add(entries, embeddings, save=save)
+
+    def replace_note(self, tenant: str, note_id: int, entries: List[Entry], embeddings: np.ndarray, save: bool = True):
+        with self.shard(tenant) as store:
+            store.replace_note(note_id, entries, embeddings, save=save)
+
+    def remove_note(self, tenant: str, note_id: int, save: bool = True) -> int:
+        with self.shard(tenant) as store:
+            return store.remove_note(note_id, save=save)
+
+    def search(self, tenant: str, vectors: np.ndarray, top_k: int = 5, kind: Optional[str] = None) -> List[List[Tuple[Entry, float]]]:
+        """EntryStore.search on one tenant's shard."""
+        with self.shard(tenant) as store:
+            return store.search(vectors, top_k=top_k, kind=kind)
+
+    def search_many(
+        self,
+        tenants: Optional[Sequence[str]],
+        vectors: np.ndarray,
+        top_k: int = 5,
+        kind: Optional[str] = None,
+    ) -> List[List[Tuple[str, Entry, float]]]:
+        """
+        Search several shards in parallel and merge the results.
+
+        Returns, per query vector, the top_k (tenant, entry, score) over all the
+        given tenants (default: every tenant), best first.
+        """
+        tenants = self.tenants() if tenants is None else list(tenants)
+        vectors = np.asarray(vectors, dtype="float32")
+        n_queries = len(vectors.reshape(-1, vectors.shape[-1]))
+        futures = [self._pool.submit(self.search, tenant, vectors, top_k, kind) for tenant in tenants]
+        merged = [[] for _ in range(n_queries)]
+        for tenant, future in zip(tenants, futures):
+            for hits, results in zip(merged, future.result()):
+                hits.extend((tenant, entry, score) for entry, score in results)
+        return [heapq.nlargest(top_k, hits, key=lambda hit: hit[2]) for hits in merged]
+
+    def close(self):
+        self._pool.shutdown(wait=True)
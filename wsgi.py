@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is created (and models preloaded) when gunicorn imports this module
+in the master process, before workers are forked.
+"""
+
+from api import create_app
+
+app = create_app(preload=True)